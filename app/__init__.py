@@ -14,6 +14,10 @@ def create_app(test_config=None):
     
     # Set up configuration
     app.config['SECRET_KEY'] = secrets.token_hex(16)
+    app.config['SCHEMA_COMPARISON_WORKERS'] = int(os.environ.get('SCHEMA_COMPARISON_WORKERS', 4))
+    app.config['SLOW_QUERY_THRESHOLD_MS'] = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 1000))
+    if os.environ.get('SLOW_QUERY_LOG'):
+        app.config['SLOW_QUERY_LOG'] = os.environ['SLOW_QUERY_LOG']
     
     # Configure CORS
     CORS(app, resources={
@@ -36,4 +40,12 @@ def create_app(test_config=None):
     app.register_blueprint(comparison_bp)
     app.register_blueprint(errors_bp)
     
+    # Record request latencies for /metrics
+    from app.utils.metrics import init_app as init_metrics
+    init_metrics(app)
+    
+    # Trace database queries: slow-query log and, in debug mode, the query panel
+    from app.utils.query_trace import init_app as init_query_trace
+    init_query_trace(app)
+    
     return app
@@ -44,6 +44,8 @@ class ComparisonTypeForm(FlaskForm):
         'Comparison Type', 
         choices=[
             ('schema', 'Database Schema Comparison (Tables Only)'),
+            ('row_count', 'Database Row Count Comparison'),
+            ('ddl', 'Database DDL Comparison'),
             ('data', 'Table Data Comparison')
         ],
         validators=[DataRequired()]
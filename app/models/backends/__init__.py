@@ -0,0 +1,8 @@
+"""
+Database backends for the Database Comparison Tool.
+
+The SQL Server backend is app.models.database.DatabaseConnection; create_connection()
+there picks the backend of a saved connection from its driver.
+"""
+from app.models.backends.base import DatabaseBackend
+from app.models.backends.sqlite import SQLiteBackend
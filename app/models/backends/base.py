@@ -0,0 +1,481 @@
+"""
+Backend adapter interface for the Database Comparison Tool.
+"""
+import hashlib
+import hmac
+import secrets
+
+from app.models.connection_pool import connection_pool
+from app.utils.query_trace import TracedCursor
+
+# Per-process key for the password digests in pool keys, so they can't be brute-forced offline
+_POOL_KEY_SECRET = secrets.token_bytes(32)
+
+def credential_digest(password):
+    """HMAC of a password, telling logins apart in the pool without keeping the password in the key"""
+    return hmac.new(_POOL_KEY_SECRET, (password or '').encode('utf-8'), hashlib.sha256).hexdigest()
+
+class DatabaseBackend:
+    """Base class of the database backends the comparison engine runs against.
+
+    A backend opens DB-API connections through the shared connection pool and answers
+    the catalog, data streaming, row count and checksum queries the comparison engine
+    needs. Subclasses implement the dialect-specific queries; everything that can be
+    expressed through quote_name(), placeholder and _select_query() lives here.
+    """
+
+    # Name of the backend in the query traces and metrics
+    backend_name = 'generic'
+
+    # Parameter marker of the backend's DB-API driver
+    placeholder = '%s'
+
+    def __init__(self, server, database, username, password, driver=None):
+        self.server = server
+        self.database = database
+        self.username = username
+        self.password = password
+        self.driver = driver
+        self.connection = None
+        self.cursor = None
+        self.pooled = False
+
+    @property
+    def pool_key(self):
+        """Key identifying this connection's server, database and login in the connection pool
+
+        The key includes a digest of the password, so a connection logged in with one
+        password is never handed to a caller presenting another.
+        """
+        return (self.server, self.database, self.username, credential_digest(self.password))
+
+    def _open_connection(self):
+        """Open a new DB-API connection"""
+        raise NotImplementedError
+
+    def connect(self):
+        """Borrow a connection to the database from the connection pool"""
+        try:
+            self.connection = connection_pool.acquire(self.pool_key, self._open_connection)
+            self.pooled = True
+            self.cursor = self.connection.cursor()
+            return True
+        except Exception as e:
+            print(f"Error connecting to database: {e}")
+            if self.pooled:
+                connection_pool.release(self.pool_key, self.connection, discard=True)
+                self.pooled = False
+                self.connection = None
+            return False
+
+    def disconnect(self):
+        """Close the cursor and return the connection to the pool"""
+        if self.cursor:
+            self.cursor.close()
+        if self.connection:
+            if self.pooled:
+                connection_pool.release(self.pool_key, self.connection)
+                self.pooled = False
+                self.connection = None
+                self.cursor = None
+            else:
+                self.connection.close()
+
+    def _execute(self, query, params=None):
+        """Execute a query on the cursor and return a TracedCursor to fetch its results from"""
+        return TracedCursor(self.cursor, self.backend_name).execute(query, params)
+
+    @staticmethod
+    def quote_name(name):
+        """Quote a table or column name"""
+        return '"' + str(name).replace('"', '""') + '"'
+
+    def _order_term(self, column, column_type):
+        """Get the ORDER BY term for a key column, sorted in Python's string order"""
+        return self.quote_name(column)
+
+    def _select_query(self, table_name, columns, limit=None, order_terms=None):
+        """Build a SELECT of some columns, optionally ordered and limited to the first rows"""
+        column_list = ", ".join([self.quote_name(col) for col in columns])
+        query = f"SELECT {column_list} FROM {self.quote_name(table_name)}"
+        if order_terms:
+            query += " ORDER BY " + ", ".join(order_terms)
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        return query
+
+    # Catalog
+
+    def get_tables(self):
+        """Get all tables in the database"""
+        raise NotImplementedError
+
+    def get_schema_version(self):
+        """Get a cheap token that changes whenever the schema does, or None if unknown"""
+        return None
+
+    def get_table_schema(self, table_name):
+        """Get schema information for a table"""
+        return self.get_all_table_schemas([table_name]).get(table_name, [])
+
+    def get_all_table_schemas(self, table_names=None):
+        """Get schema information for every table in the database
+
+        Returns a dict mapping table name to column dicts as _build_column() produces
+        them. Pass table_names to restrict the result to a subset.
+        """
+        raise NotImplementedError
+
+    def get_table_fingerprints(self):
+        """Get a fingerprint string of every table's definition"""
+        raise NotImplementedError
+
+    def get_foreign_keys(self, table_names=None):
+        """Get the foreign key constraints of every table
+
+        Returns a dict mapping table name to a dict of constraint name to its table,
+        columns, referenced table and referenced columns, in constraint column order.
+        """
+        raise NotImplementedError
+
+    def get_indexes(self, table_names=None):
+        """Get the non primary key indexes of every table
+
+        Returns a dict mapping table name to a dict of index name to its uniqueness
+        and columns in key order.
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def _build_column(row):
+        """Build a column dict from a catalog row
+
+        The row holds name, data type, max length, precision, scale, nullable
+        ('YES'/'NO'), identity flag and primary key flag in that order.
+        """
+        column = {
+            'name': row[0],
+            'type': row[1],
+            'max_length': row[2] if row[2] is not None else 0,
+            'numeric_precision': row[3],
+            'numeric_scale': row[4],
+            'is_nullable': 'Yes' if row[5] == 'YES' else 'No',
+            'is_identity': 'Yes' if row[6] == 1 else 'No',
+            'is_primary_key': 'Yes' if row[7] == 1 else 'No'
+        }
+
+        # Format data type with precision/scale/length
+        if column['type'] in ('varchar', 'nvarchar', 'char', 'nchar'):
+            if column['max_length'] == -1:
+                column['formatted_data_type'] = f"{column['type']}(MAX)"
+            else:
+                column['formatted_data_type'] = f"{column['type']}({column['max_length']})"
+        elif column['type'] in ('decimal', 'numeric'):
+            column['formatted_data_type'] = f"{column['type']}({column['numeric_precision']},{column['numeric_scale']})"
+        else:
+            column['formatted_data_type'] = column['type']
+
+        return column
+
+    def get_create_table_script(self, table_name):
+        """Generate CREATE TABLE script for the specified table"""
+        # Get schema information
+        schema_info = self.get_table_schema(table_name)
+
+        foreign_keys = {}
+        indexes = {}
+        try:
+            foreign_keys = self.get_foreign_keys([table_name]).get(table_name, {})
+            indexes = self.get_indexes([table_name]).get(table_name, {})
+        except Exception as e:
+            print(f"Error getting constraints and indexes: {e}")
+
+        return self.build_create_table_script(table_name, schema_info, foreign_keys, indexes)
+
+    def get_all_create_table_scripts(self, table_names=None):
+        """Generate CREATE TABLE scripts for every table in the database
+
+        Returns a dict mapping table name to the same script get_create_table_script()
+        produces, built from get_table_definitions(). Pass table_names to restrict the
+        result to a subset.
+        """
+        return {
+            table_name: self.build_create_table_script(table_name, definition['columns'],
+                                                       definition['foreign_keys'], definition['indexes'])
+            for table_name, definition in self.get_table_definitions(table_names).items()
+        }
+
+    def get_table_definitions(self, table_names=None):
+        """Get the columns, foreign keys and indexes of every table in the database
+
+        Runs one query each for columns, foreign keys and indexes across all tables and
+        groups the rows per table, instead of three queries per table. Returns a dict
+        mapping table name to a dict with 'columns' (as get_table_schema() returns them),
+        'foreign_keys' and 'indexes'. Pass table_names to restrict the result to a subset.
+        """
+        schemas = self.get_all_table_schemas(table_names)
+        if not schemas:
+            return {}
+
+        foreign_keys = {}
+        indexes = {}
+        try:
+            foreign_keys = self.get_foreign_keys(table_names)
+            indexes = self.get_indexes(table_names)
+        except Exception as e:
+            print(f"Error getting constraints and indexes: {e}")
+
+        return {
+            table_name: {
+                'columns': columns,
+                'foreign_keys': foreign_keys.get(table_name, {}),
+                'indexes': indexes.get(table_name, {})
+            }
+            for table_name, columns in schemas.items()
+        }
+
+    @staticmethod
+    def build_create_table_script(table_name, schema_info, foreign_keys, indexes):
+        """Build a CREATE TABLE script from a table's columns, foreign keys and indexes"""
+        # Start building the CREATE TABLE script
+        script = f"CREATE TABLE [{table_name}] (\n"
+
+        # Add columns
+        column_definitions = []
+        primary_keys = []
+
+        for column in schema_info:
+            column_def = f"    [{column['name']}] {column['formatted_data_type']}"
+
+            # Add NULL/NOT NULL constraint
+            column_def += " NOT NULL" if column['is_nullable'] == 'No' else " NULL"
+
+            # Add IDENTITY specification
+            if column['is_identity'] == 'Yes':
+                column_def += " IDENTITY(1,1)"
+
+            # Track primary keys
+            if column['is_primary_key'] == 'Yes':
+                primary_keys.append(column['name'])
+
+            column_definitions.append(column_def)
+
+        # Add primary key constraint if exists
+        if primary_keys:
+            pk_constraint = f"    CONSTRAINT [PK_{table_name}] PRIMARY KEY CLUSTERED (\n"
+            pk_constraint += ",\n".join([f"        [{pk}]" for pk in primary_keys])
+            pk_constraint += "\n    )"
+            column_definitions.append(pk_constraint)
+
+        # Complete the script
+        script += ",\n".join(column_definitions)
+        script += "\n);"
+
+        # Add foreign key constraints to the script
+        for fk_name, fk_info in foreign_keys.items():
+            fk_script = f"\nALTER TABLE [{fk_info['table']}] ADD CONSTRAINT [{fk_name}] FOREIGN KEY ("
+            fk_script += ", ".join([f"[{col}]" for col in fk_info['columns']])
+            fk_script += f") REFERENCES [{fk_info['ref_table']}] ("
+            fk_script += ", ".join([f"[{col}]" for col in fk_info['ref_columns']])
+            fk_script += ");"
+
+            script += fk_script
+
+        # Add index definitions to the script
+        for index_name, index_info in indexes.items():
+            unique_text = "UNIQUE " if index_info['is_unique'] else ""
+            index_script = f"\nCREATE {unique_text}INDEX [{index_name}] ON [{table_name}] ("
+            index_script += ", ".join([f"[{col}]" for col in index_info['columns']])
+            index_script += ");"
+
+            script += index_script
+
+        return script
+
+    # Data
+
+    def get_table_data(self, table_name, columns=None, limit=50, order_by=None):
+        """Get sample data from a table with optional column selection and ordering"""
+        # Ensure we have a valid list of columns
+        if not columns:
+            # Get all column names from schema if no columns specified
+            schema = self.get_table_schema(table_name)
+            columns = [col['name'] for col in schema]
+
+        # Order by the key so both sides return the same slice of the table
+        order_terms = [self.quote_name(col) for col in order_by] if order_by else None
+        query = self._select_query(table_name, columns, limit, order_terms)
+
+        try:
+            cursor = self._execute(query)
+            rows = cursor.fetchall()
+
+            # Convert to list of dicts for easier processing
+            result = []
+            for row in rows:
+                row_dict = {}
+                for i, col in enumerate(columns):
+                    row_dict[col] = row[i]
+                result.append(row_dict)
+
+            return {
+                'columns': columns,
+                'rows': result,
+                'total_rows': len(result)
+            }
+        except Exception as e:
+            print(f"Error fetching data: {e}")
+            return {
+                'columns': [],
+                'rows': [],
+                'total_rows': 0
+            }
+
+    def iter_table_data(self, table_name, columns=None, batch_size=5000, limit=None, order_by=None):
+        """Stream rows from a table in batches using fetchmany
+
+        Yields lists of row tuples (in the order of columns), holding only one
+        batch in memory at a time. When order_by is given, character key columns
+        are sorted in Python's string order (see _order_term()), which lets callers
+        merge two sorted streams.
+        """
+        schema = None
+        if not columns or order_by:
+            schema = self.get_table_schema(table_name)
+        if not columns:
+            columns = [col['name'] for col in schema]
+
+        order_terms = None
+        if order_by:
+            column_types = {col['name']: col['type'] for col in schema}
+            order_terms = [self._order_term(col, column_types.get(col)) for col in order_by]
+        query = self._select_query(table_name, columns, limit, order_terms)
+
+        cursor = self._execute(query)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+
+    def get_key_range(self, table_name, key_column):
+        """Get the minimum and maximum value of a key column"""
+        key = self.quote_name(key_column)
+        query = f"SELECT MIN({key}), MAX({key}) FROM {self.quote_name(table_name)}"
+        cursor = self._execute(query)
+        row = cursor.fetchone()
+        return row[0], row[1]
+
+    def get_bucket_checksums(self, table_name, key_column, columns, lower, upper, bucket_width):
+        """Get row counts and aggregate checksums for fixed-width key buckets
+
+        Rows with lower <= key <= upper are grouped into buckets of bucket_width key
+        values, numbered from 0. Returns a dict mapping bucket number to a tuple of
+        row count and checksums, computed by the database. Both sides of a comparison
+        must use the same backend for their checksums to be comparable.
+        """
+        raise NotImplementedError
+
+    def get_rows_in_key_range(self, table_name, columns, key_column, lower, upper):
+        """Get all rows whose key lies in [lower, upper], in the get_table_data format"""
+        column_list = ", ".join([self.quote_name(col) for col in columns])
+        key = self.quote_name(key_column)
+        query = f"""
+        SELECT {column_list}
+        FROM {self.quote_name(table_name)}
+        WHERE {key} BETWEEN {self.placeholder} AND {self.placeholder}
+        ORDER BY {key}
+        """
+        cursor = self._execute(query, (lower, upper))
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        return {
+            'columns': columns,
+            'rows': rows,
+            'total_rows': len(rows)
+        }
+
+    def _sample_hash(self, key_columns):
+        """Get an SQL expression hashing the key columns of a row to a non-negative integer
+
+        The hash must depend only on the key values, so every database of the same
+        backend picks the same rows for a sample.
+        """
+        raise NotImplementedError
+
+    def get_sampled_rows(self, table_name, columns, key_columns, modulus, residue=0):
+        """Get the rows whose key hash is residue modulo modulus, in the get_table_data format
+
+        Roughly one row in modulus is returned. The sample is chosen by the key values
+        alone, so it is reproducible and contains the same keys on both sides of a
+        comparison; pick another residue for a different sample of the same size.
+        """
+        column_list = ", ".join([self.quote_name(col) for col in columns])
+        key_list = ", ".join([self.quote_name(col) for col in key_columns])
+        # Inlined rather than bound: drivers with %s placeholders would read % as one
+        query = f"""
+        SELECT {column_list}
+        FROM {self.quote_name(table_name)}
+        WHERE {self._sample_hash(key_columns)} % {int(modulus)} = {int(residue)}
+        ORDER BY {key_list}
+        """
+        cursor = self._execute(query)
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        return {
+            'columns': columns,
+            'rows': rows,
+            'total_rows': len(rows)
+        }
+
+    def iter_table_data_by_key_hash(self, table_name, columns, key_columns, batch_size=5000):
+        """Stream rows ordered by the hash of their key columns, in batches using fetchmany
+
+        Each row tuple starts with the key hash, followed by the columns. The hash is an
+        integer, which every database sorts the way Python does, so two streams can be
+        merged even when their keys can't be (uniqueidentifier, collation-sensitive text).
+        """
+        column_list = ", ".join([self.quote_name(col) for col in columns])
+        query = f"""
+        SELECT {self._sample_hash(key_columns)}, {column_list}
+        FROM {self.quote_name(table_name)}
+        ORDER BY 1
+        """
+        cursor = self._execute(query)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+
+    # Row counts
+
+    def get_row_counts(self, exact=False):
+        """Get the row count of every table in the database
+
+        Returns a dict mapping table name to row count. Backends with cheap row count
+        metadata return estimates unless exact=True.
+        """
+        raise NotImplementedError
+
+    def get_estimated_row_count(self, table_name):
+        """Get a table's row count from metadata, without scanning it
+
+        Returns None if the backend keeps no row count metadata or has none for the table.
+        """
+        return None
+
+    def get_bounded_row_count(self, table_name, limit):
+        """Count the rows of a table, reading at most limit rows (a result of limit means at least limit)"""
+        query = (f"SELECT COUNT(*) FROM (SELECT 1 AS one FROM {self.quote_name(table_name)} "
+                 f"LIMIT {int(limit)}) AS counted")
+        cursor = self._execute(query)
+        return int(cursor.fetchone()[0])
+
+    def get_row_count(self, table_name):
+        """Get the total number of rows in a table"""
+        query = f"SELECT COUNT(*) FROM {self.quote_name(table_name)}"
+        try:
+            cursor = self._execute(query)
+            return cursor.fetchone()[0]
+        except Exception as e:
+            print(f"Error getting row count: {e}")
+            return 0
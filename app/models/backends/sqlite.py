@@ -0,0 +1,258 @@
+"""
+Embedded SQLite backend for the Database Comparison Tool.
+
+Runs the whole comparison pipeline against local database files, without a SQL
+Server, e.g. to profile it on large synthetic databases.
+"""
+import hashlib
+import re
+import sqlite3
+import zlib
+from urllib.request import pathname2url
+
+from app.models.backends.base import DatabaseBackend
+
+# Declared type of a column, e.g. "NVARCHAR(100)" or "DECIMAL(18, 2)"
+_DECLARED_TYPE = re.compile(r"^\s*([A-Za-z_][A-Za-z_ ]*?)\s*(?:\(\s*(\d+)\s*(?:,\s*(\d+)\s*)?\))?\s*$")
+
+# Condition selecting user tables from sqlite_master
+_USER_TABLES = "m.type = 'table' AND m.name NOT LIKE 'sqlite\\_%' ESCAPE '\\'"
+
+def _row_checksum(*values):
+    """Checksum of a row's values, the counterpart of SQL Server's BINARY_CHECKSUM"""
+    return zlib.crc32(repr(values).encode('utf-8'))
+
+def _key_hash(*values):
+    """Hash of a row's key values to a non-negative 32-bit integer, for sampling"""
+    text = ''.join(f"{value}|" for value in values)
+    return int.from_bytes(hashlib.md5(text.encode('utf-8')).digest()[:4], 'big')
+
+class _ChecksumAggregate:
+    """XOR of row checksums, the counterpart of SQL Server's CHECKSUM_AGG"""
+
+    def __init__(self):
+        self.value = 0
+
+    def step(self, checksum):
+        if checksum is not None:
+            self.value ^= checksum
+
+    def finalize(self):
+        return self.value
+
+def parse_declared_type(declared_type):
+    """Split a declared column type into (type, max length, precision, scale)
+
+    SQLite keeps the declared type as written, so the SQL Server type names used by
+    the rest of the tool (varchar(100), decimal(18,2), ...) round-trip unchanged.
+    Columns declared without a type have BLOB affinity.
+    """
+    match = _DECLARED_TYPE.match(declared_type or '')
+    if not match:
+        return (declared_type or 'blob').lower(), None, None, None
+
+    type_name = match.group(1).lower()
+    size, scale = match.group(2), match.group(3)
+    if type_name in ('varchar', 'nvarchar', 'char', 'nchar', 'varbinary', 'binary'):
+        if size is None:
+            return type_name, None, None, None
+        return type_name, int(size), None, None
+    if type_name in ('decimal', 'numeric') and size is not None:
+        return type_name, None, int(size), int(scale) if scale is not None else 0
+    return type_name, None, None, None
+
+class SQLiteBackend(DatabaseBackend):
+    """SQLite backend, connected through the standard library's sqlite3 module
+
+    The database field is the path of the database file; server, username and
+    password are not used. Checksums come from Python functions registered on each
+    connection, so they are only comparable with other SQLite databases.
+    """
+
+    backend_name = 'sqlite'
+    placeholder = '?'
+
+    def _open_connection(self):
+        """Open a new sqlite3 connection with the checksum and sampling functions registered"""
+        # Open the file read-write without creating it, so a mistyped path fails to
+        # connect instead of comparing against a new empty database. Pooled
+        # connections are handed to worker threads, so allow use across threads
+        connection = sqlite3.connect(f"file:{pathname2url(self.database)}?mode=rw", uri=True,
+                                     check_same_thread=False)
+        connection.create_function('ROW_CHECKSUM', -1, _row_checksum, deterministic=True)
+        connection.create_aggregate('CHECKSUM_AGG', 1, _ChecksumAggregate)
+        connection.create_function('SAMPLE_HASH', -1, _key_hash, deterministic=True)
+        return connection
+
+    def _catalog_rows(self, query, table_names, order_by):
+        """Run a catalog query over sqlite_master, optionally restricted to some tables"""
+        params = ()
+        if table_names is not None:
+            table_names = list(table_names)
+            if not table_names:
+                return []
+            query += f" AND m.name IN ({', '.join(['?'] * len(table_names))})"
+            params = tuple(table_names)
+        query += f" ORDER BY {order_by}"
+        cursor = self._execute(query, params)
+        return cursor.fetchall()
+
+    def get_tables(self):
+        """Get all tables in the database"""
+        query = f"SELECT m.name FROM sqlite_master AS m WHERE {_USER_TABLES} ORDER BY m.name"
+        cursor = self._execute(query)
+        return [row[0] for row in cursor.fetchall()]
+
+    def get_schema_version(self):
+        """Get the schema cookie, which SQLite increments on every schema change"""
+        try:
+            cursor = self._execute("PRAGMA schema_version")
+            return cursor.fetchone()[0]
+        except Exception as e:
+            print(f"Error getting schema version: {e}")
+            return None
+
+    def get_all_table_schemas(self, table_names=None):
+        """Get schema information for every table in the database in a single query
+
+        Returns a dict mapping table name to column dicts. An INTEGER PRIMARY KEY
+        column aliases the rowid, which SQLite assigns like an identity column.
+        """
+        query = f"""
+        SELECT m.name, p.name, p.type, p."notnull", p.pk
+        FROM sqlite_master AS m
+        JOIN pragma_table_info(m.name) AS p
+        WHERE {_USER_TABLES}
+        """
+        rows = self._catalog_rows(query, table_names, 'm.name, p.cid')
+
+        # Group the flat catalog rows into per-table column lists
+        table_rows = {}
+        for row in rows:
+            table_rows.setdefault(row[0], []).append(row[1:])
+
+        schemas = {}
+        for table_name, columns in table_rows.items():
+            key_count = sum(1 for column in columns if column[3])
+            schema = []
+            for name, declared_type, notnull, pk in columns:
+                type_name, max_length, precision, scale = parse_declared_type(declared_type)
+                is_identity = 1 if pk and key_count == 1 and (declared_type or '').upper() == 'INTEGER' else 0
+                schema.append(self._build_column((
+                    name, type_name, max_length, precision, scale,
+                    'NO' if notnull or is_identity else 'YES', is_identity, 1 if pk else 0
+                )))
+            schemas[table_name] = schema
+
+        return schemas
+
+    def get_table_fingerprints(self):
+        """Get a fingerprint of every table's definition, hashed from its CREATE TABLE statement"""
+        query = f"SELECT m.name, m.sql FROM sqlite_master AS m WHERE {_USER_TABLES}"
+        cursor = self._execute(query)
+        return {row[0]: hashlib.sha1((row[1] or '').encode('utf-8')).hexdigest()
+                for row in cursor.fetchall()}
+
+    def get_foreign_keys(self, table_names=None):
+        """Get the foreign key constraints of every table in a single query
+
+        SQLite doesn't name foreign keys, so they are named FK_<table>_<number>.
+        """
+        query = f"""
+        SELECT m.name, f.id, f."table", f."from", f."to"
+        FROM sqlite_master AS m
+        JOIN pragma_foreign_key_list(m.name) AS f
+        WHERE {_USER_TABLES}
+        """
+        rows = self._catalog_rows(query, table_names, 'm.name, f.id, f.seq')
+
+        foreign_keys = {}
+        for row in rows:
+            fk_constraints = foreign_keys.setdefault(row[0], {})
+            fk_name = f"FK_{row[0]}_{row[1]}"
+            if fk_name not in fk_constraints:
+                fk_constraints[fk_name] = {
+                    'table': row[0],
+                    'columns': [],
+                    'ref_table': row[2],
+                    'ref_columns': []
+                }
+
+            fk_constraints[fk_name]['columns'].append(row[3])
+            fk_constraints[fk_name]['ref_columns'].append(row[4])
+
+        return foreign_keys
+
+    def get_indexes(self, table_names=None):
+        """Get the non primary key indexes of every table in a single query"""
+        query = f"""
+        SELECT m.name, il.name, il."unique", ii.name
+        FROM sqlite_master AS m
+        JOIN pragma_index_list(m.name) AS il
+        JOIN pragma_index_info(il.name) AS ii
+        WHERE {_USER_TABLES} AND il.origin <> 'pk'
+        """
+        rows = self._catalog_rows(query, table_names, 'm.name, il.name, ii.seqno')
+
+        indexes = {}
+        for row in rows:
+            table_indexes = indexes.setdefault(row[0], {})
+            if row[1] not in table_indexes:
+                table_indexes[row[1]] = {
+                    'is_unique': bool(row[2]),
+                    'columns': []
+                }
+
+            table_indexes[row[1]]['columns'].append(row[3])
+
+        return indexes
+
+    def get_bucket_checksums(self, table_name, key_column, columns, lower, upper, bucket_width):
+        """Get row counts and aggregate checksums for fixed-width key buckets
+
+        Returns a dict mapping bucket number to a (row count, CHECKSUM_AGG, SUM of
+        row checksums) tuple, like the SQL Server backend, using the checksum
+        functions registered on the connection.
+        """
+        key = self.quote_name(key_column)
+        checksum_columns = ", ".join([self.quote_name(col)
+                                      for col in [key_column] + [c for c in columns if c != key_column]])
+        query = f"""
+        SELECT
+            BUCKET,
+            COUNT(*),
+            CHECKSUM_AGG(ROW_HASH),
+            SUM(ROW_HASH)
+        FROM (
+            SELECT
+                ({key} - ?) / ? AS BUCKET,
+                ROW_CHECKSUM({checksum_columns}) AS ROW_HASH
+            FROM
+                {self.quote_name(table_name)}
+            WHERE
+                {key} BETWEEN ? AND ?
+        )
+        GROUP BY
+            BUCKET
+        """
+        cursor = self._execute(query, (lower, bucket_width, lower, upper))
+        return {row[0]: (row[1], row[2], row[3]) for row in cursor.fetchall()}
+
+    def _sample_hash(self, key_columns):
+        """Hash the key columns with the SAMPLE_HASH function registered on the connection"""
+        return f"SAMPLE_HASH({', '.join([self.quote_name(col) for col in key_columns])})"
+
+    def get_row_counts(self, exact=False, tables_per_query=50):
+        """Get the row count of every table in the database
+
+        SQLite keeps no row count metadata, so the counts are always exact, from
+        COUNT(*) queries batched with UNION ALL.
+        """
+        tables = self.get_tables()
+        counts = {}
+        for start in range(0, len(tables), tables_per_query):
+            batch = tables[start:start + tables_per_query]
+            query = " UNION ALL ".join([f"SELECT ?, COUNT(*) FROM {self.quote_name(table)}" for table in batch])
+            cursor = self._execute(query, tuple(batch))
+            counts.update({row[0]: int(row[1]) for row in cursor.fetchall()})
+        return counts
@@ -0,0 +1,170 @@
+"""
+Thread-safe pool of database connections for the Database Comparison Tool.
+"""
+import threading
+import time
+
+class ConnectionPool:
+    """Pool of open DB-API connections, keyed by (server, database, user, password digest).
+
+    Connections are validated with a lightweight query before being handed out
+    (pre-ping), closed when they have been idle longer than idle_timeout, and each
+    key is limited to max_size open connections. Callers that hit the limit wait up
+    to acquire_timeout seconds for a connection to be released.
+    """
+
+    def __init__(self, max_size=10, idle_timeout=300, acquire_timeout=30, pre_ping=True):
+        """Initialize the connection pool."""
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self.pre_ping = pre_ping
+        self._idle = {}
+        self._in_use = {}
+        self._stats = {}
+        self._condition = threading.Condition()
+
+    def _key_stats(self, key):
+        """Get the metrics counters for a key (caller holds the lock)"""
+        if key not in self._stats:
+            self._stats[key] = {
+                'created': 0,
+                'reused': 0,
+                'ping_failures': 0,
+                'evicted_idle': 0,
+                'discarded': 0,
+                'waits': 0,
+                'timeouts': 0
+            }
+        return self._stats[key]
+
+    @staticmethod
+    def _close_quietly(connection):
+        """Close a connection, ignoring errors from already broken connections"""
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _ping(connection):
+        """Check that a connection is still usable"""
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def acquire(self, key, factory):
+        """Borrow a connection for key, creating one with factory() if none is idle"""
+        deadline = time.monotonic() + self.acquire_timeout
+
+        while True:
+            connection = None
+            with self._condition:
+                stats = self._key_stats(key)
+                self._evict_idle_locked(key)
+                idle = self._idle.get(key)
+                if idle:
+                    connection, _ = idle.pop()
+                    self._in_use[key] = self._in_use.get(key, 0) + 1
+                elif self._in_use.get(key, 0) < self.max_size:
+                    self._in_use[key] = self._in_use.get(key, 0) + 1
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        stats['timeouts'] += 1
+                        raise TimeoutError(f"Timed out waiting for a pooled connection to {key[0]}/{key[1]}")
+                    stats['waits'] += 1
+                    self._condition.wait(remaining)
+                    continue
+
+            if connection is not None:
+                # Validate the idle connection outside the lock
+                if not self.pre_ping or self._ping(connection):
+                    with self._condition:
+                        stats['reused'] += 1
+                    return connection
+                with self._condition:
+                    stats['ping_failures'] += 1
+                    self._in_use[key] -= 1
+                    self._condition.notify()
+                self._close_quietly(connection)
+                continue
+
+            # Open a new connection outside the lock; the slot is already reserved
+            try:
+                connection = factory()
+            except Exception:
+                with self._condition:
+                    self._in_use[key] -= 1
+                    self._condition.notify()
+                raise
+            with self._condition:
+                stats['created'] += 1
+            return connection
+
+    def release(self, key, connection, discard=False):
+        """Return a borrowed connection to the pool, or close it if discard is set"""
+        if not discard:
+            try:
+                # Don't hand an open transaction to the next borrower
+                connection.rollback()
+            except Exception:
+                discard = True
+
+        with self._condition:
+            self._in_use[key] = max(0, self._in_use.get(key, 0) - 1)
+            if discard:
+                self._key_stats(key)['discarded'] += 1
+            else:
+                self._idle.setdefault(key, []).append((connection, time.monotonic()))
+            self._evict_idle_locked(key)
+            self._condition.notify()
+
+        if discard:
+            self._close_quietly(connection)
+
+    def _evict_idle_locked(self, key):
+        """Close connections for key that have been idle too long (caller holds the lock)"""
+        idle = self._idle.get(key)
+        if not idle:
+            return
+        cutoff = time.monotonic() - self.idle_timeout
+        expired = [connection for connection, released_at in idle if released_at < cutoff]
+        if expired:
+            self._idle[key] = [(connection, released_at) for connection, released_at in idle if released_at >= cutoff]
+            self._key_stats(key)['evicted_idle'] += len(expired)
+            for connection in expired:
+                self._close_quietly(connection)
+
+    def evict_idle(self):
+        """Close idle connections that have exceeded the idle timeout for every key"""
+        with self._condition:
+            for key in list(self._idle):
+                self._evict_idle_locked(key)
+
+    def close_all(self):
+        """Close every idle connection and reset the metrics"""
+        with self._condition:
+            idle = [connection for connections in self._idle.values() for connection, _ in connections]
+            self._idle.clear()
+            self._stats.clear()
+        for connection in idle:
+            self._close_quietly(connection)
+
+    def get_metrics(self):
+        """Get pool metrics per key as a dict of counters plus current idle/in-use counts"""
+        with self._condition:
+            metrics = {}
+            for key in set(self._stats) | set(self._idle) | set(self._in_use):
+                metrics[key] = dict(self._key_stats(key))
+                metrics[key]['idle'] = len(self._idle.get(key, []))
+                metrics[key]['in_use'] = self._in_use.get(key, 0)
+            return metrics
+
+# Shared pool used by DatabaseConnection
+connection_pool = ConnectionPool()
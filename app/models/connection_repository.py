@@ -5,6 +5,8 @@ import os
 from datetime import datetime
 import pymssql
 
+from app.utils.query_trace import TracedCursor
+
 class ConnectionRepository:
     """Repository for database connection information."""
     
@@ -40,6 +42,10 @@ class ConnectionRepository:
         if self.connection:
             self.connection.close()
             
+    def _execute(self, query, params=None):
+        """Execute a query on the cursor and return a TracedCursor to fetch its results from."""
+        return TracedCursor(self.cursor, 'repository').execute(query, params)
+            
     def ensure_tables_exist(self):
         """Ensure that the necessary tables exist in the database."""
         if not self.connection:
@@ -48,7 +54,7 @@ class ConnectionRepository:
                 
         try:
             # Create the table if it doesn't exist
-            self.cursor.execute("""
+            self._execute("""
             IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'DatabaseConnections')
             BEGIN
                 CREATE TABLE [DatabaseConnections] (
@@ -78,15 +84,15 @@ class ConnectionRepository:
                 
         try:
             # Check if connection with this name already exists
-            self.cursor.execute("""
+            cursor = self._execute("""
             SELECT COUNT(*) FROM [DatabaseConnections] WHERE [ConnectionName] = %s
             """, (connection_name,))
             
-            count = self.cursor.fetchone()[0]
+            count = cursor.fetchone()[0]
             
             if count > 0:
                 # Update existing connection
-                self.cursor.execute("""
+                self._execute("""
                 UPDATE [DatabaseConnections]
                 SET [Server] = %s, [Database_Name] = %s, [Username] = %s, [Password] = %s, 
                     [Driver] = %s, [LastUsedDate] = %s
@@ -95,7 +101,7 @@ class ConnectionRepository:
                       datetime.now(), connection_name))
             else:
                 # Insert new connection
-                self.cursor.execute("""
+                self._execute("""
                 INSERT INTO [DatabaseConnections] 
                 ([ConnectionName], [Server], [Database_Name], [Username], [Password], [Driver], [CreatedDate], [LastUsedDate])
                 VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
@@ -115,7 +121,7 @@ class ConnectionRepository:
                 return []
                 
         try:
-            self.cursor.execute("""
+            cursor = self._execute("""
             SELECT [ConnectionId], [ConnectionName], [Server], [Database_Name], [Username], [Password], 
                    [Driver], [CreatedDate], [LastUsedDate]
             FROM [DatabaseConnections]
@@ -123,7 +129,7 @@ class ConnectionRepository:
             """)
             
             connections = []
-            for row in self.cursor.fetchall():
+            for row in cursor.fetchall():
                 connections.append({
                     'id': row[0],
                     'name': row[1],
@@ -148,14 +154,14 @@ class ConnectionRepository:
                 return None
                 
         try:
-            self.cursor.execute("""
+            cursor = self._execute("""
             SELECT [ConnectionId], [ConnectionName], [Server], [Database_Name], [Username], [Password], 
                    [Driver], [CreatedDate], [LastUsedDate]
             FROM [DatabaseConnections]
             WHERE [ConnectionName] = %s
             """, (connection_name,))  
             
-            row = self.cursor.fetchone()
+            row = cursor.fetchone()
             if row:
                 return {
                     'id': row[0],
@@ -181,7 +187,7 @@ class ConnectionRepository:
                 return False
                 
         try:
-            self.cursor.execute("""
+            self._execute("""
             DELETE FROM [DatabaseConnections]
             WHERE [ConnectionName] = %s
             """, (connection_name,))
@@ -199,7 +205,7 @@ class ConnectionRepository:
                 return False
                 
         try:
-            self.cursor.execute("""
+            self._execute("""
             UPDATE [DatabaseConnections]
             SET [LastUsedDate] = %s
             WHERE [ConnectionName] = %s
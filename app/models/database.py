@@ -2,39 +2,50 @@
 Database connection model for the Database Comparison Tool.
 """
 import pymssql
+from app.models.backends.base import DatabaseBackend
+from app.models.backends.sqlite import SQLiteBackend
+
+class DatabaseConnection(DatabaseBackend):
+    """SQL Server backend, connected through pymssql"""
 
-class DatabaseConnection:
     def __init__(self, server, database, username, password, driver='ODBC Driver 17 for SQL Server'):
-        self.server = server
-        self.database = database
-        self.username = username
-        self.password = password
-        self.driver = driver
-        self.connection = None
-        self.cursor = None
-        
-    def connect(self):
-        """Connect to the database using pymssql"""
-        try:
-            self.connection = pymssql.connect(
-                server=self.server,
-                user=self.username,
-                password=self.password,
-                database=self.database,
-                appname='Database Comparison Tool'
-            )
-            self.cursor = self.connection.cursor()
-            return True
-        except Exception as e:
-            print(f"Error connecting to database: {e}")
-            return False
+        super().__init__(server, database, username, password, driver)
+    
+    def _open_connection(self):
+        """Open a new pymssql connection"""
+        return pymssql.connect(
+            server=self.server,
+            user=self.username,
+            password=self.password,
+            database=self.database,
+            appname='Database Comparison Tool'
+        )
+    
+    @staticmethod
+    def quote_name(name):
+        """Quote a table or column name with brackets"""
+        return f"[{name}]"
+    
+    def _order_term(self, column, column_type):
+        """Sort character key columns with a binary collation, matching Python's string order
+
+        A binary collation orders varchar by its code page bytes ('€' is 0x80 in
+        cp1252, before 'ÿ'), so varchar is ordered as nvarchar, by UTF-16 code unit.
+        """
+        if column_type in ('char', 'varchar'):
+            return f"CAST([{column}] AS NVARCHAR(4000)) COLLATE Latin1_General_BIN2"
+        if column_type in ('nchar', 'nvarchar'):
+            return f"[{column}] COLLATE Latin1_General_BIN2"
+        return f"[{column}]"
     
-    def disconnect(self):
-        """Close the database connection"""
-        if self.cursor:
-            self.cursor.close()
-        if self.connection:
-            self.connection.close()
+    def _select_query(self, table_name, columns, limit=None, order_terms=None):
+        """Build a SELECT of some columns, optionally ordered and limited with TOP"""
+        column_list = ", ".join([f"[{col}]" for col in columns])
+        top = f"TOP {limit} " if limit else ""
+        query = f"SELECT {top}{column_list} FROM [{table_name}]"
+        if order_terms:
+            query += " ORDER BY " + ", ".join(order_terms)
+        return query
     
     def get_tables(self):
         """Get all tables in the database"""
@@ -44,9 +55,24 @@ class DatabaseConnection:
         WHERE TABLE_TYPE = 'BASE TABLE' 
         ORDER BY TABLE_NAME
         """
-        self.cursor.execute(query)
-        return [row[0] for row in self.cursor.fetchall()]
-    
+        cursor = self._execute(query)
+        return [row[0] for row in cursor.fetchall()]
+
+    def get_schema_version(self):
+        """Get a cheap token that changes whenever user objects are created, altered or dropped"""
+        query = """
+        SELECT COUNT(*), MAX(modify_date)
+        FROM sys.objects
+        WHERE is_ms_shipped = 0
+        """
+        try:
+            cursor = self._execute(query)
+            row = cursor.fetchone()
+            return (row[0], str(row[1]))
+        except Exception as e:
+            print(f"Error getting schema version: {e}")
+            return None
+
     def get_table_schema(self, table_name):
         """Get schema information for a table"""
         # Get column information
@@ -83,75 +109,122 @@ class DatabaseConnection:
         ORDER BY 
             c.ORDINAL_POSITION
         """
-        self.cursor.execute(query, (table_name,))
-        columns = []
-        for row in self.cursor.fetchall():
-            column = {
-                'name': row[0],
-                'type': row[1],
-                'max_length': row[2] if row[2] is not None else 0,
-                'numeric_precision': row[3],
-                'numeric_scale': row[4],
-                'is_nullable': 'Yes' if row[5] == 'YES' else 'No',
-                'is_identity': 'Yes' if row[6] == 1 else 'No',
-                'is_primary_key': 'Yes' if row[7] == 1 else 'No'
-            }
-            
-            # Format data type with precision/scale/length
-            if column['type'] in ('varchar', 'nvarchar', 'char', 'nchar'):
-                if column['max_length'] == -1:
-                    column['formatted_data_type'] = f"{column['type']}(MAX)"
-                else:
-                    column['formatted_data_type'] = f"{column['type']}({column['max_length']})"
-            elif column['type'] in ('decimal', 'numeric'):
-                column['formatted_data_type'] = f"{column['type']}({column['numeric_precision']},{column['numeric_scale']})"
-            else:
-                column['formatted_data_type'] = column['type']
-                
-            columns.append(column)
-        
-        return columns
+        cursor = self._execute(query, (table_name,))
+        return [self._build_column(row) for row in cursor.fetchall()]
     
-    def get_create_table_script(self, table_name):
-        """Generate CREATE TABLE script for the specified table"""
-        # Get schema information
-        schema_info = self.get_table_schema(table_name)
-        
-        # Start building the CREATE TABLE script
-        script = f"CREATE TABLE [{table_name}] (\n"
+    def get_all_table_schemas(self, table_names=None):
+        """Get schema information for every table in the database in a single query
         
-        # Add columns
-        column_definitions = []
-        primary_keys = []
+        Returns a dict mapping table name to the same column dicts produced by
+        get_table_schema(). Pass table_names to restrict the result to a subset.
+        """
+        query = """
+        SELECT 
+            t.name AS TABLE_NAME,
+            c.name AS COLUMN_NAME,
+            COALESCE(ty.name, TYPE_NAME(c.user_type_id)) AS DATA_TYPE,
+            CASE 
+                WHEN ty.name IN ('nvarchar', 'nchar') AND c.max_length <> -1 THEN c.max_length / 2
+                WHEN ty.name IN ('varchar', 'char', 'nvarchar', 'nchar', 'varbinary', 'binary') THEN c.max_length
+                ELSE NULL
+            END AS CHARACTER_MAXIMUM_LENGTH,
+            CASE 
+                WHEN ty.name IN ('tinyint', 'smallint', 'int', 'bigint', 'decimal', 'numeric', 
+                                 'money', 'smallmoney', 'real', 'float') THEN c.precision
+                ELSE NULL
+            END AS NUMERIC_PRECISION,
+            CASE 
+                WHEN ty.name IN ('tinyint', 'smallint', 'int', 'bigint', 'decimal', 'numeric', 
+                                 'money', 'smallmoney') THEN c.scale
+                ELSE NULL
+            END AS NUMERIC_SCALE,
+            CASE WHEN c.is_nullable = 1 THEN 'YES' ELSE 'NO' END AS IS_NULLABLE,
+            CAST(c.is_identity AS INT) AS IS_IDENTITY,
+            CASE WHEN pk.column_id IS NOT NULL THEN 1 ELSE 0 END AS IS_PRIMARY_KEY
+        FROM 
+            sys.tables t
+        INNER JOIN 
+            sys.columns c ON c.object_id = t.object_id
+        LEFT JOIN 
+            sys.types ty ON ty.user_type_id = c.system_type_id
+        LEFT JOIN (
+            SELECT 
+                ic.object_id,
+                ic.column_id
+            FROM 
+                sys.indexes i
+                JOIN sys.index_columns ic 
+                    ON ic.object_id = i.object_id 
+                    AND ic.index_id = i.index_id
+            WHERE 
+                i.is_primary_key = 1
+        ) pk ON 
+            pk.object_id = c.object_id
+            AND pk.column_id = c.column_id
+        """
         
-        for column in schema_info:
-            column_def = f"    [{column['name']}] {column['formatted_data_type']}"
-            
-            # Add NULL/NOT NULL constraint
-            column_def += " NOT NULL" if column['is_nullable'] == 'No' else " NULL"
+        if table_names is not None:
+            table_names = list(table_names)
+            if not table_names:
+                return {}
+            query += """
+        WHERE 
+            t.name IN %s
+        """
+            params = (tuple(table_names),)
+        else:
+            params = None
             
-            # Add IDENTITY specification
-            if column['is_identity'] == 'Yes':
-                column_def += " IDENTITY(1,1)"
-                
-            # Track primary keys
-            if column['is_primary_key'] == 'Yes':
-                primary_keys.append(column['name'])
-                
-            column_definitions.append(column_def)
+        query += """
+        ORDER BY 
+            t.name, c.column_id
+        """
         
-        # Add primary key constraint if exists
-        if primary_keys:
-            pk_constraint = f"    CONSTRAINT [PK_{table_name}] PRIMARY KEY CLUSTERED (\n"
-            pk_constraint += ",\n".join([f"        [{pk}]" for pk in primary_keys])
-            pk_constraint += "\n    )"
-            column_definitions.append(pk_constraint)
+        if params:
+            cursor = self._execute(query, params)
+        else:
+            cursor = self._execute(query)
         
-        # Complete the script
-        script += ",\n".join(column_definitions)
-        script += "\n);"
+        # Group the flat catalog rows into per-table column lists
+        schemas = {}
+        for row in cursor.fetchall():
+            schemas.setdefault(row[0], []).append(self._build_column(row[1:]))
+        
+        return schemas
+
+    def get_table_fingerprints(self):
+        """Get a fingerprint of every table's definition in a single query
+
+        The fingerprint combines the table's modify_date, its primary key's modify_date
+        and a checksum over its column definitions, so it changes whenever the table's
+        schema does. Returns a dict mapping table name to fingerprint string.
+        """
+        query = """
+        SELECT
+            t.name AS TABLE_NAME,
+            CONVERT(VARCHAR(33), t.modify_date, 126) AS MODIFY_DATE,
+            CONVERT(VARCHAR(33), MAX(kc.modify_date), 126) AS PK_MODIFY_DATE,
+            CHECKSUM_AGG(BINARY_CHECKSUM(c.column_id, c.name, c.system_type_id, c.user_type_id, c.max_length,
+                                         c.precision, c.scale, c.is_nullable, c.is_identity)) AS COLUMNS_CHECKSUM
+        FROM
+            sys.tables t
+        INNER JOIN
+            sys.columns c ON c.object_id = t.object_id
+        LEFT JOIN
+            sys.key_constraints kc ON kc.parent_object_id = t.object_id AND kc.type = 'PK'
+        GROUP BY
+            t.name, t.modify_date
+        """
+        cursor = self._execute(query)
+        return {row[0]: f"{row[1]}|{row[2]}|{row[3]}" for row in cursor.fetchall()}
+
+    def get_foreign_keys(self, table_names=None):
+        """Get the foreign key constraints of every table in a single query
         
-        # Get foreign key constraints
+        Returns a dict mapping table name to a dict of constraint name to its table,
+        columns, referenced table and referenced columns, in constraint column order.
+        Pass table_names to restrict the result to a subset.
+        """
         query = """
         SELECT 
             fk.name AS FK_NAME,
@@ -163,130 +236,220 @@ class DatabaseConnection:
             sys.foreign_keys AS fk
         INNER JOIN 
             sys.foreign_key_columns AS fkc ON fk.OBJECT_ID = fkc.constraint_object_id
-        WHERE 
-            OBJECT_NAME(fk.parent_object_id) = %s
-        ORDER BY 
-            fk.name
         """
+        rows = self._execute_catalog_query(query, 'OBJECT_NAME(fk.parent_object_id)', table_names,
+                                           'TABLE_NAME, fk.name, fkc.constraint_column_id')
         
-        try:
-            self.cursor.execute(query, (table_name,))
-            fk_constraints = {}
-            
-            for row in self.cursor.fetchall():
-                fk_name = row[0]
-                if fk_name not in fk_constraints:
-                    fk_constraints[fk_name] = {
-                        'table': row[1],
-                        'columns': [],
-                        'ref_table': row[3],
-                        'ref_columns': []
-                    }
-                    
-                fk_constraints[fk_name]['columns'].append(row[2])
-                fk_constraints[fk_name]['ref_columns'].append(row[4])
-                
-            # Add foreign key constraints to the script
-            for fk_name, fk_info in fk_constraints.items():
-                fk_script = f"\nALTER TABLE [{fk_info['table']}] ADD CONSTRAINT [{fk_name}] FOREIGN KEY ("
-                fk_script += ", ".join([f"[{col}]" for col in fk_info['columns']])
-                fk_script += f") REFERENCES [{fk_info['ref_table']}] ("
-                fk_script += ", ".join([f"[{col}]" for col in fk_info['ref_columns']])
-                fk_script += ");"
-                
-                script += fk_script
-                
-            # Get indexes
-            query = """
-            SELECT 
-                i.name AS INDEX_NAME,
-                i.is_unique,
-                i.is_primary_key,
-                COL_NAME(ic.object_id, ic.column_id) AS COLUMN_NAME
-            FROM 
-                sys.indexes AS i
-            INNER JOIN 
-                sys.index_columns AS ic ON i.object_id = ic.object_id AND i.index_id = ic.index_id
-            WHERE 
-                OBJECT_NAME(i.object_id) = %s
-                AND i.is_primary_key = 0  -- Exclude primary keys as they're already handled
-            ORDER BY 
-                i.name, ic.key_ordinal
-            """
-            
-            self.cursor.execute(query, (table_name,))
-            indexes = {}
-            
-            for row in self.cursor.fetchall():
-                index_name = row[0]
-                is_unique = row[1]
-                column_name = row[3]
-                
-                if index_name not in indexes:
-                    indexes[index_name] = {
-                        'is_unique': is_unique,
-                        'columns': []
-                    }
-                    
-                indexes[index_name]['columns'].append(column_name)
+        foreign_keys = {}
+        for row in rows:
+            fk_constraints = foreign_keys.setdefault(row[1], {})
+            fk_name = row[0]
+            if fk_name not in fk_constraints:
+                fk_constraints[fk_name] = {
+                    'table': row[1],
+                    'columns': [],
+                    'ref_table': row[3],
+                    'ref_columns': []
+                }
                 
-            # Add index definitions to the script
-            for index_name, index_info in indexes.items():
-                unique_text = "UNIQUE " if index_info['is_unique'] else ""
-                index_script = f"\nCREATE {unique_text}INDEX [{index_name}] ON [{table_name}] ("
-                index_script += ", ".join([f"[{col}]" for col in index_info['columns']])
-                index_script += ");"
-                
-                script += index_script
+            fk_constraints[fk_name]['columns'].append(row[2])
+            fk_constraints[fk_name]['ref_columns'].append(row[4])
+        
+        return foreign_keys
+    
+    def get_indexes(self, table_names=None):
+        """Get the non primary key indexes of every table in a single query
+        
+        Returns a dict mapping table name to a dict of index name to its uniqueness
+        and columns in key order. Pass table_names to restrict the result to a subset.
+        """
+        query = """
+        SELECT 
+            i.name AS INDEX_NAME,
+            i.is_unique,
+            OBJECT_NAME(i.object_id) AS TABLE_NAME,
+            COL_NAME(ic.object_id, ic.column_id) AS COLUMN_NAME
+        FROM 
+            sys.indexes AS i
+        INNER JOIN 
+            sys.index_columns AS ic ON i.object_id = ic.object_id AND i.index_id = ic.index_id
+        INNER JOIN 
+            sys.tables AS t ON t.object_id = i.object_id
+        WHERE 
+            i.is_primary_key = 0  -- Exclude primary keys as they're already handled
+        """
+        rows = self._execute_catalog_query(query, 'OBJECT_NAME(i.object_id)', table_names,
+                                           'TABLE_NAME, i.name, ic.key_ordinal', has_where=True)
+        
+        indexes = {}
+        for row in rows:
+            table_indexes = indexes.setdefault(row[2], {})
+            index_name = row[0]
+            if index_name not in table_indexes:
+                table_indexes[index_name] = {
+                    'is_unique': row[1],
+                    'columns': []
+                }
                 
-        except Exception as e:
-            print(f"Error getting constraints and indexes: {e}")
-            
-        return script
+            table_indexes[index_name]['columns'].append(row[3])
+        
+        return indexes
     
-    def get_table_data(self, table_name, columns=None, limit=50):
-        """Get sample data from a table with optional column selection"""
-        # Ensure we have a valid list of columns
-        if not columns:
-            # Get all column names from schema if no columns specified
-            schema = self.get_table_schema(table_name)
-            columns = [col['name'] for col in schema]
-            
-        # Build column list for query
-        column_list = ", ".join([f"[{col}]" for col in columns])
-        query = f"SELECT TOP {limit} {column_list} FROM [{table_name}]"
+    def _execute_catalog_query(self, query, table_expression, table_names, order_by, has_where=False):
+        """Run a catalog query, optionally restricted to some tables, and fetch its rows"""
+        params = None
+        if table_names is not None:
+            table_names = list(table_names)
+            if not table_names:
+                return []
+            query += f"""
+        {'AND' if has_where else 'WHERE'} 
+            {table_expression} IN %s
+        """
+            params = (tuple(table_names),)
+        
+        query += f"""
+        ORDER BY 
+            {order_by}
+        """
+        
+        if params:
+            cursor = self._execute(query, params)
+        else:
+            cursor = self._execute(query)
+        return cursor.fetchall()
+    
+    def get_bucket_checksums(self, table_name, key_column, columns, lower, upper, bucket_width):
+        """Get row counts and aggregate checksums for fixed-width key buckets
+
+        Rows with lower <= key <= upper are grouped into buckets of bucket_width key
+        values, numbered from 0. Returns a dict mapping bucket number to a
+        (row count, CHECKSUM_AGG, SUM of row checksums) tuple, computed entirely on
+        the server. Columns of noncomparable types (text, ntext, image, xml) are
+        ignored by BINARY_CHECKSUM. The bucket arithmetic is done in BIGINT, so
+        key - lower can't overflow an int or smallint key.
+        """
+        checksum_columns = ", ".join([f"[{col}]" for col in [key_column] + [c for c in columns if c != key_column]])
+        query = f"""
+        SELECT
+            BUCKET,
+            COUNT_BIG(*) AS ROW_COUNT,
+            CHECKSUM_AGG(ROW_CHECKSUM) AS CHECKSUM_AGG,
+            SUM(CAST(ROW_CHECKSUM AS BIGINT)) AS CHECKSUM_SUM
+        FROM (
+            SELECT
+                (CAST([{key_column}] AS BIGINT) - %s) / %s AS BUCKET,
+                BINARY_CHECKSUM({checksum_columns}) AS ROW_CHECKSUM
+            FROM
+                [{table_name}]
+            WHERE
+                [{key_column}] BETWEEN %s AND %s
+        ) AS buckets
+        GROUP BY
+            BUCKET
+        """
+        cursor = self._execute(query, (lower, bucket_width, lower, upper))
+        return {row[0]: (row[1], row[2], row[3]) for row in cursor.fetchall()}
+
+    def _sample_hash(self, key_columns):
+        """Hash the key columns to a non-negative integer from the first 4 bytes of their MD5
+
+        The keys are hashed as text, so the same key sampled from an int and a bigint
+        column still matches; the trailing separator keeps CONCAT at two arguments or more.
+        """
+        key_text = ", N'|', ".join([f"CAST([{col}] AS NVARCHAR(4000))" for col in key_columns])
+        return f"CAST(CAST(HASHBYTES('MD5', CONCAT({key_text}, N'|')) AS BINARY(4)) AS BIGINT)"
+    
+    def get_row_counts(self, exact=False):
+        """Get the row count of every table in the database
         
+        By default the counts come from partition metadata in a single query, which is
+        instant but may be slightly off while rows are being modified. With exact=True
+        every table is counted with COUNT_BIG(*), batched into UNION ALL queries, which
+        scans each table. Returns a dict mapping table name to row count.
+        """
+        if exact:
+            return self._get_exact_row_counts()
+        
+        query = """
+        SELECT 
+            t.name AS TABLE_NAME,
+            SUM(ps.row_count) AS ROW_COUNT
+        FROM 
+            sys.tables t
+        INNER JOIN 
+            sys.dm_db_partition_stats ps ON ps.object_id = t.object_id
+        WHERE 
+            ps.index_id IN (0, 1)
+        GROUP BY 
+            t.name
+        """
         try:
-            self.cursor.execute(query)
-            rows = self.cursor.fetchall()
-            
-            # Convert to list of dicts for easier processing
-            result = []
-            for row in rows:
-                row_dict = {}
-                for i, col in enumerate(columns):
-                    row_dict[col] = row[i]
-                result.append(row_dict)
-                
-            return {
-                'columns': columns,
-                'rows': result,
-                'total_rows': len(result)
-            }
+            cursor = self._execute(query)
         except Exception as e:
-            print(f"Error fetching data: {e}")
-            return {
-                'columns': [],
-                'rows': [],
-                'total_rows': 0
-            }
+            # sys.dm_db_partition_stats needs VIEW DATABASE STATE; sys.partitions doesn't
+            print(f"Error reading partition stats, falling back to sys.partitions: {e}")
+            cursor = self._execute(query.replace('sys.dm_db_partition_stats', 'sys.partitions')
+                                              .replace('ps.row_count', 'ps.rows'))
+        return {row[0]: int(row[1] or 0) for row in cursor.fetchall()}
     
-    def get_row_count(self, table_name):
-        """Get the total number of rows in a table"""
-        query = f"SELECT COUNT(*) FROM [{table_name}]"
+    def get_estimated_row_count(self, table_name):
+        """Get a table's row count from partition metadata, or None if the table isn't found"""
+        query = """
+        SELECT 
+            SUM(ps.row_count)
+        FROM 
+            sys.dm_db_partition_stats ps
+        WHERE 
+            ps.object_id = OBJECT_ID(%s)
+            AND ps.index_id IN (0, 1)
+        """
         try:
-            self.cursor.execute(query)
-            return self.cursor.fetchone()[0]
+            cursor = self._execute(query, (f"[{table_name}]",))
         except Exception as e:
-            print(f"Error getting row count: {e}")
-            return 0
+            # sys.dm_db_partition_stats needs VIEW DATABASE STATE; sys.partitions doesn't
+            print(f"Error reading partition stats, falling back to sys.partitions: {e}")
+            cursor = self._execute(query.replace('sys.dm_db_partition_stats', 'sys.partitions')
+                                              .replace('ps.row_count', 'ps.rows'), (f"[{table_name}]",))
+        row = cursor.fetchone()
+        if not row or row[0] is None:
+            return None
+        return int(row[0])
+    
+    def get_bounded_row_count(self, table_name, limit):
+        """Count the rows of a table with COUNT_BIG, reading at most limit rows"""
+        query = f"SELECT COUNT_BIG(*) FROM (SELECT TOP {int(limit)} 1 AS one FROM [{table_name}]) AS counted"
+        cursor = self._execute(query)
+        return int(cursor.fetchone()[0])
+    
+    def _get_exact_row_counts(self, tables_per_query=50):
+        """Count the rows of every table exactly with batched COUNT_BIG(*) queries"""
+        tables = self.get_tables()
+        counts = {}
+        for start in range(0, len(tables), tables_per_query):
+            batch = tables[start:start + tables_per_query]
+            query = " UNION ALL ".join([f"SELECT %s, COUNT_BIG(*) FROM [{table}]" for table in batch])
+            cursor = self._execute(query, tuple(batch))
+            counts.update({row[0]: int(row[1]) for row in cursor.fetchall()})
+        return counts
+    
+
+# Backends selected by a connection's driver; any other driver is SQL Server
+BACKENDS = {
+    'sqlite': SQLiteBackend
+}
+
+def create_connection(conn):
+    """Create an unconnected database connection from a connection details dict
+    
+    The backend is chosen by the connection's driver: 'sqlite' opens the SQLite
+    database file named by the database field, and anything else is SQL Server.
+    """
+    backend = BACKENDS.get(str(conn.get('driver') or '').strip().lower(), DatabaseConnection)
+    return backend(
+        server=conn['server'],
+        database=conn['database'],
+        username=conn['username'],
+        password=conn['password'],
+        driver=conn['driver']
+    )
@@ -0,0 +1,158 @@
+"""
+Process-wide cache of database catalog metadata for the Database Comparison Tool.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from app.models.schema import TableSchema
+
+class MetadataCache:
+    """LRU/TTL cache of table lists and table schemas, keyed by connection identity.
+
+    Entries are revalidated against DatabaseConnection.get_schema_version(), so a
+    DDL change on the server invalidates the cached catalog for that database.
+    The version check is a single cheap query and runs at most once every
+    check_interval seconds per connection.
+    """
+
+    def __init__(self, max_entries=32, ttl=600, check_interval=5):
+        """Initialize the metadata cache."""
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def connection_key(db):
+        """Get the cache key identifying the database behind a connection"""
+        return (db.server, db.database, db.username)
+
+    def _get_entry(self, db):
+        """Get a valid cache entry for a connection, creating or refreshing it as needed"""
+        key = self.connection_key(db)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry['loaded_at'] > self.ttl:
+                del self._entries[key]
+                entry = None
+            needs_check = entry is None or now - entry['checked_at'] >= self.check_interval
+
+        if not needs_check:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+            return entry
+
+        # Query the server outside the lock so other connections aren't blocked
+        version = db.get_schema_version()
+        if version is None:
+            # Change detection is unavailable; don't serve anything from memory
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['version'] != version:
+                entry = {
+                    'version': version,
+                    'loaded_at': now,
+                    'checked_at': now,
+                    'tables': None,
+                    'schemas': {},
+                    'models': {},
+                    'missing': set(),
+                    'catalog_complete': False
+                }
+                self._entries[key] = entry
+            else:
+                entry['checked_at'] = now
+            self._entries.move_to_end(key)
+
+            # Evict least recently used entries
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return entry
+
+    def get_tables(self, db):
+        """Get all tables in the database, served from the cache when possible"""
+        entry = self._get_entry(db)
+        if entry is None:
+            return db.get_tables()
+
+        if entry['tables'] is None:
+            entry['tables'] = db.get_tables()
+        return list(entry['tables'])
+
+    def get_table_schema(self, db, table_name):
+        """Get schema information for a table, served from the cache when possible"""
+        entry = self._get_entry(db)
+        if entry is None:
+            return db.get_table_schema(table_name)
+
+        if table_name in entry['schemas']:
+            return entry['schemas'][table_name]
+        if table_name in entry['missing'] or entry['catalog_complete']:
+            return []
+
+        schema = db.get_table_schema(table_name)
+        if schema:
+            entry['schemas'][table_name] = schema
+        else:
+            entry['missing'].add(table_name)
+        return schema
+
+    def get_all_table_schemas(self, db, table_names=None):
+        """Get schemas for all (or the given) tables, loading only what isn't cached"""
+        entry = self._get_entry(db)
+        if entry is None:
+            return db.get_all_table_schemas(table_names)
+
+        if table_names is None:
+            if not entry['catalog_complete']:
+                entry['schemas'] = db.get_all_table_schemas()
+                entry['missing'] = set()
+                entry['catalog_complete'] = True
+            return dict(entry['schemas'])
+
+        table_names = list(table_names)
+        if not entry['catalog_complete']:
+            to_load = [name for name in table_names
+                       if name not in entry['schemas'] and name not in entry['missing']]
+            if to_load:
+                loaded = db.get_all_table_schemas(to_load)
+                entry['schemas'].update(loaded)
+                entry['missing'].update(name for name in to_load if name not in loaded)
+
+        return {name: entry['schemas'][name] for name in table_names if name in entry['schemas']}
+
+    def get_all_table_models(self, db, table_names=None):
+        """Get TableSchema models for all (or the given) tables
+
+        Models are built once per cached table, so their hashes are computed once and
+        comparisons of unchanged tables stay cheap across runs.
+        """
+        schemas = self.get_all_table_schemas(db, table_names)
+        entry = self._get_entry(db)
+        if entry is None:
+            return {name: TableSchema.from_columns(name, columns) for name, columns in schemas.items()}
+
+        models = entry['models']
+        for name, columns in schemas.items():
+            if name not in models:
+                models[name] = TableSchema.from_columns(name, columns)
+        return {name: models[name] for name in schemas}
+
+    def invalidate(self, db=None):
+        """Drop cached metadata for one connection, or for all connections"""
+        with self._lock:
+            if db is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(self.connection_key(db), None)
+
+# Shared cache used by the comparison routes
+metadata_cache = MetadataCache()
@@ -0,0 +1,117 @@
+"""
+Compact table schema model for the Database Comparison Tool.
+"""
+import sys
+from collections import namedtuple
+
+# Column properties in the order DatabaseConnection builds them
+COLUMN_FIELDS = ('name', 'type', 'max_length', 'numeric_precision', 'numeric_scale',
+                 'is_nullable', 'is_identity', 'is_primary_key', 'formatted_data_type')
+
+# Column flags stored as booleans instead of 'Yes'/'No' strings
+COLUMN_FLAGS = ('is_nullable', 'is_identity', 'is_primary_key')
+
+def _freeze(value):
+    """Convert nested dicts and lists into hashable tuples"""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+class ColumnInfo(namedtuple('ColumnInfo', COLUMN_FIELDS + ('extra',))):
+    """A table column as a tuple, with flags as booleans
+
+    Properties other than COLUMN_FIELDS are kept in 'extra' as a dict, or None when
+    there are none, which is the case for every column loaded from the catalog.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_dict(cls, column):
+        """Build a ColumnInfo from a column dict as returned by get_table_schema()"""
+        extra = {key: value for key, value in column.items() if key not in COLUMN_FIELDS} or None
+        data_type = column.get('type')
+        formatted_data_type = column.get('formatted_data_type')
+        return cls(
+            column.get('name'),
+            sys.intern(data_type) if isinstance(data_type, str) else data_type,
+            column.get('max_length'),
+            column.get('numeric_precision'),
+            column.get('numeric_scale'),
+            column.get('is_nullable') == 'Yes',
+            column.get('is_identity') == 'Yes',
+            column.get('is_primary_key') == 'Yes',
+            sys.intern(formatted_data_type) if isinstance(formatted_data_type, str) else formatted_data_type,
+            extra
+        )
+
+    def get_value(self, field):
+        """Get a column property as it appears in a column dict"""
+        value = getattr(self, field)
+        if field in COLUMN_FLAGS:
+            return 'Yes' if value else 'No'
+        return value
+
+    def to_dict(self):
+        """Convert back to a column dict as returned by get_table_schema()"""
+        column = {field: self.get_value(field) for field in COLUMN_FIELDS}
+        if self.extra:
+            column.update(self.extra)
+        return column
+
+    def key(self):
+        """Get a hashable tuple of every property of the column"""
+        if self.extra is None:
+            return self[:-1]
+        return self[:-1] + (_freeze(self.extra),)
+
+class TableSchema:
+    """The columns of a table with a precomputed hash
+
+    Two schemas with different hashes are known to differ without looking at their
+    columns, so unchanged tables are recognized in constant time.
+    """
+    __slots__ = ('name', 'columns', '_hash', '_by_name')
+
+    def __init__(self, name, columns):
+        """Initialize the schema from a sequence of ColumnInfo"""
+        self.name = name
+        self.columns = tuple(columns)
+        self._hash = hash(tuple(column.key() for column in self.columns))
+        self._by_name = None
+
+    @classmethod
+    def from_columns(cls, name, columns):
+        """Build a TableSchema from column dicts, or return it unchanged if it already is one"""
+        if isinstance(columns, cls):
+            return columns
+        return cls(name, (ColumnInfo.from_dict(column) for column in columns))
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if not isinstance(other, TableSchema):
+            return NotImplemented
+        return self is other or (self._hash == other._hash and self.columns == other.columns)
+
+    def __len__(self):
+        return len(self.columns)
+
+    def __iter__(self):
+        return iter(self.columns)
+
+    def column(self, name):
+        """Get a column by name, or None if the table doesn't have it"""
+        if self._by_name is None:
+            self._by_name = {column.name: column for column in self.columns}
+        return self._by_name.get(name)
+
+    def column_names(self):
+        """Get the column names in column order"""
+        return [column.name for column in self.columns]
+
+    def to_dicts(self):
+        """Convert back to a list of column dicts as returned by get_table_schema()"""
+        return [column.to_dict() for column in self.columns]
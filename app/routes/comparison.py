@@ -1,12 +1,24 @@
 """
 Comparison routes for the Database Comparison Tool.
 """
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
-from app.models.database import DatabaseConnection
+from flask import (Blueprint, render_template, request, redirect, url_for, session, flash, jsonify, current_app, Response,
+                   stream_with_context, stream_template, get_flashed_messages)
 from app.models.connection_repository import ConnectionRepository
+from app.models.metadata_cache import metadata_cache
 from app.forms.forms import TableSelectionForm, ColumnSelectionForm, ComparisonTypeForm
-from app.utils.comparison import compare_schemas as compare_table_schemas, compare_data, compare_create_table_scripts
-from app.utils.formatting import format_data_as_html
+from app.utils.comparison import (compare_schemas as compare_table_schemas, compare_data, compare_create_table_scripts,
+                                  compare_data_by_key, compare_data_stream, get_primary_key_columns,
+                                  supports_sort_merge, KeyOrderError,
+                                  compare_row_counts as compare_table_row_counts, compare_database_definitions)
+from app.utils.checksum import compare_data_by_checksum, supports_checksum_comparison
+from app.utils.sampling import compare_data_by_sample, DEFAULT_SAMPLE_SIZE
+from app.utils.parallel import run_schema_comparison, DEFAULT_SCHEMA_WORKERS
+from app.utils.dual_side import DualSide, SideError, run_both, ReadAhead
+from app.utils.fingerprints import fingerprint_store
+from app.utils.jobs import job_manager, FINISHED_STATES, JOB_CANCELLED, JOB_ERROR
+from app.utils.formatting import iter_data_html
+from app.utils.data_diff import save_differences, open_differences, query_differences, save_timings, load_timings
+from app.utils.metrics import metrics, PhaseTimer
 
 import os
 import json
@@ -15,6 +27,12 @@ import tempfile
 
 comparison_bp = Blueprint('comparison', __name__, url_prefix='/comparison')
 
+# Number of rows fetched per round-trip when streaming full tables
+STREAM_BATCH_SIZE = 5000
+
+# Longest pause between messages on a Server-Sent Events stream
+SSE_KEEPALIVE_SECONDS = 15
+
 # Create a temp directory for storing comparison results
 TEMP_DIR = os.path.join(tempfile.gettempdir(), 'db_comparison_results')
 os.makedirs(TEMP_DIR, exist_ok=True)
@@ -25,21 +43,6 @@ def get_temp_file_path(session_id, filename):
     os.makedirs(session_dir, exist_ok=True)
     return os.path.join(session_dir, filename)
 
-def save_comparison_data(session_id, data, filename):
-    """Save comparison data to a temporary file"""
-    file_path = get_temp_file_path(session_id, filename)
-    with open(file_path, 'w') as f:
-        json.dump(data, f)
-    return file_path
-
-def load_comparison_data(session_id, filename):
-    """Load comparison data from a temporary file"""
-    file_path = get_temp_file_path(session_id, filename)
-    if os.path.exists(file_path):
-        with open(file_path, 'r') as f:
-            return json.load(f)
-    return None
-
 def cleanup_temp_files(session_id):
     """Clean up temporary files for a session"""
     session_dir = os.path.join(TEMP_DIR, session_id)
@@ -59,8 +62,8 @@ connection_repository = ConnectionRepository(
 def compare_db_schemas(db1, db2, table1, table2, selected_columns):
     """Compare schemas between two database tables"""
     # Get schema for both tables
-    schema1 = db1.get_table_schema(table1)
-    schema2 = db2.get_table_schema(table2)
+    schema1 = metadata_cache.get_table_schema(db1, table1)
+    schema2 = metadata_cache.get_table_schema(db2, table2)
     
     # Filter schemas to only include selected columns if any are specified
     if selected_columns:
@@ -74,62 +77,142 @@ def compare_db_schemas(db1, db2, table1, table2, selected_columns):
 def compare_db_data(db1, db2, table1, table2, selected_columns, row_limit=50):
     """Compare data between two database tables"""
     # Get data for both tables
-    data1 = db1.get_table_data(table1, columns=selected_columns, limit=row_limit)
-    data2 = db2.get_table_data(table2, columns=selected_columns, limit=row_limit)
+    data1, data2 = run_both(lambda: db1.get_table_data(table1, columns=selected_columns, limit=row_limit),
+                            lambda: db2.get_table_data(table2, columns=selected_columns, limit=row_limit))
     
     # Use the utility function to compare the data
     return compare_data(data1, data2, selected_columns)
 
-def compare_data_directly(data1, data2, selected_columns):
-    """Direct comparison of data between two tables, without using the utility function"""
-    # Create a simple comparison structure
-    differences = []
-    rows_with_differences = 0
-    
-    # Get the minimum number of rows to compare
-    min_rows = min(len(data1['rows']), len(data2['rows']))
-    
-    # Compare each row
-    for i in range(min_rows):
-        row1 = data1['rows'][i]
-        row2 = data2['rows'][i]
-        
-        # Check for differences in this row
-        row_diffs = {}
-        for col in selected_columns:
-            val1 = row1.get(col)
-            val2 = row2.get(col)
-            
-            # Compare values (handle None/NULL)
-            if val1 != val2:
-                row_diffs[col] = {
-                    'source': 'NULL' if val1 is None else str(val1),
-                    'target': 'NULL' if val2 is None else str(val2)
-                }
-        
-        # If differences found, add to the list
-        if row_diffs:
-            differences.append({
-                'row_index': i,
-                'differences': row_diffs
+def compare_table_data(db1, db2, table1, table2, valid_columns, key_columns, row_limit, method='rows', timer=None,
+                       sample_size=DEFAULT_SAMPLE_SIZE):
+    """
+    Compare data between two database tables
+    
+    With a row limit, a sample of rows is fetched from each side and compared in memory.
+    A row limit of 0 compares the full tables by streaming both sides in batches, so
+    memory stays bounded regardless of table size. The 'checksum' method compares the
+    full tables by checksum bisection and only fetches rows from mismatching key ranges.
+    The 'sample' method compares about sample_size rows picked by a hash of their key,
+    the same rows on both sides, and estimates the mismatch rate of the full tables.
+    Fetching and comparing are timed as the data_fetch and compare_data phases of timer.
+    """
+    timer = timer or PhaseTimer()
+    fetch_columns = valid_columns + [col for col in key_columns if col not in valid_columns]
+    order_by = key_columns or None
+    
+    if method == 'checksum':
+        # The bisection interleaves checksum queries with comparing, so it is one phase
+        with timer.phase('compare_data'):
+            comparison_result = compare_data_by_checksum(db1, db2, table1, table2, key_columns[0], fetch_columns,
+                                                         null_text='NULL')
+        comparison_result['columns'] = comparison_result['summary']['columns_compared']
+        record_data_metrics(comparison_result, method, timer)
+        return comparison_result
+    
+    if method == 'sample':
+        # Sizing and fetching the sample both run on the server, so it is one phase too
+        with timer.phase('compare_data'):
+            comparison_result = compare_data_by_sample(db1, db2, table1, table2, key_columns, fetch_columns,
+                                                       sample_size=sample_size, null_text='NULL')
+        record_data_metrics(comparison_result, method, timer)
+        return comparison_result
+    
+    if not row_limit:
+        key_hashed = False
+        if key_columns:
+            with timer.phase('catalog'):
+                schema1, schema2 = run_both(lambda: metadata_cache.get_table_schema(db1, table1),
+                                            lambda: metadata_cache.get_table_schema(db2, table2))
+            key_hashed = not supports_sort_merge(schema1, schema2, key_columns)
+        
+        try:
+            comparison_result = stream_table_data(db1, db2, table1, table2, fetch_columns, valid_columns,
+                                                  key_columns, timer, key_hashed)
+        except KeyOrderError:
+            if key_hashed:
+                raise
+            # The database ordered the keys differently from Python (e.g. trailing spaces)
+            comparison_result = stream_table_data(db1, db2, table1, table2, fetch_columns, valid_columns,
+                                                  key_columns, timer, key_hashed=True)
+        comparison_result['columns'] = fetch_columns
+        record_data_metrics(comparison_result, 'stream', timer)
+        return comparison_result
+    
+    with timer.phase('data_fetch'):
+        data1, data2 = run_both(
+            lambda: db1.get_table_data(table1, columns=fetch_columns, limit=row_limit, order_by=order_by),
+            lambda: db2.get_table_data(table2, columns=fetch_columns, limit=row_limit, order_by=order_by))
+    
+    with timer.phase('compare_data'):
+        if not key_columns:
+            # Fall back to positional comparison when there is no key
+            comparison_result = compare_data_directly(data1, data2, valid_columns)
+        else:
+            # Match rows by key so inserted/deleted rows don't shift the comparison
+            comparison_result = compare_data_by_key(data1, data2, fetch_columns, key_columns, null_text='NULL')
+            comparison_result.update({
+                'columns': fetch_columns,
+                'source_data': data1,
+                'target_data': data2
             })
-            rows_with_differences += 1
+    record_data_metrics(comparison_result, method, timer)
+    return comparison_result
+
+def stream_table_data(db1, db2, table1, table2, fetch_columns, valid_columns, key_columns, timer,
+                      key_hashed=False):
+    """Compare full tables by streaming both sides in batches
+    
+    Rows are aligned by position without key columns and with a sort-merge on the keys
+    otherwise. With key_hashed, both sides are streamed in key hash order instead (see
+    iter_table_data_by_key_hash), for keys the database can't sort the way Python does.
+    """
+    if key_hashed:
+        rows1 = db1.iter_table_data_by_key_hash(table1, fetch_columns, key_columns, batch_size=STREAM_BATCH_SIZE)
+        rows2 = db2.iter_table_data_by_key_hash(table2, fetch_columns, key_columns, batch_size=STREAM_BATCH_SIZE)
+    else:
+        order_by = key_columns or None
+        rows1 = db1.iter_table_data(table1, columns=fetch_columns, batch_size=STREAM_BATCH_SIZE, order_by=order_by)
+        rows2 = db2.iter_table_data(table2, columns=fetch_columns, batch_size=STREAM_BATCH_SIZE, order_by=order_by)
+    
+    # Both sides fetch their next batch in the background while the current ones are
+    # compared; time spent waiting for a batch counts as fetching, the rest as comparing
+    with ReadAhead(rows1) as batches1, ReadAhead(rows2) as batches2, timer.phase('compare_data'):
+        return compare_data_stream(
+            timer.timed_iter('data_fetch', batches1),
+            timer.timed_iter('data_fetch', batches2),
+            fetch_columns,
+            compare_columns=fetch_columns if key_columns else valid_columns,
+            key_columns=key_columns or None,
+            null_text='NULL',
+            key_hashed=key_hashed
+        )
+
+def record_data_metrics(comparison_result, method, timer):
+    """Record the rows fetched and the diff throughput of a data comparison on /metrics"""
+    summary = comparison_result.get('summary', {})
+    if method == 'checksum':
+        metrics.rows_fetched.observe(summary.get('checksum_stats', {}).get('rows_fetched', 0), method=method)
+    else:
+        metrics.rows_fetched.observe(summary.get('source_total_rows', 0), method=method)
+        metrics.rows_fetched.observe(summary.get('target_total_rows', 0), method=method)
+    
+    seconds = timer.seconds('data_fetch', 'compare_data')
+    rows = max(summary.get('source_total_rows', 0), summary.get('target_total_rows', 0))
+    if seconds > 0 and rows:
+        metrics.diff_throughput.observe(rows / seconds, method=method)
+
+def compare_data_directly(data1, data2, selected_columns):
+    """Positional comparison of data between two tables, including the data used for display"""
+    comparison_result = compare_data(data1, data2, selected_columns, null_text='NULL')
+    comparison_result['summary']['columns_compared'] = selected_columns
     
     # Create comparison result structure
-    return {
-        'summary': {
-            'source_total_rows': data1['total_rows'],
-            'target_total_rows': data2['total_rows'],
-            'total_rows_compared': min_rows,
-            'rows_with_differences': rows_with_differences,
-            'columns_compared': selected_columns,
-            'row_count_difference': abs(data1['total_rows'] - data2['total_rows'])
-        },
+    comparison_result.update({
         'columns': selected_columns,
         'source_data': data1,
-        'target_data': data2,
-        'data_differences': differences
-    }
+        'target_data': data2
+    })
+    return comparison_result
 
 @comparison_bp.route('/select_comparison_type', methods=['GET', 'POST'])
 def select_comparison_type():
@@ -159,6 +242,12 @@ def select_comparison_type():
         if form.comparison_type.data == 'schema':
             # Redirect to schema comparison
             return redirect(url_for('comparison.compare_schemas'))
+        elif form.comparison_type.data == 'row_count':
+            # Redirect to row count comparison
+            return redirect(url_for('comparison.compare_row_counts'))
+        elif form.comparison_type.data == 'ddl':
+            # Redirect to DDL comparison
+            return redirect(url_for('comparison.compare_ddl'))
         else:
             # Redirect to table selection for data comparison
             return redirect(url_for('comparison.select_tables'))
@@ -209,251 +298,249 @@ def compare_schemas():
         comparison_in_progress=True
     )
 
-@comparison_bp.route('/api/schema_comparison_progress', methods=['GET'])
-def schema_comparison_progress():
-    """API endpoint to get schema comparison progress and results"""
-    try:
-        # Ensure we have a session ID
-        if 'session_id' not in session:
-            session['session_id'] = str(uuid.uuid4())
-        
-        session_id = session['session_id']
-        
-        # Get connection details from session
-        source_conn = session.get('source_connection')
-        target_conn = session.get('target_connection')
-        
-        # Get comparison metadata from temp storage
-        metadata = load_comparison_data(session_id, 'metadata.json')
-        if metadata:
-            all_tables = metadata.get('all_tables')
-            total_tables = metadata.get('total_tables')
-        else:
-            all_tables = None
-            total_tables = None
-        
-        # If connection details are not in session, try fallback to connection names
-        if not source_conn or not target_conn:
-            conn1_name = session.get('connection1')
-            conn2_name = session.get('connection2')
-            
-            if not conn1_name or not conn2_name:
-                return jsonify({
-                    'status': 'error',
-                    'message': 'Connection details not found in session. Please start a new comparison.'
-                }), 400
-                
-            # Get connection details from repository
-            conn1 = connection_repository.get_connection_by_name(conn1_name)
-            conn2 = connection_repository.get_connection_by_name(conn2_name)
+def get_session_schema_connections():
+    """Get the source and target connection details for a schema comparison from the session
+    
+    Falls back to looking up the selected connection names in the repository and caches
+    the details in the session. Returns (None, None) if they can't be found.
+    """
+    source_conn = session.get('source_connection')
+    target_conn = session.get('target_connection')
+    if source_conn and target_conn:
+        return source_conn, target_conn
+    
+    conn1_name = session.get('connection1')
+    conn2_name = session.get('connection2')
+    if not conn1_name or not conn2_name:
+        return None, None
+    
+    # Get connection details from repository
+    conn1 = connection_repository.get_connection_by_name(conn1_name)
+    conn2 = connection_repository.get_connection_by_name(conn2_name)
+    if not conn1 or not conn2:
+        return None, None
+    
+    source_conn = {
+        'name': conn1['name'],
+        'server': conn1['server'],
+        'database': conn1['database'],
+        'username': conn1['username'],
+        'password': conn1['password'],
+        'driver': conn1['driver']
+    }
+    target_conn = {
+        'name': conn2['name'],
+        'server': conn2['server'],
+        'database': conn2['database'],
+        'username': conn2['username'],
+        'password': conn2['password'],
+        'driver': conn2['driver']
+    }
+    
+    # Store connection details in session for future requests
+    session['source_connection'] = source_conn
+    session['target_connection'] = target_conn
+    return source_conn, target_conn
+
+@comparison_bp.route('/api/schema_comparison/jobs', methods=['POST'])
+def submit_schema_comparison():
+    """API endpoint to start a schema comparison job in the background"""
+    source_conn, target_conn = get_session_schema_connections()
+    if not source_conn or not target_conn:
+        return jsonify({
+            'status': 'error',
+            'message': 'Connection details not found in session. Please start a new comparison.'
+        }), 400
+    
+    # Cancel a comparison still running from an earlier visit to the page
+    if session.get('schema_job_id'):
+        job_manager.cancel(session['schema_job_id'])
+    
+    # Tables unchanged since the last run reuse its results unless a full run is requested
+    full = request.args.get('full', '').lower() in ('1', 'true', 'yes')
+    
+    job_id = job_manager.submit(
+        'schema_comparison', run_schema_comparison, source_conn, target_conn,
+        max_workers=current_app.config.get('SCHEMA_COMPARISON_WORKERS', DEFAULT_SCHEMA_WORKERS),
+        fingerprint_store=fingerprint_store, full=full
+    )
+    session['schema_job_id'] = job_id
+    
+    return jsonify({
+        'status': 'success',
+        'job_id': job_id
+    }), 202
+
+@comparison_bp.route('/api/schema_comparison/jobs/<job_id>', methods=['GET'])
+def schema_comparison_job_status(job_id):
+    """API endpoint to get the state of a schema comparison job"""
+    job_status = job_manager.status(job_id)
+    if not job_status:
+        return jsonify({
+            'status': 'error',
+            'message': 'Comparison job not found. Please start a new comparison.'
+        }), 404
+    
+    return jsonify({
+        'status': 'success',
+        'job': job_status
+    })
+
+@comparison_bp.route('/api/schema_comparison/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_schema_comparison(job_id):
+    """API endpoint to cancel a schema comparison job"""
+    if not job_manager.get(job_id):
+        return jsonify({
+            'status': 'error',
+            'message': 'Comparison job not found.'
+        }), 404
+    
+    cancelled = job_manager.cancel(job_id)
+    return jsonify({
+        'status': 'success',
+        'cancelled': cancelled,
+        'job': job_manager.status(job_id)
+    })
+
+def format_sse(event, data, event_id=None):
+    """Format a Server-Sent Events message"""
+    message = f"event: {event}\n"
+    if event_id is not None:
+        message += f"id: {event_id}\n"
+    return message + f"data: {json.dumps(data)}\n\n"
+
+@comparison_bp.route('/api/schema_comparison/jobs/<job_id>/events', methods=['GET'])
+def schema_comparison_events(job_id):
+    """API endpoint streaming a schema comparison job as Server-Sent Events
+    
+    Sends a 'table' event for every result as soon as it is stored (the event id is
+    the result's position, so a reconnecting EventSource resumes after Last-Event-ID),
+    a 'progress' event whenever progress changes, and a final 'complete' event.
+    """
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({
+            'status': 'error',
+            'message': 'Comparison job not found. Please start a new comparison.'
+        }), 404
+    
+    last_event_id = request.headers.get('Last-Event-ID', request.args.get('last_event_id'))
+    offset = int(last_event_id) + 1 if last_event_id and last_event_id.isdigit() else 0
+    
+    def generate():
+        sent = offset
+        last_progress = None
+        version = None
+        while True:
+            version = job.wait_for_change(version, timeout=SSE_KEEPALIVE_SECONDS)
+            job_status = job.to_dict()
             
-            if not conn1 or not conn2:
-                return jsonify({
-                    'status': 'error',
-                    'message': 'One or both selected connections do not exist.'
-                }), 400
-                
-            # Store connection details in session for future requests
-            source_conn = {
-                'name': conn1['name'],
-                'server': conn1['server'],
-                'database': conn1['database'],
-                'username': conn1['username'],
-                'password': conn1['password'],
-                'driver': conn1['driver']
-            }
-            target_conn = {
-                'name': conn2['name'],
-                'server': conn2['server'],
-                'database': conn2['database'],
-                'username': conn2['username'],
-                'password': conn2['password'],
-                'driver': conn2['driver']
-            }
+            for result in job.get_results(sent):
+                yield format_sse('table', result, sent)
+                sent += 1
             
-            session['source_connection'] = source_conn
-            session['target_connection'] = target_conn
-        
-        # Get the offset parameter for pagination
-        offset = request.args.get('offset', 0, type=int)
-        limit = request.args.get('limit', 25, type=int)  # Process 25 tables per request
-        
-        # Create database connections and process tables if no results yet or continuing pagination
-        if all_tables is None or offset > 0:
-            try:
-                db1 = DatabaseConnection(
-                    server=source_conn['server'],
-                    database=source_conn['database'],
-                    username=source_conn['username'],
-                    password=source_conn['password'],
-                    driver=source_conn['driver']
-                )
-                
-                db2 = DatabaseConnection(
-                    server=target_conn['server'],
-                    database=target_conn['database'],
-                    username=target_conn['username'],
-                    password=target_conn['password'],
-                    driver=target_conn['driver']
-                )
-                
-                # Connect to databases
-                if not db1.connect():
-                    return jsonify({
-                        'status': 'error',
-                        'message': f'Failed to connect to {source_conn["name"]}. Please check your connection details.'
-                    }), 500
-                    
-                if not db2.connect():
-                    db1.disconnect()
-                    return jsonify({
-                        'status': 'error',
-                        'message': f'Failed to connect to {target_conn["name"]}. Please check your connection details.'
-                    }), 500
-                
-                try:
-                    # Get all tables from both databases (only once)
-                    if all_tables is None:
-                        tables1 = db1.get_tables()
-                        tables2 = db2.get_tables()
-                        all_tables = sorted(set(tables1) | set(tables2))
-                        total_tables = len(all_tables)
-                        
-                        # Save metadata to temp file
-                        metadata = {
-                            'all_tables': all_tables,
-                            'total_tables': total_tables,
-                            'processed_offset': 0
-                        }
-                        save_comparison_data(session_id, metadata, 'metadata.json')
-                        
-                        # Initialize results file
-                        save_comparison_data(session_id, [], 'results.json')
-                    
-                    if total_tables == 0:
-                        return jsonify({
-                            'status': 'complete',
-                            'progress': 100,
-                            'processed_tables': 0,
-                            'total_tables': 0,
-                            'current_table': None,
-                            'results': []
-                        })
-                    
-                    # Process only a subset of tables for this request
-                    end_idx = min(offset + limit, total_tables)
-                    tables_to_process = all_tables[offset:end_idx]
-                    
-                    if offset < total_tables:
-                        # Load existing results
-                        schema_comparison = load_comparison_data(session_id, 'results.json') or []
-                        
-                        # Process tables in the current batch
-                        for table_name in tables_to_process:
-                            in_db1 = table_name in db1.get_tables()
-                            in_db2 = table_name in db2.get_tables()
-                            
-                            if in_db1 and in_db2:
-                                # Get schema for both tables
-                                schema1 = db1.get_table_schema(table_name)
-                                schema2 = db2.get_table_schema(table_name)
-                                
-                                # Compare columns
-                                column_comparison = compare_table_schemas(schema1, schema2)
-                                
-                                schema_comparison.append({
-                                    'table_name': table_name,
-                                    'in_db1': True,
-                                    'in_db2': True,
-                                    'columns': column_comparison.get('differences', []),
-                                    'differences': len(column_comparison.get('differences', [])) > 0
-                                })
-                            else:
-                                schema_comparison.append({
-                                    'table_name': table_name,
-                                    'in_db1': in_db1,
-                                    'in_db2': in_db2,
-                                    'columns': [],
-                                    'differences': in_db1 != in_db2
-                                })
-                        
-                        # Update schema_comparison in temp file
-                        save_comparison_data(session_id, schema_comparison, 'results.json')
-                        
-                        # Update processed offset in metadata
-                        metadata['processed_offset'] = end_idx
-                        save_comparison_data(session_id, metadata, 'metadata.json')
-                        
-                    # Calculate progress based on the number of processed tables
-                    processed_tables = min(end_idx, total_tables)
-                    progress = min(100, int((processed_tables / total_tables) * 100))
-                    is_complete = processed_tables >= total_tables
-                    
-                    # Current table being processed
-                    current_table = all_tables[offset] if offset < total_tables else None
-                    
-                    # If comparison is complete, return the full results
-                    results = None
-                    if is_complete:
-                        results = load_comparison_data(session_id, 'results.json')
-                    
-                    # Return the results
-                    return jsonify({
-                        'status': 'in_progress' if not is_complete else 'complete',
-                        'progress': progress,
-                        'processed_tables': processed_tables,
-                        'total_tables': total_tables,
-                        'current_table': current_table,
-                        'next_offset': end_idx if not is_complete else None,
-                        'results': results
-                    })
-                    
-                except Exception as e:
-                    import traceback
-                    traceback.print_exc()
-                    
-                    return jsonify({
-                        'status': 'error',
-                        'message': f'An error occurred during comparison: {str(e)}'
-                    }), 500
-                    
-                finally:
-                    # Disconnect from databases
-                    db1.disconnect()
-                    db2.disconnect()
-                    
-            except Exception as e:
-                return jsonify({
-                    'status': 'error',
-                    'message': f'Failed to initialize database connections: {str(e)}'
-                }), 500
-        else:
-            # We already have metadata from a previous request
-            # Load current results
-            schema_comparison = load_comparison_data(session_id, 'results.json') or []
-            processed_tables = len(schema_comparison)
-            progress = min(100, int((processed_tables / total_tables) * 100))
-            is_complete = processed_tables >= total_tables
+            progress = (job_status['progress'], job_status['processed'], job_status['total'], job_status['current_item'])
+            if progress != last_progress:
+                last_progress = progress
+                yield format_sse('progress', {
+                    'progress': job_status['progress'],
+                    'processed_tables': job_status['processed'],
+                    'total_tables': job_status['total'] or 0,
+                    'current_table': job_status['current_item']
+                })
+            elif job_status['status'] not in FINISHED_STATES:
+                # Comment line to keep proxies from closing an idle stream
+                yield ": keep-alive\n\n"
             
-            # Return the current progress
-            return jsonify({
-                'status': 'in_progress' if not is_complete else 'complete',
-                'progress': progress,
-                'processed_tables': processed_tables,
-                'total_tables': total_tables,
-                'current_table': all_tables[offset] if offset < len(all_tables) else None,
-                'next_offset': offset + limit if not is_complete else None,
-                'results': schema_comparison if is_complete else None
-            })
-            
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        
+            if job_status['status'] in FINISHED_STATES:
+                yield format_sse('complete', {
+                    'status': job_status['status'],
+                    'error': job_status['error'],
+                    'total_results': sent
+                })
+                return
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@comparison_bp.route('/api/schema_comparison_progress', methods=['GET'])
+def schema_comparison_progress():
+    """API endpoint to get schema comparison progress and results
+    
+    Reads the state of the background comparison job; the comparison itself runs on
+    the job workers. Results from offset onwards are returned as partial_results.
+    """
+    job_id = request.args.get('job_id') or session.get('schema_job_id')
+    job = job_manager.get(job_id) if job_id else None
+    if not job:
+        return jsonify({
+            'status': 'error',
+            'message': 'Comparison job not found. Please start a new comparison.'
+        }), 404
+    
+    offset = max(0, request.args.get('offset', 0, type=int))
+    job_status = job.to_dict()
+    
+    if job_status['status'] == JOB_ERROR:
         return jsonify({
             'status': 'error',
-            'message': f'An unexpected error occurred: {str(e)}'
+            'message': f"An error occurred during comparison: {job_status['error']}"
         }), 500
+    
+    is_complete = job_status['status'] in FINISHED_STATES
+    partial_results = job.get_results(offset)
+    
+    return jsonify({
+        'status': 'complete' if is_complete else 'in_progress',
+        'job_id': job.id,
+        'cancelled': job_status['status'] == JOB_CANCELLED,
+        'progress': job_status['progress'],
+        'processed_tables': job_status['processed'],
+        'total_tables': job_status['total'] or 0,
+        'current_table': job_status['current_item'],
+        'next_offset': offset + len(partial_results),
+        'partial_results': partial_results,
+        'results': partial_results if is_complete and offset == 0 else None
+    })
+
+@comparison_bp.route('/api/schema_comparison/jobs/<job_id>/results', methods=['GET'])
+def schema_comparison_job_results(job_id):
+    """API endpoint to get a range of a schema comparison job's results"""
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({
+            'status': 'error',
+            'message': 'Comparison job not found.'
+        }), 404
+    
+    offset = max(0, request.args.get('offset', 0, type=int))
+    limit = request.args.get('limit', 100, type=int)
+    results = job.get_results(offset, limit)
+    
+    return jsonify({
+        'status': 'success',
+        'offset': offset,
+        'total_results': job.result_count,
+        'results': results
+    })
+
+@comparison_bp.route('/api/schema_comparison/jobs/<job_id>/results/<table_name>', methods=['GET'])
+def schema_comparison_table_result(job_id, table_name):
+    """API endpoint to get the schema comparison result of a single table"""
+    job = job_manager.get(job_id)
+    result = job.result_store.get(table_name) if job and job.result_store is not None else None
+    if not result:
+        return jsonify({
+            'status': 'error',
+            'message': f'No comparison result for table {table_name}.'
+        }), 404
+    
+    return jsonify({
+        'status': 'success',
+        'result': result
+    })
 
 @comparison_bp.route('/api/create_table_script/<table_name>', methods=['GET'])
 def get_create_table_script(table_name):
@@ -468,41 +555,19 @@ def get_create_table_script(table_name):
             'message': 'Connection details not found in session'
         }), 400
     
-    # Create database connections
-    db1 = DatabaseConnection(
-        server=conn1['server'],
-        database=conn1['database'],
-        username=conn1['username'],
-        password=conn1['password'],
-        driver=conn1['driver']
-    )
-    
-    db2 = DatabaseConnection(
-        server=conn2['server'],
-        database=conn2['database'],
-        username=conn2['username'],
-        password=conn2['password'],
-        driver=conn2['driver']
-    )
-    
-    # Connect to databases
-    if not db1.connect():
-        return jsonify({
-            'status': 'error',
-            'message': f'Failed to connect to {conn1["name"]}. Please check your connection details.'
-        }), 500
-        
-    if not db2.connect():
-        db1.disconnect()
+    # Connect to both databases at once
+    dual = DualSide(conn1, conn2)
+    try:
+        dual.connect()
+    except SideError as e:
         return jsonify({
             'status': 'error',
-            'message': f'Failed to connect to {conn2["name"]}. Please check your connection details.'
+            'message': str(e)
         }), 500
     
     try:
         # Get CREATE TABLE scripts for the table from both databases
-        script1 = db1.get_create_table_script(table_name)
-        script2 = db2.get_create_table_script(table_name)
+        script1, script2 = dual.each(lambda db: db.get_create_table_script(table_name))
         
         # Compare the scripts
         script_comparison = compare_create_table_scripts(script1, script2)
@@ -524,8 +589,7 @@ def get_create_table_script(table_name):
         
     finally:
         # Disconnect from databases
-        db1.disconnect()
-        db2.disconnect()
+        dual.disconnect()
 
 @comparison_bp.route('/schema/scripts/<table_name>', methods=['GET'])
 def get_table_scripts(table_name):
@@ -582,39 +646,17 @@ def get_table_scripts(table_name):
             session['target_connection'] = target_conn
         
         # Create database connections
-        db1 = DatabaseConnection(
-            server=source_conn['server'],
-            database=source_conn['database'],
-            username=source_conn['username'],
-            password=source_conn['password'],
-            driver=source_conn['driver']
-        )
+        dual = DualSide(source_conn, target_conn)
         
-        db2 = DatabaseConnection(
-            server=target_conn['server'],
-            database=target_conn['database'],
-            username=target_conn['username'],
-            password=target_conn['password'],
-            driver=target_conn['driver']
-        )
-        
-        source_script = None
-        target_script = None
+        def load_script(db):
+            # A side that can't connect or lacks the table just has no script
+            if db.connect() and table_name in metadata_cache.get_tables(db):
+                return db.get_create_table_script(table_name)
+            return None
         
         try:
-            # Connect to source database
-            if db1.connect():
-                # Check if table exists in source
-                tables1 = db1.get_tables()
-                if table_name in tables1:
-                    source_script = db1.get_create_table_script(table_name)
-            
-            # Connect to target database
-            if db2.connect():
-                # Check if table exists in target
-                tables2 = db2.get_tables()
-                if table_name in tables2:
-                    target_script = db2.get_create_table_script(table_name)
+            # Load the script from both databases at once
+            source_script, target_script = dual.each(load_script)
             
             return jsonify({
                 'status': 'success',
@@ -633,8 +675,7 @@ def get_table_scripts(table_name):
             
         finally:
             # Disconnect from databases
-            db1.disconnect()
-            db2.disconnect()
+            dual.disconnect()
             
     except Exception as e:
         return jsonify({
@@ -642,9 +683,9 @@ def get_table_scripts(table_name):
             'message': f'Failed to initialize database connections: {str(e)}'
         }), 500
 
-@comparison_bp.route('/select_tables', methods=['GET', 'POST'])
-def select_tables():
-    """Select tables to compare"""
+@comparison_bp.route('/compare_row_counts', methods=['GET'])
+def compare_row_counts():
+    """Compare the row counts of every table in both databases"""
     # Get connection names from session
     conn1_name = session.get('connection1')
     conn2_name = session.get('connection2')
@@ -661,37 +702,120 @@ def select_tables():
         flash('One or both selected connections do not exist.', 'danger')
         return redirect(url_for('main.index'))
     
-    # Create database connections
-    db1 = DatabaseConnection(
-        server=conn1['server'],
-        database=conn1['database'],
-        username=conn1['username'],
-        password=conn1['password'],
-        driver=conn1['driver']
-    )
+    # Metadata counts are instant; exact counts scan every table
+    exact = request.args.get('exact', '').lower() in ('1', 'true', 'yes')
     
-    db2 = DatabaseConnection(
-        server=conn2['server'],
-        database=conn2['database'],
-        username=conn2['username'],
-        password=conn2['password'],
-        driver=conn2['driver']
-    )
+    # Connect to both databases at once
+    dual = DualSide(conn1, conn2)
+    try:
+        dual.connect()
+    except SideError as e:
+        flash(str(e), 'danger')
+        return redirect(url_for('main.index'))
+    
+    try:
+        row_counts1, row_counts2 = dual.each(lambda db: db.get_row_counts(exact=exact))
+        comparison = compare_table_row_counts(row_counts1, row_counts2)
+        
+        return render_template(
+            'row_count_comparison.html',
+            conn1=conn1,
+            conn2=conn2,
+            exact=exact,
+            tables=comparison['tables'],
+            summary=comparison['summary']
+        )
+    
+    except Exception as e:
+        flash(f'Error comparing row counts: {str(e)}', 'danger')
+        return redirect(url_for('comparison.select_comparison_type'))
+    
+    finally:
+        dual.disconnect()
+
+@comparison_bp.route('/compare_ddl', methods=['GET'])
+def compare_ddl():
+    """Compare the CREATE TABLE scripts of every table in both databases"""
+    # Get connection names from session
+    conn1_name = session.get('connection1')
+    conn2_name = session.get('connection2')
+    
+    if not conn1_name or not conn2_name:
+        flash('Please select two connections to compare.', 'danger')
+        return redirect(url_for('main.index'))
+    
+    # Get connection details from repository
+    conn1 = connection_repository.get_connection_by_name(conn1_name)
+    conn2 = connection_repository.get_connection_by_name(conn2_name)
     
-    # Connect to databases
-    if not db1.connect():
-        flash(f'Failed to connect to {conn1["name"]}. Please check your connection details.', 'danger')
+    if not conn1 or not conn2:
+        flash('One or both selected connections do not exist.', 'danger')
         return redirect(url_for('main.index'))
+    
+    # Connect to both databases at once
+    dual = DualSide(conn1, conn2)
+    try:
+        dual.connect()
+    except SideError as e:
+        flash(str(e), 'danger')
+        return redirect(url_for('main.index'))
+    
+    try:
+        # Three catalog queries per database, however many tables there are; scripts
+        # are only built for the tables whose structure differs
+        definitions1, definitions2 = dual.each(lambda db: db.get_table_definitions())
+        comparison = compare_database_definitions(
+            definitions1,
+            definitions2,
+            lambda table_name, definition: dual.db1.build_create_table_script(
+                table_name, definition['columns'], definition['foreign_keys'], definition['indexes'])
+        )
         
-    if not db2.connect():
-        db1.disconnect()
-        flash(f'Failed to connect to {conn2["name"]}. Please check your connection details.', 'danger')
+        return render_template(
+            'ddl_comparison.html',
+            conn1=conn1,
+            conn2=conn2,
+            tables=comparison['tables'],
+            summary=comparison['summary']
+        )
+    
+    except Exception as e:
+        flash(f'Error comparing table definitions: {str(e)}', 'danger')
+        return redirect(url_for('comparison.select_comparison_type'))
+    
+    finally:
+        dual.disconnect()
+
+@comparison_bp.route('/select_tables', methods=['GET', 'POST'])
+def select_tables():
+    """Select tables to compare"""
+    # Get connection names from session
+    conn1_name = session.get('connection1')
+    conn2_name = session.get('connection2')
+    
+    if not conn1_name or not conn2_name:
+        flash('Please select two connections to compare.', 'danger')
+        return redirect(url_for('main.index'))
+    
+    # Get connection details from repository
+    conn1 = connection_repository.get_connection_by_name(conn1_name)
+    conn2 = connection_repository.get_connection_by_name(conn2_name)
+    
+    if not conn1 or not conn2:
+        flash('One or both selected connections do not exist.', 'danger')
+        return redirect(url_for('main.index'))
+    
+    # Connect to both databases at once
+    dual = DualSide(conn1, conn2)
+    try:
+        dual.connect()
+    except SideError as e:
+        flash(str(e), 'danger')
         return redirect(url_for('main.index'))
     
     try:
         # Get tables from both databases
-        tables1 = db1.get_tables()
-        tables2 = db2.get_tables()
+        tables1, tables2 = dual.each(metadata_cache.get_tables)
         
         # Create form with dynamic choices
         form = TableSelectionForm()
@@ -721,8 +845,7 @@ def select_tables():
         
     finally:
         # Disconnect from databases
-        db1.disconnect()
-        db2.disconnect()
+        dual.disconnect()
 
 @comparison_bp.route('/select_columns', methods=['GET', 'POST'])
 def select_columns():
@@ -745,37 +868,19 @@ def select_columns():
         flash('One or both selected connections do not exist.', 'danger')
         return redirect(url_for('main.index'))
     
-    # Create database connections
-    db1 = DatabaseConnection(
-        server=conn1['server'],
-        database=conn1['database'],
-        username=conn1['username'],
-        password=conn1['password'],
-        driver=conn1['driver']
-    )
-    
-    db2 = DatabaseConnection(
-        server=conn2['server'],
-        database=conn2['database'],
-        username=conn2['username'],
-        password=conn2['password'],
-        driver=conn2['driver']
-    )
-    
-    # Connect to databases
-    if not db1.connect():
-        flash(f'Failed to connect to {conn1["name"]}. Please check your connection details.', 'danger')
-        return redirect(url_for('main.index'))
-        
-    if not db2.connect():
-        db1.disconnect()
-        flash(f'Failed to connect to {conn2["name"]}. Please check your connection details.', 'danger')
+    # Connect to both databases at once
+    dual = DualSide(conn1, conn2)
+    try:
+        dual.connect()
+    except SideError as e:
+        flash(str(e), 'danger')
         return redirect(url_for('main.index'))
+    db1, db2 = dual.db1, dual.db2
     
     try:
         # Get schema for both tables
-        schema1 = db1.get_table_schema(table1)
-        schema2 = db2.get_table_schema(table2)
+        schema1, schema2 = dual.run(lambda: metadata_cache.get_table_schema(db1, table1),
+                                    lambda: metadata_cache.get_table_schema(db2, table2))
         
         # Extract column names
         columns1 = [col['name'] for col in schema1]
@@ -790,11 +895,17 @@ def select_columns():
             selected_columns = request.form.getlist('columns')
             row_limit = int(request.form.get('row_limit', 50))
             compare_data = request.form.get('compare_data') == 'on'
+            key_columns = request.form.getlist('key_columns')
+            comparison_method = request.form.get('comparison_method', 'rows')
+            sample_size = int(request.form.get('sample_size', DEFAULT_SAMPLE_SIZE))
             
             # Store in session
             session['selected_columns'] = selected_columns
             session['row_limit'] = row_limit
             session['compare_data'] = compare_data
+            session['key_columns'] = key_columns
+            session['comparison_method'] = comparison_method
+            session['sample_size'] = sample_size
             
             # Redirect to comparison results
             return redirect(url_for('comparison.compare_results'))
@@ -815,6 +926,7 @@ def select_columns():
             only_in_table2=list(set(columns2) - set(columns1)),
             source_schema=schema1,
             target_schema=schema2,
+            primary_key_columns=[col for col in get_primary_key_columns(schema1) if col in common_columns],
             source_connection=conn1['name'],
             target_connection=conn2['name']
         )
@@ -825,8 +937,7 @@ def select_columns():
         
     finally:
         # Disconnect from databases
-        db1.disconnect()
-        db2.disconnect()
+        dual.disconnect()
 
 @comparison_bp.route('/compare_results', methods=['GET'])
 def compare_results():
@@ -858,37 +969,24 @@ def compare_results():
         flash('One or both selected connections do not exist.', 'danger')
         return redirect(url_for('main.index'))
     
-    # Create database connections
-    db1 = DatabaseConnection(
-        server=conn1['server'],
-        database=conn1['database'],
-        username=conn1['username'],
-        password=conn1['password'],
-        driver=conn1['driver']
-    )
-    
-    db2 = DatabaseConnection(
-        server=conn2['server'],
-        database=conn2['database'],
-        username=conn2['username'],
-        password=conn2['password'],
-        driver=conn2['driver']
-    )
+    # Time each phase of the comparison for the page and /metrics
+    timer = PhaseTimer()
     
-    # Connect to databases
-    if not db1.connect():
-        flash(f'Failed to connect to {conn1["name"]}. Please check your connection details.', 'danger')
-        return redirect(url_for('main.index'))
-        
-    if not db2.connect():
-        db1.disconnect()
-        flash(f'Failed to connect to {conn2["name"]}. Please check your connection details.', 'danger')
+    # Connect to both databases at once
+    dual = DualSide(conn1, conn2)
+    try:
+        with timer.phase('connect'):
+            dual.connect()
+    except SideError as e:
+        flash(str(e), 'danger')
         return redirect(url_for('main.index'))
+    db1, db2 = dual.db1, dual.db2
     
     try:
         # Verify selected columns exist in both tables
-        schema1 = db1.get_table_schema(table1)
-        schema2 = db2.get_table_schema(table2)
+        with timer.phase('catalog'):
+            schema1, schema2 = dual.run(lambda: metadata_cache.get_table_schema(db1, table1),
+                                        lambda: metadata_cache.get_table_schema(db2, table2))
         
         columns1 = [col['name'] for col in schema1]
         columns2 = [col['name'] for col in schema2]
@@ -902,48 +1000,37 @@ def compare_results():
         
         print(f"DEBUG: Valid columns for comparison: {valid_columns}")
         
+        # Align rows on the chosen key columns, defaulting to the source primary key
+        key_columns = session.get('key_columns')
+        if key_columns is None:
+            key_columns = get_primary_key_columns(schema1)
+        key_columns = [col for col in key_columns if col in columns1 and col in columns2]
+        
+        comparison_method = session.get('comparison_method', 'rows')
+        if comparison_method == 'checksum' and not supports_checksum_comparison(schema1, schema2, key_columns):
+            flash('Checksum comparison needs a single integer key column; comparing fetched rows instead.', 'warning')
+            comparison_method = 'rows'
+        if comparison_method == 'sample' and not key_columns:
+            flash('Sampling needs key columns to pick the same rows on both sides; comparing fetched rows instead.',
+                  'warning')
+            comparison_method = 'rows'
+        
         # Get data for both tables with valid columns
         try:
-            data1 = db1.get_table_data(table1, columns=valid_columns, limit=row_limit)
-            data2 = db2.get_table_data(table2, columns=valid_columns, limit=row_limit)
+            comparison_result = compare_table_data(db1, db2, table1, table2, valid_columns, key_columns, row_limit,
+                                                   method=comparison_method, timer=timer,
+                                                   sample_size=session.get('sample_size', DEFAULT_SAMPLE_SIZE))
             
-            print(f"DEBUG: Data1 keys: {data1.keys() if data1 else 'None'}")
-            print(f"DEBUG: Data2 keys: {data2.keys() if data2 else 'None'}")
-            print(f"DEBUG: Data1 columns: {data1.get('columns', [])}")
-            print(f"DEBUG: Data2 columns: {data2.get('columns', [])}")
-            print(f"DEBUG: Data1 row count: {data1.get('total_rows', 0)}")
-            print(f"DEBUG: Data2 row count: {data2.get('total_rows', 0)}")
+            # Keep the differences for the paged data diff API; the page renders them on demand
+            with timer.phase('persist'):
+                diff_id = save_differences(comparison_result.get('data_differences', []))
             
-            try:
-                # Try using our direct comparison function
-                comparison_result = compare_data_directly(data1, data2, valid_columns)
-                print(f"DEBUG: Direct comparison result: {comparison_result.keys()}")
-            except Exception as compare_error:
-                print(f"DEBUG: Error in direct comparison: {str(compare_error)}")
-                # Fall back to a very simple structure
-                comparison_result = {
-                    'summary': {
-                        'source_total_rows': data1.get('total_rows', 0),
-                        'target_total_rows': data2.get('total_rows', 0),
-                        'total_rows_compared': 0,
-                        'rows_with_differences': 0,
-                        'columns_compared': valid_columns,
-                        'row_count_difference': abs(data1.get('total_rows', 0) - data2.get('total_rows', 0))
-                    },
-                    'columns': valid_columns,
-                    'data_differences': []
-                }
-                print(f"DEBUG: Fallback comparison created with keys: {comparison_result.keys()}")
+            # Pop the flashed messages now: the session cookie is sent before the streamed page
+            # renders them, so popping them while streaming would not be saved
+            get_flashed_messages(with_categories=True)
             
-            # Format data for display
-            try:
-                formatted_data = format_data_as_html(comparison_result)
-                print(f"DEBUG: Formatted data length: {len(formatted_data)}")
-            except Exception as format_error:
-                print(f"DEBUG: Error formatting data: {str(format_error)}")
-                formatted_data = "<div class='alert alert-warning'>Error formatting comparison data.</div>"
-            
-            return render_template(
+            # Stream the page so the summary is sent while the row tables are still being formatted
+            return Response(stream_template(
                 'data_comparison.html', 
                 conn1=conn1, 
                 conn2=conn2,
@@ -951,8 +1038,9 @@ def compare_results():
                 table2=table2,
                 selected_columns=valid_columns,
                 comparison_result=comparison_result,
-                formatted_data=formatted_data
-            )
+                formatted_data=iter_formatted_data(comparison_result, timer, diff_id),
+                diff_id=diff_id
+            ), mimetype='text/html')
             
         except Exception as e:
             print(f"DEBUG: Error in data comparison: {str(e)}")
@@ -966,5 +1054,57 @@ def compare_results():
         
     finally:
         # Disconnect from databases
-        db1.disconnect()
-        db2.disconnect()
+        dual.disconnect()
+
+def iter_formatted_data(comparison_result, timer=None, diff_id=None):
+    """Format a data comparison result as HTML chunks for a streamed page
+    
+    With a timer, formatting is timed as the format phase. Once the last chunk is
+    formatted the timer is finished and its breakdown is stored in the result's
+    'timings' (for the rest of the page) and next to the stored differences.
+    """
+    timer = timer or PhaseTimer()
+    try:
+        yield from timer.timed_iter('format', iter_data_html(comparison_result, include_details=False))
+    except Exception as format_error:
+        print(f"DEBUG: Error formatting data: {str(format_error)}")
+        yield "<div class='alert alert-warning'>Error formatting comparison data.</div>"
+    
+    comparison_result['timings'] = timer.finish()
+    if diff_id:
+        save_timings(diff_id, comparison_result['timings'])
+
+@comparison_bp.route('/api/data_diff/<diff_id>', methods=['GET'])
+def data_diff_page(diff_id):
+    """API endpoint to get one page of a data comparison's differences
+    
+    Query parameters: offset, limit (at most 1000), sort (row, column, status, source
+    or target), order (asc or desc), column, status and search.
+    """
+    store = open_differences(diff_id)
+    if store is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Comparison differences not found. Please run the comparison again.'
+        }), 404
+    
+    offset = request.args.get('offset', 0, type=int)
+    limit = min(request.args.get('limit', 100, type=int), 1000)
+    page = query_differences(
+        store,
+        search=request.args.get('search', '').strip() or None,
+        column=request.args.get('column') or None,
+        status=request.args.get('status') or None,
+        sort=request.args.get('sort') or None,
+        descending=request.args.get('order') == 'desc',
+        offset=offset,
+        limit=limit
+    )
+    
+    return jsonify({
+        'status': 'success',
+        'offset': max(0, offset),
+        'total': page['total'],
+        'records': page['records'],
+        'timings': load_timings(diff_id)
+    })
@@ -4,7 +4,7 @@ Connection management routes for the Database Comparison Tool.
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash
 from app.forms.forms import ConnectionForm
 from app.models.connection_repository import ConnectionRepository
-from app.models.database import DatabaseConnection
+from app.models.database import create_connection
 
 connections_bp = Blueprint('connections', __name__, url_prefix='/connections')
 
@@ -152,13 +152,7 @@ def test_connection(connection_name):
         return redirect(url_for('connections.list_connections'))
     
     # Create database connection
-    db = DatabaseConnection(
-        server=connection['server'],
-        database=connection['database'],
-        username=connection['username'],
-        password=connection['password'],
-        driver=connection['driver']
-    )
+    db = create_connection(connection)
     
     # Try to connect
     success = db.connect()
@@ -1,10 +1,12 @@
 """
 Main routes for CORAL - Database Comparison Tool.
 """
-from flask import Blueprint, render_template, session, redirect, url_for, request
+from flask import Blueprint, render_template, session, redirect, url_for, request, Response
 
 from app.forms.forms import DatabaseSelectionForm
 from app.models.connection_repository import ConnectionRepository
+from app.models.connection_pool import connection_pool
+from app.utils.metrics import metrics
 
 main_bp = Blueprint('main', __name__)
 
@@ -49,3 +51,8 @@ def index():
             return redirect(url_for('comparison.select_comparison_type'))
     
     return render_template('index.html', form=form, connections=all_connections, no_connections=no_connections)
+
+@main_bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Request, query and comparison metrics plus connection pool metrics in the Prometheus text format"""
+    return Response(metrics.render(connection_pool.get_metrics()), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,132 @@
+"""
+Checksum bisection for comparing large tables without transferring their rows.
+"""
+from app.utils.comparison import compare_data_by_key
+from app.utils.dual_side import run_both
+
+# Key types that support the range arithmetic used for bucketing
+INTEGER_KEY_TYPES = ('tinyint', 'smallint', 'int', 'bigint', 'integer')
+
+def supports_checksum_comparison(schema1, schema2, key_columns):
+    """Check whether two tables can be compared by checksum bisection (single integer key on both sides)"""
+    if len(key_columns) != 1:
+        return False
+    for schema in (schema1, schema2):
+        column_types = {col['name']: col['type'] for col in schema}
+        if column_types.get(key_columns[0]) not in INTEGER_KEY_TYPES:
+            return False
+    return True
+
+def compare_data_by_checksum(db1, db2, table1, table2, key_column, columns,
+                             bucket_count=16, leaf_rows=1000, max_differences=1000, null_text='None'):
+    """
+    Compare two tables by recursively bisecting key ranges whose checksums differ
+
+    Both sides compute a row count and aggregate checksums per key-range bucket on the
+    server. Only buckets whose (count, checksums) differ are split further, and actual
+    rows are fetched only for mismatching buckets small enough to be leaves. On mostly
+    identical tables this transfers a few checksum rows instead of the tables themselves.
+    Each round of queries runs on both sides concurrently.
+
+    Args:
+        db1 (DatabaseConnection): Source connection
+        db2 (DatabaseConnection): Target connection
+        table1 (str): Source table name
+        table2 (str): Target table name
+        key_column (str): Integer key column used to partition the tables
+        columns (list): Columns to compare
+        bucket_count (int): Number of buckets each range is split into
+        leaf_rows (int): Maximum rows in a bucket before its rows are fetched directly
+        max_differences (int): Maximum number of difference entries to keep
+        null_text (str): Text used to display NULL values in the differences
+
+    Returns:
+        dict: Comparison result with the same shape as compare_data_by_key, plus
+            'checksum_stats' in the summary describing the work done
+    """
+    columns = list(columns)
+    if key_column not in columns:
+        columns = [key_column] + columns
+
+    stats = {
+        'checksum_queries': 0,
+        'buckets_compared': 0,
+        'buckets_mismatched': 0,
+        'leaf_ranges_fetched': 0,
+        'rows_fetched': 0
+    }
+
+    (low1, high1), (low2, high2) = run_both(lambda: db1.get_key_range(table1, key_column),
+                                            lambda: db2.get_key_range(table2, key_column))
+    bounds = [value for value in (low1, high1, low2, high2) if value is not None]
+
+    source_total_rows = 0
+    target_total_rows = 0
+    leaves = []
+
+    if bounds:
+        pending = [(min(bounds), max(bounds))]
+        top_level = True
+        while pending:
+            lower, upper = pending.pop()
+            width = max(1, -(-(upper - lower + 1) // bucket_count))
+
+            buckets1, buckets2 = run_both(
+                lambda: db1.get_bucket_checksums(table1, key_column, columns, lower, upper, width),
+                lambda: db2.get_bucket_checksums(table2, key_column, columns, lower, upper, width))
+            stats['checksum_queries'] += 2
+
+            if top_level:
+                source_total_rows = sum(bucket[0] for bucket in buckets1.values())
+                target_total_rows = sum(bucket[0] for bucket in buckets2.values())
+                top_level = False
+
+            for bucket in sorted(set(buckets1) | set(buckets2)):
+                stats['buckets_compared'] += 1
+                checksum1 = buckets1.get(bucket)
+                checksum2 = buckets2.get(bucket)
+                if checksum1 == checksum2:
+                    continue
+
+                stats['buckets_mismatched'] += 1
+                bucket_lower = lower + bucket * width
+                bucket_upper = min(upper, bucket_lower + width - 1)
+                bucket_rows = max(checksum1[0] if checksum1 else 0, checksum2[0] if checksum2 else 0)
+
+                if bucket_rows <= leaf_rows or bucket_lower == bucket_upper:
+                    leaves.append((bucket_lower, bucket_upper))
+                else:
+                    pending.append((bucket_lower, bucket_upper))
+
+    # Fetch and diff the rows of the mismatching leaf ranges only
+    differences = []
+    counts = {'modified': 0, 'deleted': 0, 'inserted': 0}
+    for lower, upper in sorted(leaves):
+        data1, data2 = run_both(lambda: db1.get_rows_in_key_range(table1, columns, key_column, lower, upper),
+                                lambda: db2.get_rows_in_key_range(table2, columns, key_column, lower, upper))
+        stats['leaf_ranges_fetched'] += 1
+        stats['rows_fetched'] += data1['total_rows'] + data2['total_rows']
+
+        leaf_result = compare_data_by_key(data1, data2, columns, [key_column], null_text)
+        for status in counts:
+            counts[status] += leaf_result['summary'][f'rows_{status}']
+        differences.extend(leaf_result['data_differences'][:max(0, max_differences - len(differences))])
+
+    rows_with_differences = counts['modified'] + counts['deleted'] + counts['inserted']
+    return {
+        'summary': {
+            'source_total_rows': source_total_rows,
+            'target_total_rows': target_total_rows,
+            'total_rows_compared': source_total_rows - counts['deleted'],
+            'rows_with_differences': rows_with_differences,
+            'columns_compared': columns,
+            'row_count_difference': abs(source_total_rows - target_total_rows),
+            'key_columns': [key_column],
+            'rows_modified': counts['modified'],
+            'rows_deleted': counts['deleted'],
+            'rows_inserted': counts['inserted'],
+            'differences_truncated': rows_with_differences > len(differences),
+            'checksum_stats': stats
+        },
+        'data_differences': differences
+    }
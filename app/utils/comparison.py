@@ -3,87 +3,60 @@ Utility functions for database comparison.
 """
 import pandas as pd
 import numpy as np
-from deepdiff import DeepDiff
 import difflib
+import hashlib
 import html
+from itertools import chain, groupby, islice
+from operator import itemgetter
+
+from app.models.schema import TableSchema
 
 def compare_schemas(schema1, schema2):
-    """Compare two table schemas and return differences using DeepDiff"""
-    # Extract column names from each schema
-    columns1 = [col['name'] for col in schema1]
-    columns2 = [col['name'] for col in schema2]
-    
-    # Find common columns and columns only in one schema
-    common_columns = list(set(columns1) & set(columns2))
-    only_in_schema1 = list(set(columns1) - set(columns2))
-    only_in_schema2 = list(set(columns2) - set(columns1))
+    """
+    Compare two table schemas and return their column differences
+
+    The schemas can be lists of column dicts or TableSchema models. Identical schemas
+    are recognized by their hash without comparing columns; otherwise the common
+    columns are compared property by property.
+    """
+    table1 = TableSchema.from_columns(None, schema1)
+    table2 = TableSchema.from_columns(None, schema2)
     
-    # Create dictionaries for comparison (using column name as key)
-    schema1_dict = {col['name']: col for col in schema1}
-    schema2_dict = {col['name']: col for col in schema2}
+    # Extract column names from each schema
+    columns1 = table1.column_names()
+    columns2 = table2.column_names()
     
-    # Filter for common columns only
-    schema1_common = {k: v for k, v in schema1_dict.items() if k in common_columns}
-    schema2_common = {k: v for k, v in schema2_dict.items() if k in common_columns}
+    if table1 == table2:
+        return {
+            'common_columns': columns1,
+            'only_in_source': [],
+            'only_in_target': [],
+            'differences': [],
+            'total_columns_schema1': len(columns1),
+            'total_columns_schema2': len(columns2),
+            'identical_columns': len(columns1)
+        }
     
-    # Compare with DeepDiff for more detailed comparison
-    diff = DeepDiff(schema1_common, schema2_common, verbose_level=2)
+    # Find common columns and columns only in one schema
+    names1 = set(columns1)
+    names2 = set(columns2)
+    common_columns = [name for name in columns1 if name in names2]
+    only_in_schema1 = [name for name in columns1 if name not in names2]
+    only_in_schema2 = [name for name in columns2 if name not in names1]
     
-    # Process differences into our existing format
     differences = []
     for col_name in common_columns:
-        col1 = schema1_dict.get(col_name)
-        col2 = schema2_dict.get(col_name)
-        
-        # Extract differences for this column
-        col_diffs = []
-        
-        # Check for critical properties first to maintain backward compatibility
-        # This is important to ensure we match the expectations of existing tests
-        if col1['formatted_data_type'] != col2['formatted_data_type']:
-            col_diffs.append(f"Data type: {col1['formatted_data_type']} vs {col2['formatted_data_type']}")
-        
-        if col1['is_nullable'] != col2['is_nullable']:
-            col_diffs.append(f"Nullable: {col1['is_nullable']} vs {col2['is_nullable']}")
-        
-        if col1['is_identity'] != col2['is_identity']:
-            col_diffs.append(f"Identity: {col1['is_identity']} vs {col2['is_identity']}")
-        
-        if col1['is_primary_key'] != col2['is_primary_key']:
-            col_diffs.append(f"Primary Key: {col1['is_primary_key']} vs {col2['is_primary_key']}")
-        
-        # Now add other differences from DeepDiff that we didn't already capture
-        # Check for type changes
-        type_changes = diff.get('type_changes', {})
-        for path, change in type_changes.items():
-            if path.startswith(f"root['{col_name}']"):
-                prop = path.split("']['")[-1].rstrip("']")
-                # Skip properties we already checked above
-                if prop not in ['formatted_data_type', 'is_nullable', 'is_identity', 'is_primary_key']:
-                    col_diffs.append(f"{prop}: {change['old_value']} vs {change['new_value']}")
-        
-        # Check for value changes
-        value_changes = diff.get('values_changed', {})
-        for path, change in value_changes.items():
-            if path.startswith(f"root['{col_name}']"):
-                prop = path.split("']['")[-1].rstrip("']")
-                # Skip properties we already checked above
-                if prop not in ['formatted_data_type', 'is_nullable', 'is_identity', 'is_primary_key']:
-                    col_diffs.append(f"{prop}: {change['old_value']} vs {change['new_value']}")
-        
-        # Also check for nested changes that DeepDiff can detect
-        for change_type in ['dictionary_item_added', 'dictionary_item_removed', 'iterable_item_added', 'iterable_item_removed']:
-            changes = diff.get(change_type, {})
-            for path in changes:
-                if path.startswith(f"root['{col_name}']"):
-                    parts = path.replace(f"root['{col_name}']", "").strip("[]'")
-                    col_diffs.append(f"Structure change: {change_type} at {parts}")
+        col1 = table1.column(col_name)
+        col2 = table2.column(col_name)
+        if col1 == col2:
+            continue
         
+        col_diffs = _column_differences(col1, col2)
         if col_diffs:
             differences.append({
                 'column_name': col_name,
-                'source': col1,
-                'target': col2,
+                'source': col1.to_dict(),
+                'target': col2.to_dict(),
                 'differences': col_diffs
             })
     
@@ -102,6 +75,39 @@ def compare_schemas(schema1, schema2):
         'identical_columns': identical_columns
     }
 
+def _column_differences(col1, col2):
+    """Describe the property differences between two ColumnInfo"""
+    col_diffs = []
+    
+    # Critical properties first, with their established labels
+    if col1.formatted_data_type != col2.formatted_data_type:
+        col_diffs.append(f"Data type: {col1.formatted_data_type} vs {col2.formatted_data_type}")
+    
+    for field, label in (('is_nullable', 'Nullable'), ('is_identity', 'Identity'), ('is_primary_key', 'Primary Key')):
+        if getattr(col1, field) != getattr(col2, field):
+            col_diffs.append(f"{label}: {col1.get_value(field)} vs {col2.get_value(field)}")
+    
+    # Then the remaining catalog properties
+    for field in ('type', 'max_length', 'numeric_precision', 'numeric_scale'):
+        if getattr(col1, field) != getattr(col2, field):
+            col_diffs.append(f"{field}: {getattr(col1, field)} vs {getattr(col2, field)}")
+    
+    # And any extra properties, changed ones first, then the established
+    # "Structure change" messages for properties on one side only
+    extra1 = col1.extra or {}
+    extra2 = col2.extra or {}
+    for prop in extra1:
+        if prop in extra2 and extra1[prop] != extra2[prop]:
+            col_diffs.append(f"{prop}: {extra1[prop]} vs {extra2[prop]}")
+    for prop in extra2:
+        if prop not in extra1:
+            col_diffs.append(f"Structure change: dictionary_item_added at {prop}")
+    for prop in extra1:
+        if prop not in extra2:
+            col_diffs.append(f"Structure change: dictionary_item_removed at {prop}")
+    
+    return col_diffs
+
 def compare_create_table_scripts(script1, script2):
     """
     Compare two CREATE TABLE scripts and return a unified diff with GitHub-style HTML formatting
@@ -117,6 +123,15 @@ def compare_create_table_scripts(script1, script2):
             - source_script (str): Original source script
             - target_script (str): Original target script
     """
+    # Identical scripts have no diff to build
+    if script1 == script2:
+        return {
+            'has_differences': False,
+            'diff_html': '<div class="github-diff-container">\n</div>',
+            'source_script': script1,
+            'target_script': script2
+        }
+    
     # Split scripts into lines for comparison
     script1_lines = script1.splitlines()
     script2_lines = script2.splitlines()
@@ -223,14 +238,114 @@ def compare_create_table_scripts(script1, script2):
         'target_script': script2
     }
 
-def compare_data(data1, data2, common_columns):
-    """Compare data between two tables using DeepDiff for more detailed comparison"""
-    # Create DataFrames from the data
-    df1 = pd.DataFrame(data1['rows'])
-    df2 = pd.DataFrame(data2['rows'])
+def _normalize_value(value):
+    """Convert NaN to None so NULLs compare equal"""
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+def _format_value(value, null_text='None'):
+    """Format a value for display in the differences structure"""
+    return null_text if value is None else str(value)
+
+def _column_mismatches(values1, values2):
+    """
+    Compare two equal-length column arrays and return a boolean mask of mismatching cells
+    
+    NULL-aware: None/NaN/NaT on both sides count as equal, NULL against a value counts
+    as a difference.
+    """
+    if values1.dtype != values2.dtype:
+        # NumPy would promote e.g. int64 against float64 and lose precision; compare
+        # the Python values exactly instead
+        values1 = values1.astype(object)
+        values2 = values2.astype(object)
+    
+    nulls1 = pd.isna(values1)
+    nulls2 = pd.isna(values2)
+    
+    try:
+        equal = np.asarray(values1 == values2, dtype=bool)
+        if equal.shape != nulls1.shape:
+            raise ValueError("elementwise comparison was not possible")
+    except (TypeError, ValueError):
+        # Object columns holding array-like values can't be compared in one numpy call
+        equal = np.fromiter((bool(np.all(v1 == v2)) for v1, v2 in zip(values1, values2)),
+                            dtype=bool, count=len(values1))
+    
+    return ~((equal & ~nulls1 & ~nulls2) | (nulls1 & nulls2))
+
+def _column_array(rows, column, count):
+    """
+    Extract one column from the first count rows as a 1-D NumPy array
+    
+    Rows may be dicts (column is a name) or tuples (column is a position).
+    """
+    if count < len(rows):
+        rows = rows[:count]
+    try:
+        values = list(map(itemgetter(column), rows))
+    except KeyError:
+        values = [row.get(column) for row in rows]
+    kind = _numeric_kind(values)
+    if kind is bool:
+        return np.array(values, dtype=bool)
+    if kind is int:
+        try:
+            return np.array(values, dtype=np.int64)
+        except OverflowError:
+            pass
+    elif kind is float:
+        # None becomes NaN, which compares as NULL
+        return np.array(values, dtype=np.float64)
+    
+    # Letting NumPy guess a dtype for the rest is lossy: fixed-width str and bytes
+    # arrays drop trailing NULs, and mixed columns are coerced to one type. Object
+    # arrays keep the Python values (and nested lists or tuples) as they are
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+def _numeric_kind(values):
+    """
+    Get bool, int or float if a column can be held in a NumPy array of that type exactly
+    
+    Every value must have exactly that type; float columns may also hold None (as NaN).
+    Returns None for any other column.
+    """
+    kinds = set(map(type, values))
+    if len(kinds) == 2 and type(None) in kinds and float in kinds:
+        return float
+    if len(kinds) == 1:
+        kind = kinds.pop()
+        if kind in (bool, int, float):
+            return kind
+    return None
+
+def compare_data(data1, data2, common_columns, null_text='None'):
+    """
+    Compare data between two tables position by position using vectorized column operations
+    
+    Each column is compared in a single NumPy operation and only mismatching cells are
+    turned back into Python values, so the cost is dominated by the size of the diff
+    rather than the number of rows.
+    
+    Args:
+        data1 (dict): Source data as returned by DatabaseConnection.get_table_data
+        data2 (dict): Target data as returned by DatabaseConnection.get_table_data
+        common_columns (list): Columns to compare
+        null_text (str): Text used to display NULL values in the differences
+        
+    Returns:
+        dict: Dictionary with 'summary' and 'data_differences'
+    """
+    rows1 = data1['rows']
+    rows2 = data2['rows']
     
     # Only compare columns that exist in both tables
-    columns_to_compare = [col for col in common_columns if col in df1.columns and col in df2.columns]
+    columns1 = set(data1.get('columns') or (rows1[0].keys() if rows1 else []))
+    columns2 = set(data2.get('columns') or (rows2[0].keys() if rows2 else []))
+    columns_to_compare = [col for col in common_columns if col in columns1 and col in columns2]
     
     # If no common columns, return empty comparison
     if not columns_to_compare:
@@ -246,98 +361,677 @@ def compare_data(data1, data2, common_columns):
             'data_differences': []
         }
     
-    # Limit DataFrames to common columns
-    df1_subset = df1[columns_to_compare]
-    df2_subset = df2[columns_to_compare]
+    # Compare rows (up to the minimum number of rows in both datasets)
+    min_rows = min(len(rows1), len(rows2))
+    
+    # Build a rows x columns mismatch mask one column at a time
+    mismatch_mask = np.zeros((min_rows, len(columns_to_compare)), dtype=bool)
+    for j, col in enumerate(columns_to_compare):
+        mismatch_mask[:, j] = _column_mismatches(
+            _column_array(rows1, col, min_rows),
+            _column_array(rows2, col, min_rows)
+        )
     
-    # Find differences
+    differing_rows = np.flatnonzero(mismatch_mask.any(axis=1))
+    
+    # Only the mismatching cells are materialized, using the original row values
     differences = []
-    rows_with_differences = 0
+    for i in differing_rows:
+        row1 = rows1[i]
+        row2 = rows2[i]
+        row_diffs = {}
+        for j in np.flatnonzero(mismatch_mask[i]):
+            col = columns_to_compare[j]
+            row_diffs[col] = {
+                'source': _format_value(_normalize_value(row1.get(col)), null_text),
+                'target': _format_value(_normalize_value(row2.get(col)), null_text)
+            }
+        differences.append({
+            'row_index': int(i),
+            'row': int(i) + 1,  # 1-based indexing for display
+            'differences': row_diffs
+        })
     
-    # Compare rows (up to the minimum number of rows in both datasets)
-    min_rows = min(len(df1_subset), len(df2_subset))
+    return {
+        'summary': {
+            'source_total_rows': data1['total_rows'],
+            'target_total_rows': data2['total_rows'],
+            'total_rows_compared': min_rows,
+            'rows_with_differences': len(differences),
+            'columns_compared': columns_to_compare,
+            'row_count_difference': abs(data1['total_rows'] - data2['total_rows'])
+        },
+        'data_differences': differences
+    }
+
+def get_primary_key_columns(schema):
+    """Get the primary key column names from a table schema, in column order"""
+    return [col['name'] for col in schema if col.get('is_primary_key') == 'Yes']
+
+# Key types the databases sort in the same order as Python sorts the fetched values:
+# integers, dates and times, and character types ordered by code point (see
+# DatabaseBackend._order_term()). Others, e.g. uniqueidentifier, sort differently.
+SORT_MERGE_KEY_TYPES = ('tinyint', 'smallint', 'int', 'bigint', 'integer',
+                        'date', 'datetime', 'datetime2', 'smalldatetime', 'time',
+                        'char', 'varchar', 'nchar', 'nvarchar', 'text')
+
+class KeyOrderError(ValueError):
+    """A key-ordered row stream was not in strictly increasing key order"""
+
+def supports_sort_merge(schema1, schema2, key_columns):
+    """Check whether two tables ordered by their key columns can be merged (see SORT_MERGE_KEY_TYPES)"""
+    if not key_columns:
+        return False
+    for schema in (schema1, schema2):
+        column_types = {col['name']: col['type'] for col in schema}
+        if any(column_types.get(col) not in SORT_MERGE_KEY_TYPES for col in key_columns):
+            return False
+    return True
+
+def compare_data_by_key(data1, data2, common_columns, key_columns, null_text='None'):
+    """
+    Compare data between two tables by aligning rows on key columns
     
-    for i in range(min_rows):
-        row1 = df1_subset.iloc[i].to_dict()
-        row2 = df2_subset.iloc[i].to_dict()
+    Rows are matched with a hash join on the key columns instead of by position,
+    so an inserted or deleted row only affects itself rather than every row after it.
+    
+    Args:
+        data1 (dict): Source data as returned by DatabaseConnection.get_table_data
+        data2 (dict): Target data as returned by DatabaseConnection.get_table_data
+        common_columns (list): Columns to compare
+        key_columns (list): Columns that uniquely identify a row (usually the primary key)
+        null_text (str): Text used to display NULL values in the differences
         
-        # Clean NaN values for proper comparison
+    Returns:
+        dict: Comparison result with the same shape as compare_data, where each entry in
+            data_differences also has a 'status' ('modified', 'deleted' or 'inserted'),
+            the row's 'key' values and its 'source_index' and/or 'target_index' in the
+            rows of data1 and data2 (row_index is the source position, or the target
+            position of inserted rows)
+    """
+    rows1 = data1['rows']
+    rows2 = data2['rows']
+    
+    columns_to_compare = [col for col in common_columns if col not in key_columns]
+    
+    # Build the hash index over the target rows
+    target_index = {}
+    duplicate_keys = 0
+    for position, row in enumerate(rows2):
+        key = tuple(_normalize_value(row.get(col)) for col in key_columns)
+        if key in target_index:
+            duplicate_keys += 1
+            continue
+        target_index[key] = position
+    
+    differences = []
+    matched_targets = set()
+    rows_modified = 0
+    rows_deleted = 0
+    
+    # Probe with the source rows
+    seen_source_keys = set()
+    for position, row1 in enumerate(rows1):
+        key = tuple(_normalize_value(row1.get(col)) for col in key_columns)
+        if key in seen_source_keys:
+            duplicate_keys += 1
+            continue
+        seen_source_keys.add(key)
+        
+        key_values = {col: _format_value(value, null_text) for col, value in zip(key_columns, key)}
+        target_position = target_index.get(key)
+        
+        if target_position is None:
+            # Row exists only in the source
+            differences.append({
+                'row_index': position,
+                'source_index': position,
+                'status': 'deleted',
+                'key': key_values,
+                'differences': {
+                    col: {'source': _format_value(_normalize_value(row1.get(col)), null_text), 'target': ''}
+                    for col in common_columns
+                }
+            })
+            rows_deleted += 1
+            continue
+        
+        matched_targets.add(target_position)
+        row2 = rows2[target_position]
+        
+        row_diffs = {}
         for col in columns_to_compare:
-            if col in row1 and isinstance(row1[col], float) and np.isnan(row1[col]):
-                row1[col] = None
-            if col in row2 and isinstance(row2[col], float) and np.isnan(row2[col]):
-                row2[col] = None
+            val1 = _normalize_value(row1.get(col))
+            val2 = _normalize_value(row2.get(col))
+            if val1 != val2:
+                row_diffs[col] = {
+                    'source': _format_value(val1, null_text),
+                    'target': _format_value(val2, null_text)
+                }
+        
+        if row_diffs:
+            differences.append({
+                'row_index': position,
+                'source_index': position,
+                'target_index': target_position,
+                'status': 'modified',
+                'key': key_values,
+                'differences': row_diffs
+            })
+            rows_modified += 1
+    
+    # Whatever is left in the target index exists only in the target
+    rows_inserted = 0
+    for key, position in target_index.items():
+        if position in matched_targets:
+            continue
+        row2 = rows2[position]
+        differences.append({
+            'row_index': position,
+            'target_index': position,
+            'status': 'inserted',
+            'key': {col: _format_value(value, null_text) for col, value in zip(key_columns, key)},
+            'differences': {
+                col: {'source': '', 'target': _format_value(_normalize_value(row2.get(col)), null_text)}
+                for col in common_columns
+            }
+        })
+        rows_inserted += 1
+    
+    return {
+        'summary': {
+            'source_total_rows': data1['total_rows'],
+            'target_total_rows': data2['total_rows'],
+            'total_rows_compared': len(matched_targets),
+            'rows_with_differences': rows_modified + rows_deleted + rows_inserted,
+            'columns_compared': list(common_columns),
+            'row_count_difference': abs(data1['total_rows'] - data2['total_rows']),
+            'key_columns': list(key_columns),
+            'rows_modified': rows_modified,
+            'rows_deleted': rows_deleted,
+            'rows_inserted': rows_inserted,
+            'duplicate_keys': duplicate_keys
+        },
+        'data_differences': differences
+    }
+
+def _stream_mismatches(chunk1, chunk2, positions):
+    """Vectorized mismatch mask for two aligned chunks of row tuples"""
+    count = len(chunk1)
+    mismatch_mask = np.zeros((count, len(positions)), dtype=bool)
+    for j, position in enumerate(positions):
+        mismatch_mask[:, j] = _column_mismatches(
+            _column_array(chunk1, position, count),
+            _column_array(chunk2, position, count)
+        )
+    return mismatch_mask
+
+def _cell_differences(row1, row2, mask_row, columns, positions, null_text):
+    """Build the differences dict for one row from its mismatch mask"""
+    return {
+        columns[positions[j]]: {
+            'source': _format_value(_normalize_value(row1[positions[j]]), null_text),
+            'target': _format_value(_normalize_value(row2[positions[j]]), null_text)
+        }
+        for j in np.flatnonzero(mask_row)
+    }
+
+def compare_data_stream(batches1, batches2, columns, compare_columns=None, key_columns=None,
+                        chunk_size=10000, max_differences=1000, null_text='None', key_hashed=False):
+    """
+    Compare two streams of row batches without materializing either table
+    
+    Both streams are consumed incrementally (e.g. from DatabaseConnection.iter_table_data),
+    compared chunk by chunk with the vectorized kernel, and only up to max_differences
+    difference entries are kept, so memory stays bounded regardless of table size.
+    
+    Without key_columns, rows are compared by position. With key_columns, both streams
+    must be sorted by the key and rows are aligned with a sort-merge join, reporting
+    modified, deleted (source only) and inserted (target only) rows. Streams whose keys
+    are not strictly increasing in Python's order raise KeyOrderError; callers check
+    supports_sort_merge() first and otherwise stream the rows ordered by key hash.
+    
+    With key_hashed, each row starts with its key hash and both streams are ordered by it
+    (see DatabaseBackend.iter_table_data_by_key_hash); rows are merged hash by hash and
+    matched on their key values within each hash, counting duplicate keys.
+    
+    Args:
+        batches1 (iterable): Source batches, each a list of row tuples in the order of columns
+        batches2 (iterable): Target batches, each a list of row tuples in the order of columns
+        columns (list): Column names matching the tuple positions
+        compare_columns (list): Columns to compare (defaults to all columns)
+        key_columns (list): Key columns for sort-merge alignment, or None for positional
+        chunk_size (int): Number of rows compared per vectorized step
+        max_differences (int): Maximum number of difference entries to keep
+        null_text (str): Text used to display NULL values in the differences
+        key_hashed (bool): Whether the rows are prefixed with and ordered by their key hash
         
-        # Use DeepDiff to compare the rows
-        row_diff = DeepDiff(row1, row2, verbose_level=2)
+    Returns:
+        dict: Comparison result with the same shape as compare_data / compare_data_by_key
+    """
+    if compare_columns is None:
+        compare_columns = list(columns)
+    rows1 = chain.from_iterable(batches1)
+    rows2 = chain.from_iterable(batches2)
+    
+    if key_columns:
+        return _compare_sorted_streams(rows1, rows2, columns, compare_columns, key_columns,
+                                       chunk_size, max_differences, null_text, key_hashed)
+    
+    positions = [columns.index(col) for col in compare_columns]
+    differences = []
+    source_total_rows = 0
+    target_total_rows = 0
+    total_rows_compared = 0
+    rows_with_differences = 0
+    
+    while True:
+        chunk1 = list(islice(rows1, chunk_size))
+        chunk2 = list(islice(rows2, chunk_size))
+        source_total_rows += len(chunk1)
+        target_total_rows += len(chunk2)
         
-        if row_diff:
-            row_diffs = {}
-            
-            # First do a simple comparison for backward compatibility with tests
-            for col in columns_to_compare:
-                val1 = row1.get(col)
-                val2 = row2.get(col)
-                
-                if val1 != val2:
-                    row_diffs[col] = {
-                        'source': 'None' if val1 is None else str(val1),
-                        'target': 'None' if val2 is None else str(val2)
-                    }
+        count = min(len(chunk1), len(chunk2))
+        if count and positions:
+            mismatch_mask = _stream_mismatches(chunk1[:count], chunk2[:count], positions)
+            differing_rows = np.flatnonzero(mismatch_mask.any(axis=1))
+            rows_with_differences += len(differing_rows)
             
-            # For complex nested structures, get detailed differences from DeepDiff
-            for change_type, changes in row_diff.items():
-                if change_type in ['values_changed', 'type_changes']:
-                    for path, change in changes.items():
-                        # Process path to extract column and possibly nested keys
-                        path_parts = path.split("['")
-                        if len(path_parts) >= 2:
-                            col_name = path_parts[1].split("']")[0]
-                            # For complex nested structures, provide more detail
-                            if "']" in path and path.count("'") > 3:  # This is a nested path
-                                nested_key = path.split("']['")[1].rstrip("']")
-                                col_key = f"{col_name}['{nested_key}'"
-                                row_diffs[col_key] = {
-                                    'source': str(change.get('old_value', 'None')),
-                                    'target': str(change.get('new_value', 'None'))
-                                }
-            
-            # For items added/removed in nested structures
-            for change_type in ['dictionary_item_added', 'iterable_item_added']:
-                for path in row_diff.get(change_type, {}):
-                    if "root['" in path:
-                        col_key = path.replace("root['", "").rstrip("']")
-                        if col_key not in row_diffs:
-                            row_diffs[col_key] = {
-                                'source': 'None',
-                                'target': 'N/A'
-                            }
-            
-            for change_type in ['dictionary_item_removed', 'iterable_item_removed']:
-                for path in row_diff.get(change_type, {}):
-                    if "root['" in path:
-                        col_key = path.replace("root['", "").rstrip("']")
-                        if col_key not in row_diffs:
-                            row_diffs[col_key] = {
-                                'source': 'N/A',
-                                'target': 'None'
-                            }
-            
-            if row_diffs:
+            for i in differing_rows[:max(0, max_differences - len(differences))]:
                 differences.append({
-                    'row_index': i,
-                    'differences': row_diffs
+                    'row_index': total_rows_compared + int(i),
+                    'row': total_rows_compared + int(i) + 1,
+                    'differences': _cell_differences(chunk1[i], chunk2[i], mismatch_mask[i],
+                                                     columns, positions, null_text)
                 })
-                rows_with_differences += 1
+        total_rows_compared += count
+        
+        if len(chunk1) < chunk_size or len(chunk2) < chunk_size:
+            # One side is exhausted; count what's left on the other without keeping it
+            source_total_rows += sum(1 for _ in rows1)
+            target_total_rows += sum(1 for _ in rows2)
+            break
     
     return {
         'summary': {
-            'source_total_rows': data1['total_rows'],
-            'target_total_rows': data2['total_rows'],
-            'total_rows_compared': min_rows,
+            'source_total_rows': source_total_rows,
+            'target_total_rows': target_total_rows,
+            'total_rows_compared': total_rows_compared,
             'rows_with_differences': rows_with_differences,
-            'columns_compared': columns_to_compare,
-            'row_count_difference': abs(data1['total_rows'] - data2['total_rows'])
+            'columns_compared': list(compare_columns),
+            'row_count_difference': abs(source_total_rows - target_total_rows),
+            'differences_truncated': rows_with_differences > len(differences)
         },
         'data_differences': differences
     }
+
+def _compare_sorted_streams(rows1, rows2, columns, compare_columns, key_columns,
+                            chunk_size, max_differences, null_text, key_hashed=False):
+    """Merge join of two key-ordered (or key hash ordered) row streams for compare_data_stream
+
+    Raises KeyOrderError as soon as either stream is found out of order (or, when ordered
+    by the key itself, holds a duplicate key), since the rest of the merge would report
+    spurious differences.
+    """
+    key_positions = [columns.index(col) for col in key_columns]
+    positions = [columns.index(col) for col in compare_columns if col not in key_columns]
+    all_positions = [columns.index(col) for col in compare_columns]
+    
+    def key_values(row):
+        return {col: _format_value(row[i], null_text) for col, i in zip(key_columns, key_positions)}
+    
+    def one_sided(row, position, status):
+        cells = {}
+        for i in all_positions:
+            value = _format_value(_normalize_value(row[i]), null_text)
+            cells[columns[i]] = {'source': value, 'target': ''} if status == 'deleted' else {'source': '', 'target': value}
+        return {'row_index': position, 'status': status, 'key': key_values(row), 'differences': cells}
+    
+    differences = []
+    counts = {'modified': 0, 'deleted': 0, 'inserted': 0, 'matched': 0}
+    totals = {'Source': 0, 'Target': 0, 'duplicate_keys': 0}
+    pending1, pending2, pending_positions = [], [], []
+    
+    def flush():
+        """Compare the buffered matched pairs in one vectorized step"""
+        if pending1 and positions:
+            mismatch_mask = _stream_mismatches(pending1, pending2, positions)
+            for i in np.flatnonzero(mismatch_mask.any(axis=1)):
+                counts['modified'] += 1
+                if len(differences) < max_differences:
+                    differences.append({
+                        'row_index': pending_positions[i],
+                        'status': 'modified',
+                        'key': key_values(pending1[i]),
+                        'differences': _cell_differences(pending1[i], pending2[i], mismatch_mask[i],
+                                                         columns, positions, null_text)
+                    })
+        pending1.clear()
+        pending2.clear()
+        pending_positions.clear()
+    
+    def record(row, position, status):
+        counts[status] += 1
+        if len(differences) < max_differences:
+            differences.append(one_sided(row, position, status))
+    
+    if key_hashed:
+        aligned = _align_hash_groups(rows1, rows2, key_positions, totals)
+    else:
+        aligned = _align_sorted_rows(rows1, rows2, key_positions, key_values, totals)
+    
+    for position1, row1, position2, row2 in aligned:
+        if row2 is None:
+            record(row1, position1, 'deleted')
+        elif row1 is None:
+            record(row2, position2, 'inserted')
+        else:
+            counts['matched'] += 1
+            pending1.append(row1)
+            pending2.append(row2)
+            pending_positions.append(position1)
+            if len(pending1) >= chunk_size:
+                flush()
+    flush()
+    
+    rows_with_differences = counts['modified'] + counts['deleted'] + counts['inserted']
+    summary = {
+        'source_total_rows': totals['Source'],
+        'target_total_rows': totals['Target'],
+        'total_rows_compared': counts['matched'],
+        'rows_with_differences': rows_with_differences,
+        'columns_compared': list(compare_columns),
+        'row_count_difference': abs(totals['Source'] - totals['Target']),
+        'key_columns': list(key_columns),
+        'rows_modified': counts['modified'],
+        'rows_deleted': counts['deleted'],
+        'rows_inserted': counts['inserted'],
+        'differences_truncated': rows_with_differences > len(differences)
+    }
+    if key_hashed:
+        summary['duplicate_keys'] = totals['duplicate_keys']
+    return {'summary': summary, 'data_differences': differences}
+
+def _align_sorted_rows(rows1, rows2, key_positions, key_values, totals):
+    """Align two streams sorted by their key columns
+    
+    Yields (source position, source row, target position, target row) tuples, with None
+    for the missing side of a deleted or inserted row, and counts each side's rows in totals.
+    """
+    def sort_key(row):
+        # NULLs sort first, as in SQL Server
+        return tuple((row[i] is not None, row[i]) for i in key_positions)
+    
+    def ordered(rows, side):
+        """Pair each row with its sort key, checking that the keys strictly increase"""
+        previous = None
+        for position, row in enumerate(rows):
+            key = sort_key(row)
+            if previous is not None and not previous < key:
+                raise KeyOrderError(f"{side} rows are not in strictly increasing key order at "
+                                    f"{key_values(row)}")
+            previous = key
+            totals[side] = position + 1
+            yield key, position, row
+    
+    # The merge is only correct if the database sorted both sides the way Python compares
+    # the keys, so every key is checked against the one before it on its side
+    keyed1 = ordered(rows1, 'Source')
+    keyed2 = ordered(rows2, 'Target')
+    end = (None, None, None)
+    try:
+        key1, position1, row1 = next(keyed1, end)
+        key2, position2, row2 = next(keyed2, end)
+        while row1 is not None or row2 is not None:
+            if row2 is None or (row1 is not None and key1 < key2):
+                yield position1, row1, None, None
+                key1, position1, row1 = next(keyed1, end)
+            elif row1 is None or key2 < key1:
+                yield None, None, position2, row2
+                key2, position2, row2 = next(keyed2, end)
+            else:
+                yield position1, row1, position2, row2
+                key1, position1, row1 = next(keyed1, end)
+                key2, position2, row2 = next(keyed2, end)
+    except TypeError as e:
+        # Keys of different types, e.g. text and integers in the same SQLite column
+        raise KeyOrderError(f"Key values cannot be ordered: {e}") from e
+
+def _hash_groups(rows, side, totals):
+    """Group a key hash ordered stream into (hash, [(position, row)]) runs of equal hashes"""
+    previous = None
+    position = 0
+    for key_hash, group in groupby(rows, key=itemgetter(0)):
+        if previous is not None and not previous < key_hash:
+            raise KeyOrderError(f"{side} rows are not in increasing key hash order at {key_hash}")
+        previous = key_hash
+        members = []
+        for row in group:
+            members.append((position, row[1:]))
+            position += 1
+        totals[side] = position
+        yield key_hash, members
+
+def _match_hash_group(group1, group2, key_positions, totals):
+    """Hash join the rows of one key hash on their normalized key values"""
+    def indexed(group):
+        index = {}
+        for position, row in group:
+            key = tuple(_normalize_value(row[i]) for i in key_positions)
+            if key in index:
+                totals['duplicate_keys'] += 1
+                continue
+            index[key] = (position, row)
+        return index
+    
+    targets = indexed(group2)
+    for key, (position1, row1) in indexed(group1).items():
+        position2, row2 = targets.pop(key, (None, None))
+        yield position1, row1, position2, row2
+    for position2, row2 in targets.values():
+        yield None, None, position2, row2
+
+def _align_hash_groups(rows1, rows2, key_positions, totals):
+    """Align two streams ordered by a hash of their key columns
+    
+    Each row starts with the integer key hash (see DatabaseBackend.iter_table_data_by_key_hash),
+    which is stripped before the row is yielded. Integers order the same way in every
+    database and in Python, so this works for keys the database cannot sort in Python's
+    order (uniqueidentifier, collation-sensitive text); rows sharing a hash are matched on
+    their key values and duplicate keys are counted in totals and skipped, as in
+    compare_data_by_key. Yields the same tuples as _align_sorted_rows.
+    """
+    groups1 = _hash_groups(rows1, 'Source', totals)
+    groups2 = _hash_groups(rows2, 'Target', totals)
+    end = (None, None)
+    hash1, group1 = next(groups1, end)
+    hash2, group2 = next(groups2, end)
+    while group1 is not None or group2 is not None:
+        if group2 is None or (group1 is not None and hash1 < hash2):
+            yield from _match_hash_group(group1, [], key_positions, totals)
+            hash1, group1 = next(groups1, end)
+        elif group1 is None or hash2 < hash1:
+            yield from _match_hash_group([], group2, key_positions, totals)
+            hash2, group2 = next(groups2, end)
+        else:
+            yield from _match_hash_group(group1, group2, key_positions, totals)
+            hash1, group1 = next(groups1, end)
+            hash2, group2 = next(groups2, end)
+
+def compare_row_counts(counts1, counts2):
+    """
+    Compare the row counts of every table in two databases
+
+    Args:
+        counts1 (dict): Source table name to row count
+        counts2 (dict): Target table name to row count
+
+    Returns:
+        dict: 'tables' with one entry per table (sorted by name) and a 'summary'
+    """
+    tables = []
+    for table_name in sorted(set(counts1) | set(counts2)):
+        source_rows = counts1.get(table_name)
+        target_rows = counts2.get(table_name)
+        difference = None
+        if source_rows is not None and target_rows is not None:
+            difference = target_rows - source_rows
+        tables.append({
+            'table_name': table_name,
+            'in_db1': source_rows is not None,
+            'in_db2': target_rows is not None,
+            'source_rows': source_rows,
+            'target_rows': target_rows,
+            'difference': difference,
+            'differences': source_rows != target_rows
+        })
+
+    return {
+        'tables': tables,
+        'summary': {
+            'total_tables': len(tables),
+            'tables_with_differences': sum(1 for table in tables if table['differences']),
+            'tables_only_in_source': sum(1 for table in tables if not table['in_db2']),
+            'tables_only_in_target': sum(1 for table in tables if not table['in_db1']),
+            'source_total_rows': sum(counts1.values()),
+            'target_total_rows': sum(counts2.values())
+        }
+    }
+
+def normalize_table_definition(definition):
+    """
+    Reduce a table definition to plain tuples that compare and hash by structure
+
+    Args:
+        definition (dict): 'columns', 'foreign_keys' and 'indexes' of a table, as
+            returned by DatabaseConnection.get_table_definitions()
+
+    Returns:
+        tuple: Columns as (name, type, nullable, identity) in column order, the primary
+            key column names, foreign keys as (name, columns, referenced table,
+            referenced columns) and indexes as (name, unique, columns), the last two
+            sorted by name
+    """
+    columns = tuple(
+        (column['name'], column['formatted_data_type'], column['is_nullable'] == 'Yes', column['is_identity'] == 'Yes')
+        for column in definition['columns']
+    )
+    primary_key = tuple(column['name'] for column in definition['columns'] if column['is_primary_key'] == 'Yes')
+    foreign_keys = tuple(sorted(
+        (name, tuple(fk['columns']), fk['ref_table'], tuple(fk['ref_columns']))
+        for name, fk in definition['foreign_keys'].items()
+    ))
+    indexes = tuple(sorted(
+        (name, bool(index['is_unique']), tuple(index['columns']))
+        for name, index in definition['indexes'].items()
+    ))
+    return (columns, primary_key, foreign_keys, indexes)
+
+def definition_hash(normalized_definition):
+    """Get a stable hash of a normalized table definition"""
+    return hashlib.sha1(repr(normalized_definition).encode('utf-8')).hexdigest()
+
+def _describe_column(column):
+    """Describe a normalized column as it appears in a CREATE TABLE script"""
+    name, data_type, is_nullable, is_identity = column
+    return f"{data_type} {'NULL' if is_nullable else 'NOT NULL'}{' IDENTITY(1,1)' if is_identity else ''}"
+
+def _compare_named(kind, items1, items2, describe):
+    """List the differences between two sequences of (name, ...) tuples"""
+    items1 = {item[0]: item for item in items1}
+    items2 = {item[0]: item for item in items2}
+    changes = []
+    for name in items1:
+        if name not in items2:
+            changes.append(f"{kind} [{name}] only in source")
+        elif items1[name] != items2[name]:
+            changes.append(f"{kind} [{name}]: {describe(items1[name])} vs {describe(items2[name])}")
+    changes.extend(f"{kind} [{name}] only in target" for name in items2 if name not in items1)
+    return changes
+
+def compare_table_definitions(normalized1, normalized2):
+    """
+    List the structural differences between two normalized table definitions
+
+    Args:
+        normalized1 (tuple): Source definition from normalize_table_definition()
+        normalized2 (tuple): Target definition from normalize_table_definition()
+
+    Returns:
+        list: One description per differing column, primary key, foreign key or index
+    """
+    columns1, primary_key1, foreign_keys1, indexes1 = normalized1
+    columns2, primary_key2, foreign_keys2, indexes2 = normalized2
+
+    changes = _compare_named('Column', columns1, columns2, _describe_column)
+    names1 = {column[0] for column in columns1}
+    names2 = {column[0] for column in columns2}
+    if [column[0] for column in columns1 if column[0] in names2] != [column[0] for column in columns2 if column[0] in names1]:
+        changes.append("Column order differs")
+    if primary_key1 != primary_key2:
+        changes.append(f"Primary key: ({', '.join(primary_key1)}) vs ({', '.join(primary_key2)})")
+    changes.extend(_compare_named(
+        'Foreign key', foreign_keys1, foreign_keys2,
+        lambda fk: f"({', '.join(fk[1])}) references {fk[2]} ({', '.join(fk[3])})"
+    ))
+    changes.extend(_compare_named(
+        'Index', indexes1, indexes2,
+        lambda index: f"{'unique ' if index[1] else ''}({', '.join(index[2])})"
+    ))
+    return changes
+
+def compare_database_definitions(definitions1, definitions2, build_script):
+    """
+    Compare the structure of every table in two databases
+
+    Tables are compared by the hash of their normalized definitions, so identical
+    tables cost one hash comparison. CREATE TABLE scripts and their diff are only
+    built for tables whose structure differs.
+
+    Args:
+        definitions1 (dict): Source table name to definition
+        definitions2 (dict): Target table name to definition
+        build_script (callable): Builds a CREATE TABLE script from a table name and
+            its definition
+
+    Returns:
+        dict: 'tables' with one entry per table (sorted by name) and a 'summary'
+    """
+    normalized1 = {name: normalize_table_definition(definition) for name, definition in definitions1.items()}
+    normalized2 = {name: normalize_table_definition(definition) for name, definition in definitions2.items()}
+
+    tables = []
+    for table_name in sorted(set(normalized1) | set(normalized2)):
+        in_db1 = table_name in normalized1
+        in_db2 = table_name in normalized2
+        hash1 = definition_hash(normalized1[table_name]) if in_db1 else None
+        hash2 = definition_hash(normalized2[table_name]) if in_db2 else None
+        entry = {
+            'table_name': table_name,
+            'in_db1': in_db1,
+            'in_db2': in_db2,
+            'source_hash': hash1,
+            'target_hash': hash2,
+            'differences': hash1 != hash2,
+            'changes': [],
+            'diff_html': None
+        }
+        if entry['differences']:
+            if in_db1 and in_db2:
+                entry['changes'] = compare_table_definitions(normalized1[table_name], normalized2[table_name])
+            script1 = build_script(table_name, definitions1[table_name]) if in_db1 else ''
+            script2 = build_script(table_name, definitions2[table_name]) if in_db2 else ''
+            entry['diff_html'] = compare_create_table_scripts(script1, script2)['diff_html']
+        tables.append(entry)
+
+    return {
+        'tables': tables,
+        'summary': {
+            'total_tables': len(tables),
+            'identical_tables': sum(1 for table in tables if not table['differences']),
+            'tables_with_differences': sum(1 for table in tables
+                                           if table['differences'] and table['in_db1'] and table['in_db2']),
+            'tables_only_in_source': sum(1 for table in tables if not table['in_db2']),
+            'tables_only_in_target': sum(1 for table in tables if not table['in_db1'])
+        }
+    }
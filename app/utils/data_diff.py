@@ -0,0 +1,210 @@
+"""
+Paged access to data comparison differences.
+"""
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from app.utils.result_store import ResultStore
+
+# Directory holding the difference records of data comparisons
+DIFF_RESULTS_DIR = os.path.join(tempfile.gettempdir(), 'db_comparison_results', 'diffs')
+
+# Seconds a stored data comparison is kept for paging
+DIFF_RETENTION = 3600
+
+# Fields the differences can be sorted on
+DIFF_SORT_FIELDS = ('row', 'column', 'status', 'source', 'target')
+
+# Difference statuses
+DIFF_STATUSES = ('modified', 'inserted', 'deleted')
+
+# Number of opened stores and of filtered, sorted query indexes kept in memory
+DIFF_CACHE_ENTRIES = 32
+
+# Opened stores by path, and query indexes by (path, length, query), least recently used first
+_stores = OrderedDict()
+_query_indexes = OrderedDict()
+_cache_lock = threading.Lock()
+
+def _cache_get(cache, key):
+    """Get a cached value, marking it as recently used, or None"""
+    with _cache_lock:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+def _cache_put(cache, key, value):
+    """Cache a value, evicting the least recently used entries"""
+    with _cache_lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > DIFF_CACHE_ENTRIES:
+            cache.popitem(last=False)
+
+def _difference_status(diff, source, target):
+    """Get the status of a cell difference, deriving it from the values for positional comparisons"""
+    if diff.get('status') in DIFF_STATUSES:
+        return diff['status']
+    if source == '' and target != '':
+        return 'inserted'
+    if source != '' and target == '':
+        return 'deleted'
+    return 'modified'
+
+def flatten_differences(data_differences):
+    """
+    Flatten row differences into one record per differing cell
+
+    Args:
+        data_differences (list): 'data_differences' of a comparison result
+
+    Returns:
+        list: Records with row (1-based), key, column, source, target and status
+    """
+    records = []
+    for diff in data_differences:
+        row = diff.get('row_index', 0) + 1
+        key = diff.get('key')
+        for column, values in diff.get('differences', {}).items():
+            source = values.get('source', '')
+            target = values.get('target', '')
+            records.append({
+                'row': row,
+                'key': key,
+                'column': column,
+                'source': source,
+                'target': target,
+                'status': _difference_status(diff, source, target)
+            })
+    return records
+
+def save_differences(data_differences, results_dir=DIFF_RESULTS_DIR):
+    """Store the differences of a comparison for paging and return its id"""
+    prune_differences(results_dir)
+    diff_id = uuid.uuid4().hex
+    store = ResultStore(os.path.join(results_dir, diff_id, 'differences.jsonl'), key=None)
+    store.append(flatten_differences(data_differences))
+    return diff_id
+
+def open_differences(diff_id, results_dir=DIFF_RESULTS_DIR):
+    """Open the stored differences of a comparison, or None if they don't exist
+
+    Opening a store reads the whole file to index it, so opened stores are cached
+    for the page requests that follow.
+    """
+    if not re.fullmatch(r'[0-9a-f]{32}', diff_id or ''):
+        return None
+    path = os.path.join(results_dir, diff_id, 'differences.jsonl')
+    if not os.path.exists(path):
+        return None
+    store = _cache_get(_stores, path)
+    if store is None:
+        store = ResultStore(path, key=None)
+        _cache_put(_stores, path, store)
+    return store
+
+def save_timings(diff_id, timings, results_dir=DIFF_RESULTS_DIR):
+    """Store the phase timing breakdown of a comparison next to its differences"""
+    path = os.path.join(results_dir, diff_id, 'timings.json')
+    if not os.path.isdir(os.path.dirname(path)):
+        return
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(timings, f)
+
+def load_timings(diff_id, results_dir=DIFF_RESULTS_DIR):
+    """Load the phase timing breakdown of a comparison, or None if it wasn't stored"""
+    if not re.fullmatch(r'[0-9a-f]{32}', diff_id or ''):
+        return None
+    path = os.path.join(results_dir, diff_id, 'timings.json')
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def prune_differences(results_dir=DIFF_RESULTS_DIR, retention=DIFF_RETENTION):
+    """Delete stored differences older than the retention period"""
+    if not os.path.isdir(results_dir):
+        return
+    cutoff = time.time() - retention
+    for diff_id in os.listdir(results_dir):
+        path = os.path.join(results_dir, diff_id)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            pass
+
+def query_differences(store, search=None, column=None, status=None, sort=None, descending=False,
+                      offset=0, limit=100):
+    """
+    Get one page of stored differences after filtering and sorting
+
+    Without filters or sorting the page is read straight from its position in the
+    store. Otherwise the records are filtered and sorted once per query into an index
+    of store positions, which is cached, so later pages of the same query only read
+    their own records.
+
+    Args:
+        store (ResultStore): Stored difference records
+        search (str): Case-insensitive text to find in the column name or values
+        column (str): Only include differences in this column
+        status (str): Only include differences with this status
+        sort (str): Field to sort on, one of DIFF_SORT_FIELDS
+        descending (bool): Sort in descending order
+        offset (int): Position of the first record to return
+        limit (int): Maximum number of records to return
+
+    Returns:
+        dict: 'total' matching records and the page of 'records'
+    """
+    offset = max(0, offset)
+    limit = max(0, limit)
+
+    if not (search or column or status or sort in DIFF_SORT_FIELDS):
+        return {
+            'total': len(store),
+            'records': store.get_range(offset, limit)
+        }
+
+    # The store is append-only, so its length tells whether a cached index is current
+    cache_key = (store.path, len(store), search, column, status,
+                 sort if sort in DIFF_SORT_FIELDS else None, bool(descending))
+    positions = _cache_get(_query_indexes, cache_key)
+    if positions is None:
+        positions = _query_positions(store.get_range(), search, column, status, sort, descending)
+        _cache_put(_query_indexes, cache_key, positions)
+
+    return {
+        'total': len(positions),
+        'records': store.get_positions(positions[offset:offset + limit])
+    }
+
+def _query_positions(records, search, column, status, sort, descending):
+    """Get the positions of the records matching a query, in its sort order"""
+    positions = range(len(records))
+    if column:
+        positions = [i for i in positions if records[i]['column'] == column]
+    if status:
+        positions = [i for i in positions if records[i]['status'] == status]
+    if search:
+        needle = search.lower()
+        positions = [i for i in positions
+                     if needle in records[i]['column'].lower()
+                     or needle in str(records[i]['source']).lower()
+                     or needle in str(records[i]['target']).lower()]
+    positions = list(positions)
+    if sort in DIFF_SORT_FIELDS:
+        if sort == 'row':
+            sort_key = lambda i: records[i]['row']
+        else:
+            sort_key = lambda i: (str(records[i][sort]), records[i]['row'])
+        positions.sort(key=sort_key, reverse=descending)
+    return positions
@@ -0,0 +1,218 @@
+"""
+Concurrent execution of the source and target halves of a comparison.
+
+Every comparison does the same work on two databases: connect, read the catalog, fetch
+rows. Run one side after the other and the latency of two remote servers adds up; run
+both halves at once and it is the slower of the two.
+"""
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# Worker threads shared by every dual-side operation in the process
+DUAL_SIDE_WORKERS = 32
+
+SIDES = ('source', 'target')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Marks the end of an iterator read ahead in a worker thread
+_DONE = object()
+
+def _get_executor():
+    """Get the shared worker pool, creating it on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=DUAL_SIDE_WORKERS, thread_name_prefix='dual-side')
+        return _executor
+
+class SideError(Exception):
+    """An operation failed on the source or target side of a comparison"""
+
+    def __init__(self, side, name, error, results=(None, None), message=None):
+        """
+        Initialize the error
+
+        Args:
+            side (str): 'source' or 'target'
+            name (str): Name of the failing side, e.g. its connection name
+            error (Exception): The error raised on that side
+            results (tuple): Source and target results, None for a side that failed
+            message (str): Message to show instead of "<name>: <error>"
+        """
+        super().__init__(message or f"{name}: {error}")
+        self.side = side
+        self.name = name
+        self.error = error
+        self.results = results
+
+def run_both(source_call, target_call, names=SIDES):
+    """
+    Run the source and target halves of an operation concurrently
+
+    The target half runs in a worker thread, with a copy of the caller's context so
+    the Flask request globals stay available, while the source half runs in the
+    calling thread. Both halves always run to completion.
+
+    Args:
+        source_call (callable): Source half, called without arguments
+        target_call (callable): Target half, called without arguments
+        names (tuple): Names of the source and target, used in errors
+
+    Returns:
+        tuple: (source result, target result)
+
+    Raises:
+        SideError: If either half raised; the source's error wins if both did
+    """
+    context = contextvars.copy_context()
+    target_future = _get_executor().submit(context.run, target_call)
+
+    source_result = source_error = None
+    try:
+        source_result = source_call()
+    except Exception as e:
+        source_error = e
+
+    target_result = target_error = None
+    try:
+        target_result = target_future.result()
+    except Exception as e:
+        target_error = e
+
+    results = (source_result, target_result)
+    if source_error is not None:
+        raise SideError(SIDES[0], names[0], source_error, results) from source_error
+    if target_error is not None:
+        raise SideError(SIDES[1], names[1], target_error, results) from target_error
+    return results
+
+class ReadAhead:
+    """Iterator running another iterator in a worker thread, one item ahead of the caller
+
+    The first item is requested right away and each next one as soon as the previous
+    one is handed over, so while the caller works on a batch the next batch is being
+    fetched. Wrapping both sides of a streamed comparison fetches them concurrently.
+    Use it as a context manager, or call close(), so the worker is done with the
+    iterator before its connection is released.
+    """
+
+    def __init__(self, iterable):
+        """Start fetching the first item of an iterable"""
+        self._iterator = iter(iterable)
+        self._executor = _get_executor()
+        # Only one item is requested at a time, so the copied context is never entered twice
+        self._context = contextvars.copy_context()
+        self._pending = self._request()
+
+    def _request(self):
+        """Request the next item from the worker pool"""
+        return self._executor.submit(self._context.run, next, self._iterator, _DONE)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._pending is None:
+            raise StopIteration
+        try:
+            item = self._pending.result()
+        except Exception:
+            self._pending = None
+            raise
+        if item is _DONE:
+            self._pending = None
+            raise StopIteration
+        self._pending = self._request()
+        return item
+
+    def close(self):
+        """Stop reading ahead, waiting for an item being fetched, and close the iterator"""
+        if self._pending is not None:
+            if not self._pending.cancel():
+                wait([self._pending])
+            self._pending = None
+        close = getattr(self._iterator, 'close', None)
+        if close is not None:
+            close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+def _connect(db, conn):
+    """Connect one side, raising ConnectionError if it fails"""
+    if not db.connect():
+        raise ConnectionError(f'Failed to connect to {conn["name"]}. Please check your connection details.')
+
+class DualSide:
+    """The source and target connections of a comparison, operated on concurrently
+
+    Typical use in a route:
+
+        dual = DualSide(conn1, conn2)
+        try:
+            dual.connect()
+        except SideError as e:
+            flash(str(e), 'danger')
+            ...
+        try:
+            tables1, tables2 = dual.each(metadata_cache.get_tables)
+        finally:
+            dual.disconnect()
+    """
+
+    def __init__(self, conn1, conn2):
+        """
+        Initialize both sides
+
+        Args:
+            conn1 (dict): Source connection details
+            conn2 (dict): Target connection details
+        """
+        # Imported here so the comparison engine can use run_both without the database drivers
+        from app.models.database import create_connection
+
+        self.conn1 = conn1
+        self.conn2 = conn2
+        self.db1 = create_connection(conn1)
+        self.db2 = create_connection(conn2)
+
+    @property
+    def names(self):
+        """Get the names of the source and target connections"""
+        return (self.conn1.get('name', self.conn1.get('database')),
+                self.conn2.get('name', self.conn2.get('database')))
+
+    def run(self, source_call, target_call):
+        """Run a source and a target call concurrently and return both results"""
+        return run_both(source_call, target_call, self.names)
+
+    def each(self, operation, *args, **kwargs):
+        """Call operation(db, *args, **kwargs) on both sides concurrently and return both results"""
+        return self.run(lambda: operation(self.db1, *args, **kwargs),
+                        lambda: operation(self.db2, *args, **kwargs))
+
+    def connect(self):
+        """
+        Connect both sides concurrently
+
+        Raises:
+            SideError: If either side fails to connect, with the usual "Failed to
+                connect" message; both sides are disconnected again
+        """
+        try:
+            self.run(lambda: _connect(self.db1, self.conn1), lambda: _connect(self.db2, self.conn2))
+        except SideError as e:
+            self.disconnect()
+            raise SideError(e.side, e.name, e.error, e.results, message=str(e.error)) from e.error
+
+    def disconnect(self):
+        """Disconnect both sides"""
+        self.db1.disconnect()
+        self.db2.disconnect()
@@ -0,0 +1,59 @@
+"""
+Persistent table fingerprints for incremental schema comparison.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+# Directory holding the fingerprints of previous schema comparisons
+FINGERPRINT_DIR = os.path.join(tempfile.gettempdir(), 'db_comparison_results', 'fingerprints')
+
+class FingerprintStore:
+    """Stores the fingerprints and results of the last schema comparison of each database pair.
+
+    Each pair of databases gets one JSON file mapping table name to the source and
+    target fingerprints seen in the last run together with that run's result.
+    """
+
+    def __init__(self, directory=FINGERPRINT_DIR):
+        """Initialize the fingerprint store."""
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def comparison_key(source_conn, target_conn):
+        """Get a file-name-safe key for a pair of connections"""
+        identity = [[conn['server'], conn['database'], conn['username']] for conn in (source_conn, target_conn)]
+        return hashlib.sha1(json.dumps(identity).encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        """Get the file path for a comparison key"""
+        return os.path.join(self.directory, f"{key}.json")
+
+    def load(self, key):
+        """Load the entries of the last comparison, or an empty dict"""
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (ValueError, OSError) as e:
+            print(f"Error loading fingerprints from {path}: {e}")
+            return {}
+
+    def save(self, key, entries):
+        """Replace the entries for a comparison key"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        with self._lock:
+            # Write to a temporary file first so a crash never leaves a truncated file
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'w') as f:
+                json.dump(entries, f)
+            os.replace(temp_path, path)
+
+# Shared fingerprint store for schema comparison jobs
+fingerprint_store = FingerprintStore()
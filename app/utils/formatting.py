@@ -2,10 +2,26 @@
 Formatting utilities for the Database Comparison Tool.
 """
 
-def format_data_as_html(comparison_result):
-    """Format comparison result as HTML"""
+# Number of table rows rendered into each chunk of streamed HTML
+HTML_CHUNK_ROWS = 500
+
+def format_data_as_html(comparison_result, include_details=True):
+    """Format comparison result as HTML
+    
+    Set include_details to False to leave out the detailed differences table, for
+    pages that load the differences page by page from the data diff API instead.
+    """
+    return "".join(iter_data_html(comparison_result, include_details))
+
+def iter_data_html(comparison_result, include_details=True, chunk_rows=HTML_CHUNK_ROWS):
+    """Format comparison result as HTML, yielding it in chunks
+    
+    The summary is yielded first, then the table rows in chunks of chunk_rows, so a
+    streamed response can send the start of the report before the rest is built.
+    """
     if not comparison_result:
-        return "<div class='alert alert-warning'>No comparison data available</div>"
+        yield "<div class='alert alert-warning'>No comparison data available</div>"
+        return
     
     summary = comparison_result.get('summary', {})
     data_differences = comparison_result.get('data_differences', [])
@@ -54,22 +70,46 @@ def format_data_as_html(comparison_result):
     html += f"<tr><th>Rows Compared</th><td>{summary.get('total_rows_compared', 0)}</td></tr>"
     html += f"<tr><th>Rows With Differences</th><td>{summary.get('rows_with_differences', 0)}</td></tr>"
     html += f"<tr><th>Row Count Difference</th><td>{summary.get('row_count_difference', 0)}</td></tr>"
+    if summary.get('key_columns'):
+        html += f"<tr><th>Key Columns</th><td>{', '.join(summary['key_columns'])}</td></tr>"
+        html += f"<tr><th>Rows Modified</th><td>{summary.get('rows_modified', 0)}</td></tr>"
+        html += f"<tr><th>Rows Only In Source</th><td>{summary.get('rows_deleted', 0)}</td></tr>"
+        html += f"<tr><th>Rows Only In Target</th><td>{summary.get('rows_inserted', 0)}</td></tr>"
+    if summary.get('checksum_stats'):
+        stats = summary['checksum_stats']
+        html += f"<tr><th>Checksum Queries</th><td>{stats.get('checksum_queries', 0)}</td></tr>"
+        html += f"<tr><th>Rows Fetched</th><td>{stats.get('rows_fetched', 0)}</td></tr>"
+    if summary.get('sample_stats'):
+        stats = summary['sample_stats']
+        confidence = f"{stats.get('confidence', 0):.0%}"
+        html += f"<tr><th>Sample</th><td>1 in {stats.get('modulus', 1)} rows by key hash ({stats.get('sampled_keys', 0)} keys)</td></tr>"
+        html += f"<tr><th>Estimated Mismatch Rate</th><td>{stats.get('mismatch_rate', 0):.3%} ({confidence} CI {stats.get('mismatch_rate_low', 0):.3%} &ndash; {stats.get('mismatch_rate_high', 0):.3%})</td></tr>"
+        html += f"<tr><th>Estimated Mismatched Rows</th><td>{stats.get('estimated_mismatched_rows', 0)} ({confidence} CI {stats.get('estimated_mismatched_rows_low', 0)} &ndash; {stats.get('estimated_mismatched_rows_high', 0)})</td></tr>"
     html += "</tbody></table>"
     html += "</div></div></div>"
     
+    if summary.get('differences_truncated'):
+        html += f"<div class='alert alert-info'>Showing the first {len(data_differences)} of {summary.get('rows_with_differences', 0)} rows with differences</div>"
+    
     # If no differences, show a message
     if not data_differences and summary.get('rows_with_differences', 0) == 0:
         html += "<div class='alert alert-success'>No differences found in the compared data</div>"
-        return html
+        yield html
+        return
     
-    # Create a dictionary to track rows with differences for row highlighting
-    row_differences = {}
-    for diff in data_differences:
-        row_index = diff.get('row_index', 0)
-        row_differences[row_index] = diff.get('differences', {})
+    yield html
     
     # Detailed Differences card with collapsible table
-    html += "<div class='coral-card mb-4'>"
+    if include_details:
+        yield from iter_differences_table(data_differences, chunk_rows)
+    
+    # Add data preview with row highlighting - only showing rows with differences
+    if 'source_data' in comparison_result and 'target_data' in comparison_result:
+        yield from iter_data_preview(comparison_result, data_differences, columns, chunk_rows)
+
+def iter_differences_table(data_differences, chunk_rows=HTML_CHUNK_ROWS):
+    """Format the detailed differences of a comparison as an HTML table, yielding it in chunks"""
+    html = "<div class='coral-card mb-4'>"
     html += "<div class='coral-card-header'><h4 class='mb-0'>Detailed Differences</h4></div>"
     html += "<div class='coral-card-body'>"
     
@@ -84,7 +124,9 @@ def format_data_as_html(comparison_result):
     html += "<table class='coral-table coral-table-striped coral-table-hover' id='detailedDifferencesTable'>"
     html += "<thead><tr><th>Row</th><th>Column</th><th>Source Value</th><th>Target Value</th></tr></thead>"
     html += "<tbody>"
+    yield html
     
+    parts = []
     for diff in data_differences:
         row_index = diff.get('row_index', 0) + 1  # 1-based indexing for display
         diff_details = diff.get('differences', {})
@@ -109,98 +151,95 @@ def format_data_as_html(comparison_result):
             else:
                 diff_class = "diff-modified"
             
-            html += f"<tr class='{diff_class} expandable-row' data-row-id='Row {row_index}' data-row-details='{row_data_json}'>"
-            html += f"<td>{row_index}</td>"
-            html += f"<td>{col}</td>"
-            html += f"<td>{source_val}</td>"
-            html += f"<td>{target_val}</td>"
-            html += "</tr>"
-    
-    html += "</tbody></table>"
-    html += "</div></div></div>"
-    
-    # Add data preview with row highlighting - only showing rows with differences
-    if 'source_data' in comparison_result and 'target_data' in comparison_result:
-        source_data = comparison_result.get('source_data', {}).get('rows', [])
-        target_data = comparison_result.get('target_data', {}).get('rows', [])
-        
-        if source_data or target_data:
-            # Source data collapsible section
-            html += "<div class='collapsible-section'>"
-            html += "<div class='collapsible-header'>"
-            html += "<h5 class='mb-0'>Source Data</h5>"
-            html += "<i class='bi bi-chevron-down collapse-icon'></i>"
-            html += "</div>"
-            html += "<div class='collapsible-content'>"
-            html += "<div class='table-responsive'>"
-            html += "<table class='coral-table coral-table-striped coral-table-hover'>"
-            html += "<thead><tr>"
-            for col in columns:
-                html += f"<th>{col}</th>"
-            html += "</tr></thead><tbody>"
-            
-            # Track if we have any rows to display
-            source_rows_displayed = 0
-            
-            for row_index, row in enumerate(source_data):
-                # Only show rows with differences or rows that don't exist in target
-                if row_index in row_differences or row_index >= len(target_data):
-                    source_rows_displayed += 1
-                    
-                    # Apply row highlighting based on differences
-                    if row_index in row_differences:
-                        html += "<tr class='diff-modified'>"  # Blue for modified
-                    else:
-                        # This row doesn't exist in target
-                        html += "<tr class='diff-deleted'>"  # Red for deleted
-                            
-                    for col in columns:
-                        html += f"<td>{row.get(col, '')}</td>"
-                    html += "</tr>"
-            
-            if source_rows_displayed == 0:
-                html += "<tr><td colspan='" + str(len(columns)) + "' class='text-center'>No differences found in source data</td></tr>"
-                
-            html += "</tbody></table></div>"
-            html += "</div></div>"  # End of collapsible section
-            
-            # Target data collapsible section
-            html += "<div class='collapsible-section'>"
-            html += "<div class='collapsible-header'>"
-            html += "<h5 class='mb-0'>Target Data</h5>"
-            html += "<i class='bi bi-chevron-down collapse-icon'></i>"
-            html += "</div>"
-            html += "<div class='collapsible-content'>"
-            html += "<div class='table-responsive'>"
-            html += "<table class='coral-table coral-table-striped coral-table-hover'>"
-            html += "<thead><tr>"
-            for col in columns:
-                html += f"<th>{col}</th>"
-            html += "</tr></thead><tbody>"
-            
-            # Track if we have any rows to display
-            target_rows_displayed = 0
+            parts.append(f"<tr class='{diff_class} expandable-row' data-row-id='Row {row_index}' data-row-details='{row_data_json}'>"
+                         f"<td>{row_index}</td><td>{col}</td><td>{source_val}</td><td>{target_val}</td></tr>")
+            if len(parts) >= chunk_rows:
+                yield "".join(parts)
+                parts = []
+    
+    parts.append("</tbody></table>")
+    parts.append("</div></div></div>")
+    yield "".join(parts)
+
+def iter_data_preview(comparison_result, data_differences, columns, chunk_rows=HTML_CHUNK_ROWS):
+    """Format the source and target rows that have differences as collapsible HTML tables, yielding them in chunks"""
+    source_data = comparison_result.get('source_data', {}).get('rows', [])
+    target_data = comparison_result.get('target_data', {}).get('rows', [])
+    
+    if source_data or target_data:
+        keyed = bool(comparison_result.get('summary', {}).get('key_columns'))
+        source_classes, target_classes = _preview_row_classes(data_differences, keyed, len(source_data),
+                                                              len(target_data))
+        yield from _iter_preview_section('Source Data', source_data, source_classes, columns,
+                                         'No differences found in source data', chunk_rows)
+        yield from _iter_preview_section('Target Data', target_data, target_classes, columns,
+                                         'No differences found in target data', chunk_rows)
+
+def _preview_row_classes(data_differences, keyed, source_count, target_count):
+    """Map the positions of each side's rows with differences to their highlight class
+    
+    Keyed differences carry the row's source_index and/or target_index, so deleted
+    rows are highlighted in the source (red), inserted rows in the target (green) and
+    modified rows on both sides. Positional differences use row_index on both sides;
+    rows beyond the end of the other side are highlighted as deleted or added.
+    """
+    source_classes = {}
+    target_classes = {}
+    for diff in data_differences:
+        if not keyed:
+            row_index = diff.get('row_index', 0)
+            source_classes[row_index] = target_classes[row_index] = 'diff-modified'
+            continue
+        row_class = {'deleted': 'diff-deleted', 'inserted': 'diff-added'}.get(diff.get('status'), 'diff-modified')
+        if diff.get('source_index') is not None:
+            source_classes[diff['source_index']] = row_class
+        if diff.get('target_index') is not None:
+            target_classes[diff['target_index']] = row_class
+    
+    if not keyed:
+        for row_index in range(target_count, source_count):
+            source_classes.setdefault(row_index, 'diff-deleted')
+        for row_index in range(source_count, target_count):
+            target_classes.setdefault(row_index, 'diff-added')
+    return source_classes, target_classes
+
+def _iter_preview_section(title, rows, row_classes, columns, empty_message, chunk_rows):
+    """Format one side's rows with differences as a collapsible HTML table, yielding it in chunks"""
+    html = "<div class='collapsible-section'>"
+    html += "<div class='collapsible-header'>"
+    html += f"<h5 class='mb-0'>{title}</h5>"
+    html += "<i class='bi bi-chevron-down collapse-icon'></i>"
+    html += "</div>"
+    html += "<div class='collapsible-content'>"
+    html += "<div class='table-responsive'>"
+    html += "<table class='coral-table coral-table-striped coral-table-hover'>"
+    html += "<thead><tr>"
+    for col in columns:
+        html += f"<th>{col}</th>"
+    html += "</tr></thead><tbody>"
+    yield html
+    
+    # Track if we have any rows to display
+    rows_displayed = 0
+    parts = []
+    
+    for row_index, row in enumerate(rows):
+        # Only show rows with differences or rows that don't exist on the other side
+        row_class = row_classes.get(row_index)
+        if row_class:
+            rows_displayed += 1
             
-            for row_index, row in enumerate(target_data):
-                # Only show rows with differences or rows that don't exist in source
-                if row_index in row_differences or row_index >= len(source_data):
-                    target_rows_displayed += 1
-                    
-                    # Apply row highlighting based on differences
-                    if row_index in row_differences:
-                        html += "<tr class='diff-modified'>"  # Blue for modified
-                    else:
-                        # This row doesn't exist in source
-                        html += "<tr class='diff-added'>"  # Green for added
-                            
-                    for col in columns:
-                        html += f"<td>{row.get(col, '')}</td>"
-                    html += "</tr>"
+            parts.append(f"<tr class='{row_class}'>")
+            parts.extend(f"<td>{row.get(col, '')}</td>" for col in columns)
+            parts.append("</tr>")
             
-            if target_rows_displayed == 0:
-                html += "<tr><td colspan='" + str(len(columns)) + "' class='text-center'>No differences found in target data</td></tr>"
-                
-            html += "</tbody></table></div>"
-            html += "</div></div>"  # End of collapsible section
+            if rows_displayed % chunk_rows == 0:
+                yield "".join(parts)
+                parts = []
     
-    return html
+    if rows_displayed == 0:
+        parts.append("<tr><td colspan='" + str(len(columns)) + f"' class='text-center'>{empty_message}</td></tr>")
+        
+    parts.append("</tbody></table></div>")
+    parts.append("</div></div>")  # End of collapsible section
+    yield "".join(parts)
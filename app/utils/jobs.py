@@ -0,0 +1,214 @@
+"""
+Background job engine for long-running comparisons.
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from app.utils.result_store import ResultStore
+
+# Job states
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_COMPLETE = 'complete'
+JOB_ERROR = 'error'
+JOB_CANCELLED = 'cancelled'
+
+FINISHED_STATES = (JOB_COMPLETE, JOB_ERROR, JOB_CANCELLED)
+
+# Directory holding the result files of jobs
+JOB_RESULTS_DIR = os.path.join(tempfile.gettempdir(), 'db_comparison_results', 'jobs')
+
+class Job:
+    """State of one background job, updated by the worker and read by status requests
+
+    Results go to the job's ResultStore when it has one and are kept in memory otherwise.
+    """
+
+    def __init__(self, job_id, kind, result_store=None):
+        """Initialize a queued job."""
+        self.id = job_id
+        self.kind = kind
+        self.status = JOB_QUEUED
+        self.total = None
+        self.processed = 0
+        self.current_item = None
+        self.results = []
+        self.result_store = result_store
+        self.details = {}
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.version = 0
+        self._cancel_event = threading.Event()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+    @property
+    def cancelled(self):
+        """Whether cancellation has been requested; workers check this between steps"""
+        return self._cancel_event.is_set()
+
+    def update(self, total=None, processed=None, current_item=None):
+        """Record progress"""
+        with self._lock:
+            if total is not None:
+                self.total = total
+            if processed is not None:
+                self.processed = processed
+            self.current_item = current_item
+            self._notify_changed()
+
+    def add_results(self, results):
+        """Append finished result entries"""
+        if self.result_store is not None:
+            self.result_store.append(results)
+            with self._lock:
+                self._notify_changed()
+            return
+        with self._lock:
+            self.results.extend(results)
+            self._notify_changed()
+
+    def finish(self, status):
+        """Mark the job as finished"""
+        with self._lock:
+            self.status = status
+            self.current_item = None
+            self.finished_at = time.time()
+            self._notify_changed()
+
+    def _notify_changed(self):
+        """Wake threads waiting for a change (caller holds the lock)"""
+        self.version += 1
+        self._changed.notify_all()
+
+    def wait_for_change(self, version, timeout=None):
+        """Block until the job changes after version, or timeout; returns the current version"""
+        with self._lock:
+            self._changed.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def get_results(self, offset=0, limit=None):
+        """Get a copy of the results from offset onwards"""
+        if self.result_store is not None:
+            return self.result_store.get_range(offset, limit)
+        with self._lock:
+            end = None if limit is None else offset + limit
+            return self.results[offset:end]
+
+    @property
+    def result_count(self):
+        """Number of results added so far"""
+        if self.result_store is not None:
+            return len(self.result_store)
+        return len(self.results)
+
+    def to_dict(self):
+        """Get a snapshot of the job state without its results"""
+        with self._lock:
+            if self.status == JOB_COMPLETE:
+                progress = 100
+            elif self.total:
+                progress = min(100, int((self.processed / self.total) * 100))
+            else:
+                progress = 0
+            return {
+                'job_id': self.id,
+                'kind': self.kind,
+                'status': self.status,
+                'progress': progress,
+                'processed': self.processed,
+                'total': self.total,
+                'current_item': self.current_item,
+                'result_count': self.result_count,
+                'details': dict(self.details),
+                'error': self.error,
+                'created_at': self.created_at,
+                'finished_at': self.finished_at
+            }
+
+class JobManager:
+    """Runs jobs on a worker pool and keeps their state for status requests.
+
+    A job function is called as func(job, *args, **kwargs). It reports progress and
+    results through the job and should return early once job.cancelled is set.
+    Finished jobs are kept for retention seconds so clients can fetch their results.
+    With a results_dir, each job's results are written to a ResultStore in a
+    directory of its own, which is deleted when the job is pruned.
+    """
+
+    def __init__(self, max_workers=2, retention=3600, results_dir=None):
+        """Initialize the job manager."""
+        self.retention = retention
+        self.results_dir = results_dir
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='comparison-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind, func, *args, **kwargs):
+        """Queue a job and return its id"""
+        self.prune()
+        job_id = uuid.uuid4().hex
+        result_store = None
+        if self.results_dir:
+            result_store = ResultStore(os.path.join(self.results_dir, job_id, 'results.jsonl'))
+        job = Job(job_id, kind, result_store)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job.id
+
+    def _run(self, job, func, args, kwargs):
+        """Run a job function and record how it finished"""
+        if job.cancelled:
+            job.finish(JOB_CANCELLED)
+            return
+
+        job.status = JOB_RUNNING
+        try:
+            func(job, *args, **kwargs)
+            job.finish(JOB_CANCELLED if job.cancelled else JOB_COMPLETE)
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            job.error = str(e)
+            job.finish(JOB_ERROR)
+
+    def get(self, job_id):
+        """Get a job by id, or None if it doesn't exist"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def status(self, job_id):
+        """Get a snapshot of a job's state, or None if it doesn't exist"""
+        job = self.get(job_id)
+        return job.to_dict() if job else None
+
+    def cancel(self, job_id):
+        """Request cancellation of a job; returns False if it doesn't exist or has finished"""
+        job = self.get(job_id)
+        if not job or job.status in FINISHED_STATES:
+            return False
+        job._cancel_event.set()
+        return True
+
+    def prune(self):
+        """Forget finished jobs older than the retention period"""
+        cutoff = time.time() - self.retention
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished_at is not None and job.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+        if self.results_dir:
+            for job_id in expired:
+                shutil.rmtree(os.path.join(self.results_dir, job_id), ignore_errors=True)
+
+# Shared job manager for the comparison routes
+job_manager = JobManager(results_dir=JOB_RESULTS_DIR)
@@ -0,0 +1,260 @@
+"""
+Phase timers and Prometheus metrics for the Database Comparison Tool.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, request
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+# Upper bounds of the rows fetched histogram buckets
+ROW_BUCKETS = (10, 100, 1000, 10000, 100000, 1000000, 10000000, 100000000)
+
+# Upper bounds of the diff throughput histogram buckets, in rows per second
+THROUGHPUT_BUCKETS = (100, 1000, 10000, 50000, 100000, 500000, 1000000, 5000000)
+
+# Phases of a comparison, in the order they are reported
+PHASES = ('connect', 'catalog', 'data_fetch', 'compare_data', 'persist', 'format')
+
+def _format_value(value):
+    """Format a sample value in the Prometheus text format"""
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def _format_labels(labels):
+    """Format a label set in the Prometheus text format"""
+    if not labels:
+        return ''
+    pairs = []
+    for name, value in labels:
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{escaped}"')
+    return '{' + ','.join(pairs) + '}'
+
+class Histogram:
+    """Thread-safe Prometheus histogram with optional labels"""
+
+    def __init__(self, name, documentation, buckets, label_names=()):
+        """
+        Initialize the histogram
+
+        Args:
+            name (str): Metric name
+            documentation (str): Help text
+            buckets (tuple): Increasing upper bounds of the buckets; +Inf is added
+            label_names (tuple): Names of the labels every observation carries
+        """
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets) + (float('inf'),)
+        self.label_names = tuple(label_names)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """Record one observation"""
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][i] += 1
+                    break
+            series['sum'] += value
+            series['count'] += 1
+
+    def reset(self):
+        """Forget every observation"""
+        with self._lock:
+            self._series.clear()
+
+    def get_series(self, **labels):
+        """Get a copy of the counts, sum and count of one label set, or None"""
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            return {'counts': list(series['counts']), 'sum': series['sum'], 'count': series['count']} if series else None
+
+    def render(self):
+        """Render the histogram in the Prometheus text format"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted(self._series.items())
+            for key, values in series:
+                labels = list(zip(self.label_names, key))
+                cumulative = 0
+                for bound, count in zip(self.buckets, values['counts']):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(labels + [('le', _format_value(bound))])} "
+                                 f"{cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(values['sum'])}")
+                lines.append(f"{self.name}_count{_format_labels(labels)} {values['count']}")
+        return lines
+
+class MetricsRegistry:
+    """The histograms exposed on /metrics"""
+
+    def __init__(self):
+        """Initialize the registry"""
+        self.request_latency = Histogram('dbcompare_request_duration_seconds', 'HTTP request latency.',
+                                         LATENCY_BUCKETS, ('method', 'endpoint', 'status'))
+        self.query_latency = Histogram('dbcompare_query_duration_seconds', 'Database query execution latency.',
+                                       LATENCY_BUCKETS, ('backend',))
+        self.phase_latency = Histogram('dbcompare_phase_duration_seconds', 'Time spent per comparison phase.',
+                                       LATENCY_BUCKETS, ('kind', 'phase'))
+        self.rows_fetched = Histogram('dbcompare_rows_fetched', 'Rows fetched per table side of a data comparison.',
+                                      ROW_BUCKETS, ('method',))
+        self.diff_throughput = Histogram('dbcompare_diff_throughput_rows_per_second',
+                                         'Rows compared per second of fetching and comparing.',
+                                         THROUGHPUT_BUCKETS, ('method',))
+
+    @property
+    def histograms(self):
+        """Get every histogram of the registry"""
+        return [self.request_latency, self.query_latency, self.phase_latency, self.rows_fetched, self.diff_throughput]
+
+    def reset(self):
+        """Forget every observation"""
+        for histogram in self.histograms:
+            histogram.reset()
+
+    def render(self, pool_metrics=None):
+        """
+        Render every metric in the Prometheus text format
+
+        Args:
+            pool_metrics (dict): ConnectionPool.get_metrics() output to include as gauges and counters
+        """
+        lines = []
+        for histogram in self.histograms:
+            lines.extend(histogram.render())
+        if pool_metrics is not None:
+            lines.extend(_render_pool_metrics(pool_metrics))
+        return "\n".join(lines) + "\n"
+
+def _render_pool_metrics(pool_metrics):
+    """Render connection pool metrics, summed per server and database"""
+    totals = {}
+    for key, values in pool_metrics.items():
+        server, database = key[0], key[1]
+        entry = totals.setdefault((server, database), {})
+        for name, value in values.items():
+            entry[name] = entry.get(name, 0) + value
+
+    lines = [
+        "# HELP dbcompare_pool_connections Open pooled connections by state.",
+        "# TYPE dbcompare_pool_connections gauge"
+    ]
+    for (server, database), values in sorted(totals.items()):
+        for state in ('idle', 'in_use'):
+            labels = [('server', server), ('database', database), ('state', state)]
+            lines.append(f"dbcompare_pool_connections{_format_labels(labels)} {values.get(state, 0)}")
+
+    lines.extend([
+        "# HELP dbcompare_pool_events_total Connection pool events.",
+        "# TYPE dbcompare_pool_events_total counter"
+    ])
+    for (server, database), values in sorted(totals.items()):
+        for event, value in sorted(values.items()):
+            if event in ('idle', 'in_use'):
+                continue
+            labels = [('server', server), ('database', database), ('event', event)]
+            lines.append(f"dbcompare_pool_events_total{_format_labels(labels)} {value}")
+    return lines
+
+# Process-wide registry
+metrics = MetricsRegistry()
+
+class PhaseTimer:
+    """Times the phases of one comparison
+
+    Phases nest exclusively: time spent in an inner phase (e.g. fetching a batch
+    while comparing a stream) is counted for the inner phase only. Use finish() once
+    the comparison is done to record the phases on /metrics and get the breakdown.
+    """
+
+    def __init__(self, kind='data', registry=metrics):
+        """
+        Initialize the timer
+
+        Args:
+            kind (str): Kind of comparison, used as a label on /metrics
+            registry (MetricsRegistry): Registry receiving the phase durations
+        """
+        self.kind = kind
+        self.registry = registry
+        self.phases = {}
+        self.started = time.perf_counter()
+        self.finished = None
+        self._stack = []
+
+    @contextmanager
+    def phase(self, name):
+        """Time a block as part of a phase"""
+        frame = [name, 0.0]
+        self._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stack.pop()
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed - frame[1]
+            if self._stack:
+                self._stack[-1][1] += elapsed
+
+    def timed_iter(self, name, iterable):
+        """Wrap an iterable so the time spent producing each item counts for a phase"""
+        iterator = iter(iterable)
+        while True:
+            with self.phase(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def seconds(self, *names):
+        """Get the total time spent in some phases"""
+        return sum(self.phases.get(name, 0.0) for name in names)
+
+    def breakdown(self):
+        """Get the time per phase, in PHASES order, and the total elapsed time"""
+        end = self.finished if self.finished is not None else time.perf_counter()
+        ordered = [name for name in PHASES if name in self.phases] + \
+                  [name for name in self.phases if name not in PHASES]
+        return {
+            'phases': {name: round(self.phases[name], 6) for name in ordered},
+            'total_seconds': round(end - self.started, 6)
+        }
+
+    def finish(self):
+        """Stop the timer, record each phase on /metrics once and return the breakdown"""
+        if self.finished is None:
+            self.finished = time.perf_counter()
+            for name, seconds in self.phases.items():
+                self.registry.phase_latency.observe(seconds, kind=self.kind, phase=name)
+        return self.breakdown()
+
+def init_app(app, registry=metrics):
+    """Record the latency of every request to the application"""
+    @app.before_request
+    def _start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def _observe_request_latency(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            registry.request_latency.observe(time.perf_counter() - started, method=request.method,
+                                             endpoint=endpoint, status=response.status_code)
+        return response
+
+    return app
@@ -0,0 +1,203 @@
+"""
+Parallel schema comparison across tables for the Database Comparison Tool.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from app.models.database import create_connection
+from app.models.metadata_cache import metadata_cache
+from app.utils.comparison import compare_schemas
+from app.utils.dual_side import run_both, SideError
+from app.utils.metrics import PhaseTimer
+
+# Default number of worker threads for schema comparison
+DEFAULT_SCHEMA_WORKERS = 4
+
+# Number of tables a schema comparison job compares between progress updates
+SCHEMA_BATCH_SIZE = 25
+
+def build_schema_result(table_name, schemas1, schemas2):
+    """Build the schema comparison entry for one table from the loaded schemas of both sides"""
+    in_db1 = table_name in schemas1
+    in_db2 = table_name in schemas2
+
+    if in_db1 and in_db2:
+        column_comparison = compare_schemas(schemas1[table_name], schemas2[table_name])
+        return {
+            'table_name': table_name,
+            'in_db1': True,
+            'in_db2': True,
+            'columns': column_comparison.get('differences', []),
+            'differences': len(column_comparison.get('differences', [])) > 0
+        }
+
+    return {
+        'table_name': table_name,
+        'in_db1': in_db1,
+        'in_db2': in_db2,
+        'columns': [],
+        'differences': in_db1 != in_db2
+    }
+
+def open_connection(conn):
+    """Create and connect a database connection from a connection details dict"""
+    db = create_connection(conn)
+    if not db.connect():
+        raise ConnectionError(f"Failed to connect to {conn.get('name', conn['database'])}")
+    return db
+
+def open_connections(source_conn, target_conn):
+    """Open the source and target connections concurrently, returning (db1, db2)"""
+    try:
+        return run_both(lambda: open_connection(source_conn), lambda: open_connection(target_conn),
+                        (source_conn.get('name'), target_conn.get('name')))
+    except SideError as e:
+        # Don't leak the side that did connect
+        for db in e.results:
+            if db is not None:
+                db.disconnect()
+        raise e.error
+
+def _load_schemas(conn, table_names):
+    """Load the schemas of a chunk of tables on a dedicated connection"""
+    db = open_connection(conn)
+    try:
+        return metadata_cache.get_all_table_models(db, table_names)
+    finally:
+        db.disconnect()
+
+def compare_schemas_parallel(source_conn, target_conn, table_names, max_workers=DEFAULT_SCHEMA_WORKERS):
+    """
+    Compare the schemas of many tables using a pool of worker threads
+
+    The tables are split into one contiguous chunk per worker. Each chunk loads its
+    source and target catalogs concurrently on connections of its own, so catalog
+    round trips overlap instead of running one after another. Results are returned
+    in the order of table_names regardless of which worker finishes first.
+
+    Args:
+        source_conn (dict): Source connection details
+        target_conn (dict): Target connection details
+        table_names (list): Tables to compare
+        max_workers (int): Number of chunks compared concurrently
+
+    Returns:
+        list: Schema comparison entries, one per table, in table_names order
+    """
+    table_names = list(table_names)
+    if not table_names:
+        return []
+
+    workers = max(1, min(max_workers, len(table_names)))
+    chunk_size = -(-len(table_names) // workers)
+    chunks = [table_names[i:i + chunk_size] for i in range(0, len(table_names), chunk_size)]
+
+    # Each chunk gets one thread per side so both catalogs are queried at the same time
+    with ThreadPoolExecutor(max_workers=len(chunks) * 2, thread_name_prefix='schema-compare') as executor:
+        futures = [
+            (chunk,
+             executor.submit(_load_schemas, source_conn, chunk),
+             executor.submit(_load_schemas, target_conn, chunk))
+            for chunk in chunks
+        ]
+
+        results = []
+        for chunk, source_future, target_future in futures:
+            schemas1 = source_future.result()
+            schemas2 = target_future.result()
+            results.extend(build_schema_result(table_name, schemas1, schemas2) for table_name in chunk)
+
+    return results
+
+def run_schema_comparison(job, source_conn, target_conn, max_workers=DEFAULT_SCHEMA_WORKERS,
+                          batch_size=SCHEMA_BATCH_SIZE, fingerprint_store=None, full=False):
+    """
+    Background job comparing the schemas of every table in two databases
+
+    Tables are compared in batches with compare_schemas_parallel. After each batch the
+    results are added to the job and cancellation is checked.
+
+    With a fingerprint_store the comparison is incremental: tables whose source and
+    target fingerprints match the previous run reuse its result, and only the others
+    are fetched and compared. The fingerprints of a completed run are saved for the
+    next one. Set full to compare every table regardless.
+
+    Args:
+        job (Job): Job receiving progress and results
+        source_conn (dict): Source connection details
+        target_conn (dict): Target connection details
+        max_workers (int): Number of chunks compared concurrently within a batch
+        batch_size (int): Number of tables compared between progress updates
+        fingerprint_store (FingerprintStore): Store of previous runs, or None to always compare
+        full (bool): Ignore previous results and compare every table
+    
+    The time spent per phase is kept in the job's details as 'timings'.
+    """
+    timer = PhaseTimer(kind='schema')
+    try:
+        _run_schema_comparison(job, timer, source_conn, target_conn, max_workers, batch_size, fingerprint_store, full)
+    finally:
+        job.details['timings'] = timer.finish()
+
+def _run_schema_comparison(job, timer, source_conn, target_conn, max_workers, batch_size, fingerprint_store, full):
+    """Run a schema comparison job, timing its phases"""
+    with timer.phase('connect'):
+        db1, db2 = open_connections(source_conn, target_conn)
+    try:
+        with timer.phase('catalog'):
+            tables1, tables2 = run_both(lambda: metadata_cache.get_tables(db1), lambda: metadata_cache.get_tables(db2))
+            all_tables = sorted(set(tables1) | set(tables2))
+            if fingerprint_store is not None:
+                fingerprints1, fingerprints2 = run_both(db1.get_table_fingerprints, db2.get_table_fingerprints)
+    finally:
+        db1.disconnect()
+        db2.disconnect()
+
+    job.update(total=len(all_tables), processed=0)
+
+    previous = {}
+    entries = {}
+    if fingerprint_store is not None:
+        comparison_key = fingerprint_store.comparison_key(source_conn, target_conn)
+        if not full:
+            previous = fingerprint_store.load(comparison_key)
+    tables_reused = 0
+
+    for start in range(0, len(all_tables), batch_size):
+        if job.cancelled:
+            return
+        batch = all_tables[start:start + batch_size]
+        job.update(processed=start, current_item=batch[0])
+
+        if fingerprint_store is None:
+            with timer.phase('compare_schemas'):
+                results = compare_schemas_parallel(source_conn, target_conn, batch, max_workers=max_workers)
+            with timer.phase('persist'):
+                job.add_results(results)
+            job.update(processed=start + len(batch))
+            continue
+
+        # Reuse the previous result of every table whose fingerprints haven't moved
+        batch_results = {}
+        for table_name in batch:
+            fingerprints = [fingerprints1.get(table_name), fingerprints2.get(table_name)]
+            entry = previous.get(table_name)
+            if entry and entry['fingerprints'] == fingerprints:
+                batch_results[table_name] = entry['result']
+                tables_reused += 1
+            entries[table_name] = {'fingerprints': fingerprints}
+
+        changed = [table_name for table_name in batch if table_name not in batch_results]
+        with timer.phase('compare_schemas'):
+            for result in compare_schemas_parallel(source_conn, target_conn, changed, max_workers=max_workers):
+                batch_results[result['table_name']] = result
+
+        for table_name in batch:
+            entries[table_name]['result'] = batch_results[table_name]
+        with timer.phase('persist'):
+            job.add_results([batch_results[table_name] for table_name in batch])
+        job.update(processed=start + len(batch))
+        job.details['tables_reused'] = tables_reused
+
+    if fingerprint_store is not None and not job.cancelled:
+        with timer.phase('persist'):
+            fingerprint_store.save(comparison_key, entries)
@@ -0,0 +1,314 @@
+"""
+Query tracing for the Database Comparison Tool.
+
+Every query run through a TracedCursor is recorded with its SQL fingerprint, the shape
+of its parameters, its duration, the rows it returned and their approximate size.
+Queries slower than a threshold are written to a rotating slow-query log, and in debug
+mode the queries of each request are listed in a panel at the bottom of the page.
+"""
+import datetime
+import decimal
+import hashlib
+import logging
+import logging.handlers
+import os
+import re
+import tempfile
+import threading
+import time
+
+from flask import g, has_request_context
+
+from app.utils.metrics import metrics
+
+# Queries taking at least this many milliseconds (execute plus fetches) are logged
+DEFAULT_SLOW_QUERY_THRESHOLD_MS = 1000
+
+# File the slow queries are logged to
+DEFAULT_SLOW_QUERY_LOG = os.path.join(tempfile.gettempdir(), 'db_comparison_logs', 'slow_queries.log')
+
+# Size at which the slow-query log is rotated, and the number of old logs kept
+SLOW_QUERY_LOG_MAX_BYTES = 5 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 5
+
+# Longest SQL text kept per traced query
+MAX_SQL_LENGTH = 2000
+
+# Rows sampled per fetch to estimate the size of the rows returned
+SIZE_SAMPLE_ROWS = 8
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRINGS = re.compile(r"N?'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAMETERS = re.compile(r"%s|%\(\w+\)s")
+_IN_LISTS = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.I)
+_WHITESPACE = re.compile(r"\s+")
+
+def fingerprint_sql(query):
+    """
+    Normalize a query so that executions differing only in their values match
+
+    Comments are removed, literals and parameter markers become ?, IN lists collapse
+    to IN (...) and whitespace is collapsed.
+    """
+    text = _COMMENTS.sub(' ', query)
+    text = _STRINGS.sub('?', text)
+    text = _PARAMETERS.sub('?', text)
+    text = _NUMBERS.sub('?', text)
+    text = _IN_LISTS.sub('IN (...)', text)
+    return _WHITESPACE.sub(' ', text).strip()
+
+def params_shape(params):
+    """Describe the shape of query parameters without their values, e.g. (str, tuple[12])"""
+    if params is None:
+        return ''
+    if isinstance(params, dict):
+        return '{' + ', '.join(f"{key}: {_type_name(value)}" for key, value in params.items()) + '}'
+    if isinstance(params, (tuple, list)):
+        return '(' + ', '.join(_type_name(value) for value in params) + ')'
+    return _type_name(params)
+
+def _type_name(value):
+    """Name the type of a parameter, with the length of sequences"""
+    if isinstance(value, (tuple, list)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+def _value_size(value):
+    """Approximate the size of a value on the wire, in bytes"""
+    if value is None:
+        return 0
+    if isinstance(value, (str, bytes, bytearray)):
+        return len(value)
+    if isinstance(value, (bool, int, float, datetime.datetime, datetime.date)):
+        return 8
+    if isinstance(value, decimal.Decimal):
+        return 16
+    return len(str(value))
+
+def approximate_size(rows):
+    """Approximate the size of fetched rows from a sample of them, in bytes"""
+    if not rows:
+        return 0
+    step = max(1, len(rows) // SIZE_SAMPLE_ROWS)
+    sample = rows[::step]
+    sampled = sum(_value_size(value) for row in sample for value in row)
+    return int(sampled * len(rows) / len(sample))
+
+class QueryTracer:
+    """Collects traced queries: slow-query log, per-request panel and latency metrics"""
+
+    def __init__(self, threshold_ms=DEFAULT_SLOW_QUERY_THRESHOLD_MS, log_path=DEFAULT_SLOW_QUERY_LOG):
+        """Initialize the tracer"""
+        self.threshold_ms = threshold_ms
+        self.log_path = log_path
+        self._logger = None
+        self._lock = threading.Lock()
+
+    def configure(self, threshold_ms=None, log_path=None):
+        """Change the slow-query threshold or log file"""
+        with self._lock:
+            if threshold_ms is not None:
+                self.threshold_ms = threshold_ms
+            if log_path is not None and log_path != self.log_path:
+                self.log_path = log_path
+                self._close_logger()
+
+    def _close_logger(self):
+        """Close the slow-query log file (caller holds the lock)"""
+        if self._logger is not None:
+            for handler in list(self._logger.handlers):
+                self._logger.removeHandler(handler)
+                handler.close()
+            self._logger = None
+
+    def _get_logger(self):
+        """Get the slow-query logger, opening its rotating log file on first use"""
+        with self._lock:
+            if self._logger is None:
+                os.makedirs(os.path.dirname(self.log_path) or '.', exist_ok=True)
+                handler = logging.handlers.RotatingFileHandler(
+                    self.log_path, maxBytes=SLOW_QUERY_LOG_MAX_BYTES, backupCount=SLOW_QUERY_LOG_BACKUPS,
+                    encoding='utf-8')
+                handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+                # A logger of its own, so each tracer writes only to its own file
+                logger = logging.Logger(f"{__name__}.slow_queries", logging.INFO)
+                logger.addHandler(handler)
+                self._logger = logger
+            return self._logger
+
+    def started(self, trace):
+        """Record a query whose execute call returned"""
+        metrics.query_latency.observe(trace['execute_ms'] / 1000, backend=trace['backend'])
+        if has_request_context() and g.get('query_traces') is not None:
+            g.query_traces.append(trace)
+
+    def finished(self, trace):
+        """Record a query whose results have been fetched, logging it if it was slow"""
+        if self.threshold_ms is not None and trace['duration_ms'] >= self.threshold_ms:
+            self._get_logger().info(
+                "duration_ms=%.1f rows=%d bytes=%d backend=%s fingerprint=%s params=%s sql=%s",
+                trace['duration_ms'], trace['rows'], trace['bytes'], trace['backend'], trace['fingerprint_id'],
+                trace['params'] or '-', trace['fingerprint'])
+
+# Process-wide tracer
+query_tracer = QueryTracer()
+
+class TracedCursor:
+    """Cursor wrapper tracing one query from its execute call to its last fetch
+
+    The query counts as finished once fetchone() or fetchall() is called, fetchmany()
+    returns fewer rows than requested, or right after execute() when the statement
+    returns no result set. Its duration is the time spent in execute and fetch calls.
+    """
+
+    def __init__(self, cursor, backend, tracer=None):
+        """
+        Initialize the wrapper
+
+        Args:
+            cursor: DB-API cursor running the query
+            backend (str): Name of the database, for the metrics and logs
+            tracer (QueryTracer): Tracer receiving the query, query_tracer by default
+        """
+        self.cursor = cursor
+        self.backend = backend
+        self.tracer = tracer or query_tracer
+        self.trace = None
+
+    def execute(self, query, params=None):
+        """Execute a query and start tracing it"""
+        start = time.perf_counter()
+        try:
+            if params is None:
+                self.cursor.execute(query)
+            else:
+                self.cursor.execute(query, params)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            fingerprint = fingerprint_sql(query)
+            self.trace = {
+                'backend': self.backend,
+                'fingerprint': fingerprint,
+                'fingerprint_id': hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:12],
+                'sql': query.strip()[:MAX_SQL_LENGTH],
+                'params': params_shape(params),
+                'execute_ms': elapsed_ms,
+                'duration_ms': elapsed_ms,
+                'rows': 0,
+                'bytes': 0,
+                'finished': False
+            }
+            self.tracer.started(self.trace)
+        if getattr(self.cursor, 'description', False) is None:
+            self._finish()
+        return self
+
+    def _fetched(self, rows, elapsed_ms):
+        """Add fetched rows to the trace"""
+        self.trace['duration_ms'] += elapsed_ms
+        self.trace['rows'] += len(rows)
+        self.trace['bytes'] += approximate_size(rows)
+
+    def _finish(self):
+        """Mark the query finished and hand it to the tracer once"""
+        if self.trace is not None and not self.trace['finished']:
+            self.trace['finished'] = True
+            self.tracer.finished(self.trace)
+
+    def fetchone(self):
+        """Fetch one row and finish the query"""
+        start = time.perf_counter()
+        row = self.cursor.fetchone()
+        self._fetched([row] if row is not None else [], (time.perf_counter() - start) * 1000)
+        self._finish()
+        return row
+
+    def fetchall(self):
+        """Fetch every remaining row and finish the query"""
+        start = time.perf_counter()
+        rows = self.cursor.fetchall()
+        self._fetched(rows, (time.perf_counter() - start) * 1000)
+        self._finish()
+        return rows
+
+    def fetchmany(self, size):
+        """Fetch a batch of rows, finishing the query when the results run out"""
+        start = time.perf_counter()
+        rows = self.cursor.fetchmany(size)
+        self._fetched(rows, (time.perf_counter() - start) * 1000)
+        if len(rows) < size:
+            self._finish()
+        return rows
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+def summarize_traces(traces):
+    """
+    Group a request's traced queries by fingerprint, most executed first
+
+    Returns:
+        dict: 'queries' (count), 'duration_ms', 'rows', 'bytes' and 'groups', one per
+            fingerprint with its calls, total duration, rows, bytes and sample SQL
+    """
+    groups = {}
+    for trace in traces:
+        group = groups.get(trace['fingerprint_id'])
+        if group is None:
+            group = groups[trace['fingerprint_id']] = {
+                'fingerprint_id': trace['fingerprint_id'],
+                'fingerprint': trace['fingerprint'],
+                'backend': trace['backend'],
+                'params': trace['params'],
+                'calls': 0,
+                'duration_ms': 0.0,
+                'rows': 0,
+                'bytes': 0
+            }
+        group['calls'] += 1
+        group['duration_ms'] += trace['duration_ms']
+        group['rows'] += trace['rows']
+        group['bytes'] += trace['bytes']
+    return {
+        'queries': len(traces),
+        'duration_ms': sum(trace['duration_ms'] for trace in traces),
+        'rows': sum(trace['rows'] for trace in traces),
+        'bytes': sum(trace['bytes'] for trace in traces),
+        'groups': sorted(groups.values(), key=lambda group: (-group['calls'], -group['duration_ms']))
+    }
+
+def init_app(app, tracer=query_tracer):
+    """
+    Configure the slow-query log from the app config and, in debug mode, collect each
+    request's queries for the query panel
+
+    Reads SLOW_QUERY_THRESHOLD_MS, SLOW_QUERY_LOG and QUERY_PANEL (defaults to
+    app.debug); unset values keep the tracer's current settings.
+    """
+    tracer.configure(threshold_ms=app.config.get('SLOW_QUERY_THRESHOLD_MS'),
+                     log_path=app.config.get('SLOW_QUERY_LOG'))
+
+    def panel_enabled():
+        return app.config.get('QUERY_PANEL', app.debug)
+
+    @app.before_request
+    def _start_query_panel():
+        if panel_enabled():
+            g.query_traces = []
+
+    @app.context_processor
+    def _inject_query_panel():
+        traces = g.get('query_traces') if has_request_context() else None
+        return {'query_panel': summarize_traces(traces) if traces is not None else None}
+
+    @app.after_request
+    def _add_query_headers(response):
+        traces = g.get('query_traces')
+        if traces is not None:
+            summary = summarize_traces(traces)
+            response.headers['X-Query-Count'] = str(summary['queries'])
+            response.headers['X-Query-Duration-Ms'] = f"{summary['duration_ms']:.1f}"
+        return response
+
+    return app
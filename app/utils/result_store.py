@@ -0,0 +1,105 @@
+"""
+Append-only store for comparison results.
+"""
+import json
+import os
+import threading
+
+class ResultStore:
+    """Append-only JSON Lines file of result entries, indexed by position and key.
+
+    Appending a batch writes only the new lines, and reads seek straight to the
+    entries they need, so neither grows with the number of entries already stored.
+    The index holds the byte offset of every line and is rebuilt by scanning the
+    file when an existing store is opened.
+    """
+
+    def __init__(self, path, key='table_name'):
+        """Open or create the store at path."""
+        self.path = path
+        self.key = key
+        self._offsets = []
+        self._index = {}
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            self._load_index()
+        else:
+            open(path, 'ab').close()
+
+    def _load_index(self):
+        """Rebuild the offset and key index from the file"""
+        with open(self.path, 'r+b') as f:
+            offset = f.tell()
+            for line in iter(f.readline, b''):
+                if not line.endswith(b'\n'):
+                    # Drop a partial line left by an interrupted append
+                    f.truncate(offset)
+                    break
+                self._add_to_index(json.loads(line), offset)
+                offset = f.tell()
+
+    def _add_to_index(self, entry, offset):
+        """Record the position of an entry (caller holds the lock)"""
+        if isinstance(entry, dict) and self.key in entry:
+            self._index[entry[self.key]] = len(self._offsets)
+        self._offsets.append(offset)
+
+    def append(self, entries):
+        """Append a batch of entries"""
+        lines = [json.dumps(entry).encode('utf-8') + b'\n' for entry in entries]
+        if not lines:
+            return
+        with self._lock:
+            with open(self.path, 'ab') as f:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(b''.join(lines))
+            for entry, line in zip(entries, lines):
+                self._add_to_index(entry, offset)
+                offset += len(line)
+
+    def __len__(self):
+        """Get the number of stored entries"""
+        return len(self._offsets)
+
+    def get_range(self, offset=0, limit=None):
+        """Get up to limit entries starting at position offset"""
+        with self._lock:
+            end = len(self._offsets) if limit is None else min(len(self._offsets), offset + limit)
+            if offset >= end:
+                return []
+            start_byte = self._offsets[offset]
+            count = end - offset
+
+        entries = []
+        with open(self.path, 'rb') as f:
+            f.seek(start_byte)
+            for _ in range(count):
+                entries.append(json.loads(f.readline()))
+        return entries
+
+    def get_positions(self, positions):
+        """Get the entries at some positions, in the order given"""
+        with self._lock:
+            start_bytes = [self._offsets[position] for position in positions]
+
+        entries = []
+        with open(self.path, 'rb') as f:
+            for start_byte in start_bytes:
+                f.seek(start_byte)
+                entries.append(json.loads(f.readline()))
+        return entries
+
+    def get(self, key):
+        """Get the entry stored under key, or None"""
+        with self._lock:
+            position = self._index.get(key)
+        if position is None:
+            return None
+        return self.get_range(position, 1)[0]
+
+    def keys(self):
+        """Get the keys of the stored entries in the order they were appended"""
+        with self._lock:
+            return sorted(self._index, key=self._index.get)
@@ -0,0 +1,153 @@
+"""
+Deterministic sampling for estimating how much of a very large table differs.
+"""
+import math
+from statistics import NormalDist
+
+from app.utils.comparison import compare_data_by_key
+from app.utils.dual_side import run_both
+
+# Number of keys a sample aims for when none is given
+DEFAULT_SAMPLE_SIZE = 10000
+
+# Confidence level of the reported mismatch rate interval
+DEFAULT_CONFIDENCE = 0.95
+
+# Without row count metadata, tables are counted up to this many times the sample size
+COUNT_LIMIT_FACTOR = 100
+
+def choose_modulus(estimated_rows, sample_size):
+    """Get the modulus that samples about sample_size rows out of estimated_rows (1 = every row)"""
+    if not estimated_rows or sample_size <= 0:
+        return 1
+    return max(1, int(estimated_rows // sample_size))
+
+def wilson_interval(successes, trials, confidence=DEFAULT_CONFIDENCE):
+    """
+    Wilson score interval for a proportion
+
+    Unlike the normal approximation it stays within [0, 1] and remains meaningful
+    when no or very few mismatches are observed, which is the usual case here.
+
+    Returns:
+        tuple: (lower bound, upper bound), or (0.0, 1.0) without any trials
+    """
+    if trials <= 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    proportion = successes / trials
+    denominator = 1 + z * z / trials
+    centre = (proportion + z * z / (2 * trials)) / denominator
+    margin = z * math.sqrt(proportion * (1 - proportion) / trials + z * z / (4 * trials * trials)) / denominator
+    # The bounds are exact at the extremes; computing them leaves rounding noise
+    lower = 0.0 if successes == 0 else max(0.0, centre - margin)
+    upper = 1.0 if successes == trials else min(1.0, centre + margin)
+    return lower, upper
+
+def estimate_row_count(db, table_name, sample_size):
+    """
+    Get the row count a sample of a table is sized from
+
+    Row count metadata is used when the backend has it. Otherwise the rows are counted,
+    but only up to COUNT_LIMIT_FACTOR times the sample size, so sizing never scans a
+    huge table.
+
+    Raises:
+        ValueError: If the table has no row count metadata and reaches the count limit
+    """
+    estimate = db.get_estimated_row_count(table_name)
+    if estimate is not None:
+        return estimate
+    limit = max(1, sample_size) * COUNT_LIMIT_FACTOR
+    count = db.get_bounded_row_count(table_name, limit)
+    if count >= limit:
+        raise ValueError(f"Can't size a sample of {table_name}: it has no row count estimate "
+                         f"and at least {limit} rows")
+    return count
+
+def compare_data_by_sample(db1, db2, table1, table2, key_columns, columns, sample_size=DEFAULT_SAMPLE_SIZE,
+                           residue=0, confidence=DEFAULT_CONFIDENCE, max_differences=1000, null_text='None'):
+    """
+    Compare a deterministic sample of two tables and estimate their mismatch rate
+
+    Rows are sampled by hashing their key values on the server and keeping those whose
+    hash is residue modulo a modulus chosen from the tables' estimated row counts, so
+    both sides return the same keys and repeated runs return the same sample. Only the
+    sample crosses the network. The sampled rows are compared by key; the share of
+    sampled keys that differ (modified, or on one side only) estimates the mismatch
+    rate of the whole table, reported with a Wilson confidence interval.
+
+    Args:
+        db1 (DatabaseConnection): Source connection
+        db2 (DatabaseConnection): Target connection
+        table1 (str): Source table name
+        table2 (str): Target table name
+        key_columns (list): Columns that uniquely identify a row
+        columns (list): Columns to compare
+        sample_size (int): Approximate number of keys to sample
+        residue (int): Which of the modulus disjoint samples to take
+        confidence (float): Confidence level of the interval
+        max_differences (int): Maximum number of difference entries to keep
+        null_text (str): Text used to display NULL values in the differences
+
+    Returns:
+        dict: Comparison result of the sampled rows with the same shape as
+            compare_data_by_key, plus 'sample_stats' in the summary
+
+    Raises:
+        SideError: If either table can't be sized (see estimate_row_count())
+    """
+    columns = list(columns)
+    for key_column in reversed(key_columns):
+        if key_column not in columns:
+            columns.insert(0, key_column)
+
+    # Only the two tables are counted, from metadata where there is some
+    estimated1, estimated2 = run_both(lambda: estimate_row_count(db1, table1, sample_size),
+                                      lambda: estimate_row_count(db2, table2, sample_size))
+    modulus = choose_modulus(max(estimated1, estimated2), sample_size)
+    residue = residue % modulus
+
+    data1, data2 = run_both(lambda: db1.get_sampled_rows(table1, columns, key_columns, modulus, residue),
+                            lambda: db2.get_sampled_rows(table2, columns, key_columns, modulus, residue))
+    comparison_result = compare_data_by_key(data1, data2, columns, key_columns, null_text)
+
+    summary = comparison_result['summary']
+    sampled_keys = summary['total_rows_compared'] + summary['rows_deleted'] + summary['rows_inserted']
+    mismatches = summary['rows_with_differences']
+    mismatch_rate = mismatches / sampled_keys if sampled_keys else 0.0
+    if modulus == 1:
+        # Every row was compared, so the rate is exact
+        lower = upper = mismatch_rate
+    else:
+        lower, upper = wilson_interval(mismatches, sampled_keys, confidence)
+
+    # Each sampled key stands for about modulus keys of the tables
+    estimated_keys = sampled_keys * modulus
+    summary['sample_stats'] = {
+        'method': 'key_hash',
+        'modulus': modulus,
+        'residue': residue,
+        'sample_fraction': 1 / modulus,
+        'estimated_source_rows': estimated1,
+        'estimated_target_rows': estimated2,
+        'sampled_keys': sampled_keys,
+        'mismatches': mismatches,
+        'mismatch_rate': mismatch_rate,
+        'confidence': confidence,
+        'mismatch_rate_low': lower,
+        'mismatch_rate_high': upper,
+        'estimated_mismatched_rows': round(mismatch_rate * estimated_keys),
+        'estimated_mismatched_rows_low': math.floor(lower * estimated_keys),
+        'estimated_mismatched_rows_high': math.ceil(upper * estimated_keys)
+    }
+
+    differences = comparison_result['data_differences']
+    summary['differences_truncated'] = len(differences) > max_differences
+    comparison_result['data_differences'] = differences[:max_differences]
+    comparison_result.update({
+        'columns': columns,
+        'source_data': data1,
+        'target_data': data2
+    })
+    return comparison_result
@@ -0,0 +1,3 @@
+"""
+Benchmark suite for the comparison engine of the Database Comparison Tool.
+"""
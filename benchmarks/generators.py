@@ -0,0 +1,224 @@
+"""
+Synthetic data generators for the benchmark suite.
+
+Every generator is deterministic for a given seed, so runs are comparable with the
+saved baselines.
+"""
+import datetime
+import decimal
+import os
+import random
+import sqlite3
+
+# Column types cycled over the generated columns
+DEFAULT_TYPE_MIX = ('int', 'str', 'float', 'datetime', 'decimal')
+
+# SQL Server data type of each generated column type, for schemas and scripts
+SQL_TYPES = {
+    'int': ('int', 'int'),
+    'str': ('nvarchar', 'nvarchar(100)'),
+    'float': ('float', 'float'),
+    'datetime': ('datetime2', 'datetime2'),
+    'decimal': ('decimal', 'decimal(18,2)')
+}
+
+_EPOCH = datetime.datetime(2020, 1, 1)
+
+def _value(type_name, rng):
+    """Generate a random value of a column type"""
+    if type_name == 'int':
+        return rng.randrange(1000000)
+    if type_name == 'str':
+        return f"value-{rng.randrange(1000000)}"
+    if type_name == 'float':
+        return rng.random() * 1000
+    if type_name == 'datetime':
+        return _EPOCH + datetime.timedelta(seconds=rng.randrange(100000000))
+    if type_name == 'decimal':
+        return decimal.Decimal(rng.randrange(10000000)) / 100
+    raise ValueError(f"Unknown column type: {type_name}")
+
+def column_names(columns):
+    """Get the names of the generated columns; the first one is the integer key"""
+    return ['id'] + [f"col_{i}" for i in range(1, columns)]
+
+def column_types(columns, type_mix=DEFAULT_TYPE_MIX):
+    """Get the type of each generated column"""
+    return ['int'] + [type_mix[(i - 1) % len(type_mix)] for i in range(1, columns)]
+
+def iter_row_pairs(rows, columns=8, diff_rate=0.01, null_density=0.05, type_mix=DEFAULT_TYPE_MIX, seed=0):
+    """
+    Generate pairs of source and target rows as tuples
+
+    The first column is a unique increasing key. A diff_rate fraction of the target
+    rows has one non-key value changed, and a null_density fraction of the non-key
+    cells is NULL on both sides.
+
+    Yields:
+        tuple: (source row, target row)
+    """
+    rng = random.Random(seed)
+    types = column_types(columns, type_mix)
+    for key in range(rows):
+        row = [key]
+        for type_name in types[1:]:
+            row.append(None if rng.random() < null_density else _value(type_name, rng))
+        source = tuple(row)
+        if columns > 1 and rng.random() < diff_rate:
+            position = rng.randrange(1, columns)
+            row[position] = _value(types[position], rng)
+        yield source, tuple(row)
+
+def generate_table_data(rows, columns=8, diff_rate=0.01, null_density=0.05, type_mix=DEFAULT_TYPE_MIX, seed=0):
+    """
+    Generate source and target table data as DatabaseConnection.get_table_data returns it
+
+    Returns:
+        tuple: (source data, target data), each a dict with 'columns', 'rows' and 'total_rows'
+    """
+    names = column_names(columns)
+    rows1 = []
+    rows2 = []
+    for source, target in iter_row_pairs(rows, columns, diff_rate, null_density, type_mix, seed):
+        rows1.append(dict(zip(names, source)))
+        rows2.append(dict(zip(names, target)))
+    return (
+        {'columns': names, 'rows': rows1, 'total_rows': rows},
+        {'columns': names, 'rows': rows2, 'total_rows': rows}
+    )
+
+def generate_row_batches(rows, columns=8, diff_rate=0.01, null_density=0.05, type_mix=DEFAULT_TYPE_MIX, seed=0,
+                         batch_size=5000):
+    """
+    Generate source and target tables as streams of row tuple batches
+
+    The rows are generated lazily, as DatabaseConnection.iter_table_data fetches them,
+    so tables of any size take bounded memory.
+
+    Returns:
+        tuple: (source batches, target batches) generators
+    """
+    def side_batches(side):
+        # Each side regenerates the same seeded pairs, so neither buffers the other
+        batch = []
+        for pair in iter_row_pairs(rows, columns, diff_rate, null_density, type_mix, seed):
+            batch.append(pair[side])
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    return side_batches(0), side_batches(1)
+
+def generate_schemas(tables, columns_per_table=20, diff_rate=0.01, type_mix=DEFAULT_TYPE_MIX, seed=0):
+    """
+    Generate source and target catalogs as DatabaseConnection.get_all_table_schemas returns them
+
+    A diff_rate fraction of the target columns has a different type or nullability.
+
+    Returns:
+        tuple: (source schemas, target schemas), each mapping table name to column dicts
+    """
+    rng = random.Random(seed)
+    schemas1 = {}
+    schemas2 = {}
+    for table in range(tables):
+        table_name = f"table_{table}"
+        columns1 = []
+        columns2 = []
+        for name, type_name in zip(column_names(columns_per_table), column_types(columns_per_table, type_mix)):
+            sql_type, formatted_type = SQL_TYPES[type_name]
+            column = {
+                'name': name,
+                'type': sql_type,
+                'max_length': 100 if sql_type == 'nvarchar' else 0,
+                'numeric_precision': 18 if sql_type == 'decimal' else None,
+                'numeric_scale': 2 if sql_type == 'decimal' else None,
+                'is_nullable': 'No' if name == 'id' else 'Yes',
+                'is_identity': 'Yes' if name == 'id' else 'No',
+                'is_primary_key': 'Yes' if name == 'id' else 'No',
+                'formatted_data_type': formatted_type
+            }
+            columns1.append(column)
+            changed = dict(column)
+            if rng.random() < diff_rate:
+                if rng.random() < 0.5:
+                    changed['is_nullable'] = 'No' if column['is_nullable'] == 'Yes' else 'Yes'
+                else:
+                    changed['type'] = 'bigint'
+                    changed['formatted_data_type'] = 'bigint'
+            columns2.append(changed)
+        schemas1[table_name] = columns1
+        schemas2[table_name] = columns2
+    return schemas1, schemas2
+
+def generate_create_table_scripts(columns, diff_rate=0.01, type_mix=DEFAULT_TYPE_MIX, seed=0):
+    """
+    Generate a pair of CREATE TABLE scripts with a diff_rate fraction of changed column lines
+
+    Returns:
+        tuple: (source script, target script)
+    """
+    schemas1, schemas2 = generate_schemas(1, columns, diff_rate, type_mix, seed)
+    return tuple(_script('table_0', schemas['table_0']) for schemas in (schemas1, schemas2))
+
+def _script(table_name, columns):
+    """Build a CREATE TABLE script the way DatabaseConnection does"""
+    lines = [
+        f"    [{column['name']}] {column['formatted_data_type']}"
+        f"{' NOT NULL' if column['is_nullable'] == 'No' else ' NULL'}"
+        f"{' IDENTITY(1,1)' if column['is_identity'] == 'Yes' else ''}"
+        for column in columns
+    ]
+    return f"CREATE TABLE [{table_name}] (\n" + ",\n".join(lines) + "\n);"
+
+def _sqlite_value(value):
+    """Convert a generated value to a type sqlite3 stores natively"""
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(' ')
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+def create_sqlite_databases(path1, path2, rows, columns=8, diff_rate=0.01, null_density=0.05,
+                            type_mix=DEFAULT_TYPE_MIX, seed=0, table_name='bench', batch_size=50000):
+    """
+    Write generated source and target tables to two SQLite database files
+
+    The rows are inserted in batches as they are generated, so databases of many GB
+    take bounded memory to build. Existing files are replaced.
+    """
+    names = column_names(columns)
+    column_definitions = []
+    for name, type_name in zip(names, column_types(columns, type_mix)):
+        if name == 'id':
+            column_definitions.append('[id] INTEGER PRIMARY KEY')
+        else:
+            column_definitions.append(f"[{name}] {SQL_TYPES[type_name][1]} NULL")
+    create = f"CREATE TABLE [{table_name}] ({', '.join(column_definitions)})"
+    insert = f"INSERT INTO [{table_name}] VALUES ({', '.join(['?'] * columns)})"
+
+    connections = []
+    for path in (path1, path2):
+        if os.path.exists(path):
+            os.remove(path)
+        connection = sqlite3.connect(path)
+        connection.execute('PRAGMA journal_mode = OFF')
+        connection.execute('PRAGMA synchronous = OFF')
+        connection.execute(create)
+        connections.append(connection)
+
+    batches = ([], [])
+    for pair in iter_row_pairs(rows, columns, diff_rate, null_density, type_mix, seed):
+        for side in (0, 1):
+            batches[side].append(tuple(_sqlite_value(value) for value in pair[side]))
+        if len(batches[0]) == batch_size:
+            for connection, batch in zip(connections, batches):
+                connection.executemany(insert, batch)
+                batch.clear()
+    for connection, batch in zip(connections, batches):
+        if batch:
+            connection.executemany(insert, batch)
+        connection.commit()
+        connection.close()
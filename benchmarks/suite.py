@@ -0,0 +1,285 @@
+"""
+Benchmark definitions, runner and baselines for the comparison engine.
+"""
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.generators import (generate_table_data, generate_row_batches, generate_schemas,
+                                   generate_create_table_scripts, create_sqlite_databases, column_names)
+from app.models.backends.sqlite import SQLiteBackend
+from app.utils.comparison import (compare_data, compare_data_stream, compare_schemas,
+                                  compare_create_table_scripts)
+from app.utils.checksum import compare_data_by_checksum
+from app.utils.formatting import format_data_as_html
+
+# File holding the saved baselines, keyed by profile and benchmark name
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+
+# Relative slowdown over the baseline time that counts as a regression
+DEFAULT_TIME_THRESHOLD = 0.25
+
+# Relative growth over the baseline peak memory that counts as a regression
+DEFAULT_MEMORY_THRESHOLD = 0.25
+
+# Memory growth below this many bytes is never flagged, to ignore allocator noise
+MEMORY_NOISE_BYTES = 1024 * 1024
+
+# Directory holding the generated SQLite databases, which are reused between runs
+SQLITE_DATA_DIR = os.environ.get('BENCHMARK_DATA_DIR', os.path.join(tempfile.gettempdir(), 'db_comparison_benchmarks'))
+
+# Table the SQLite databases are generated into
+SQLITE_TABLE = 'bench'
+
+class Benchmark:
+    """A function to measure, with the setup producing its arguments"""
+
+    def __init__(self, name, func, setup, items, unit):
+        """
+        Initialize the benchmark
+
+        Args:
+            name (str): Unique name, including the parameters
+            func (callable): Function being measured, called with the setup's arguments
+            setup (callable): Returns the argument tuple; not included in the measurements
+            items (int): Number of items processed per call, for the throughput
+            unit (str): Name of the items, e.g. 'rows'
+        """
+        self.name = name
+        self.func = func
+        self.setup = setup
+        self.items = items
+        self.unit = unit
+
+def _data_benchmark(rows, columns=8, diff_rate=0.01, null_density=0.05):
+    """Benchmark compare_data on in-memory rows"""
+    def setup():
+        data1, data2 = generate_table_data(rows, columns, diff_rate, null_density)
+        return data1, data2, data1['columns']
+    return Benchmark(f"compare_data[rows={rows},cols={columns},diff={diff_rate},null={null_density}]",
+                     compare_data, setup, rows, 'rows')
+
+def _stream_benchmark(rows, columns=8, diff_rate=0.01, null_density=0.05):
+    """Benchmark compare_data_stream on lazily generated batches, including their generation"""
+    names = column_names(columns)
+
+    def run():
+        batches1, batches2 = generate_row_batches(rows, columns, diff_rate, null_density)
+        return compare_data_stream(batches1, batches2, names, key_columns=['id'])
+    return Benchmark(f"compare_data_stream[rows={rows},cols={columns},diff={diff_rate},null={null_density}]",
+                     run, tuple, rows, 'rows')
+
+def _schema_benchmark(tables, columns_per_table=20, diff_rate=0.01):
+    """Benchmark compare_schemas table by table over a whole catalog"""
+    def run(schemas1, schemas2):
+        return [compare_schemas(schemas1[name], schemas2[name]) for name in schemas1]
+    return Benchmark(f"compare_schemas[tables={tables},cols={columns_per_table},diff={diff_rate}]",
+                     run, lambda: generate_schemas(tables, columns_per_table, diff_rate),
+                     tables * columns_per_table, 'columns')
+
+def _script_benchmark(columns, diff_rate=0.01):
+    """Benchmark compare_create_table_scripts on one wide table"""
+    return Benchmark(f"compare_create_table_scripts[cols={columns},diff={diff_rate}]",
+                     compare_create_table_scripts, lambda: generate_create_table_scripts(columns, diff_rate),
+                     columns, 'lines')
+
+def _html_benchmark(rows, columns=8, diff_rate=0.1):
+    """Benchmark format_data_as_html on the result of comparing generated rows"""
+    def setup():
+        data1, data2 = generate_table_data(rows, columns, diff_rate)
+        comparison_result = compare_data(data1, data2, data1['columns'])
+        comparison_result.update({'columns': data1['columns'], 'source_data': data1, 'target_data': data2})
+        return (comparison_result,)
+    return Benchmark(f"format_data_as_html[rows={rows},cols={columns},diff={diff_rate}]",
+                     format_data_as_html, setup, rows, 'rows')
+
+def _sqlite_databases(rows, columns, diff_rate):
+    """Get connected SQLite backends on a pair of generated databases, generating them if missing"""
+    os.makedirs(SQLITE_DATA_DIR, exist_ok=True)
+    name = f"rows{rows}_cols{columns}_diff{diff_rate}"
+    path1 = os.path.join(SQLITE_DATA_DIR, f"{name}_source.db")
+    path2 = os.path.join(SQLITE_DATA_DIR, f"{name}_target.db")
+    if not (os.path.exists(path1) and os.path.exists(path2)):
+        create_sqlite_databases(path1, path2, rows, columns, diff_rate, table_name=SQLITE_TABLE)
+
+    databases = []
+    for path in (path1, path2):
+        db = SQLiteBackend(server='', database=path, username='', password='', driver='sqlite')
+        if not db.connect():
+            raise ConnectionError(f"Failed to open {path}")
+        databases.append(db)
+    return tuple(databases)
+
+def _sqlite_stream_benchmark(rows, columns=8, diff_rate=0.01):
+    """Benchmark a full-table comparison streamed from two SQLite databases"""
+    names = column_names(columns)
+
+    def run(db1, db2):
+        return compare_data_stream(
+            db1.iter_table_data(SQLITE_TABLE, columns=names, order_by=['id']),
+            db2.iter_table_data(SQLITE_TABLE, columns=names, order_by=['id']),
+            names, compare_columns=names, key_columns=['id'], null_text='NULL'
+        )
+    return Benchmark(f"sqlite_stream[rows={rows},cols={columns},diff={diff_rate}]",
+                     run, lambda: _sqlite_databases(rows, columns, diff_rate), rows, 'rows')
+
+def _sqlite_checksum_benchmark(rows, columns=8, diff_rate=0.0001):
+    """Benchmark a checksum bisection comparison of two SQLite databases"""
+    names = column_names(columns)
+
+    def run(db1, db2):
+        return compare_data_by_checksum(db1, db2, SQLITE_TABLE, SQLITE_TABLE, 'id', names)
+    return Benchmark(f"sqlite_checksum[rows={rows},cols={columns},diff={diff_rate}]",
+                     run, lambda: _sqlite_databases(rows, columns, diff_rate), rows, 'rows')
+
+def get_benchmarks(profile='quick'):
+    """
+    Get the benchmarks of a profile
+
+    'quick' runs in well under a minute. 'full' scales row counts up to 10M rows
+    through the streaming comparison and catalogs up to 200k columns. The sqlite
+    benchmarks run the database side of the pipeline too, on generated database
+    files that are kept in SQLITE_DATA_DIR for later runs.
+    """
+    if profile == 'quick':
+        return [
+            _data_benchmark(1000),
+            _data_benchmark(10000),
+            _data_benchmark(100000),
+            _data_benchmark(10000, columns=32, diff_rate=0.1, null_density=0.3),
+            _stream_benchmark(100000),
+            _schema_benchmark(1000),
+            _script_benchmark(1000),
+            _html_benchmark(10000),
+            _sqlite_stream_benchmark(20000),
+            _sqlite_checksum_benchmark(20000)
+        ]
+    if profile == 'full':
+        return [
+            _data_benchmark(1000),
+            _data_benchmark(100000),
+            _data_benchmark(1000000),
+            _data_benchmark(100000, columns=64, diff_rate=0.1, null_density=0.3),
+            _stream_benchmark(1000000),
+            _stream_benchmark(10000000),
+            _schema_benchmark(10000),
+            _script_benchmark(10000),
+            _html_benchmark(100000),
+            _sqlite_stream_benchmark(10000000),
+            _sqlite_checksum_benchmark(10000000)
+        ]
+    raise ValueError(f"Unknown benchmark profile: {profile}")
+
+def run_benchmark(benchmark, repeat=3):
+    """
+    Measure a benchmark
+
+    The time is the best of repeat calls. Peak memory is measured with tracemalloc on
+    a separate call, so tracing doesn't slow down the timed calls.
+
+    Returns:
+        dict: name, items, unit, seconds, throughput (items per second) and peak_memory (bytes)
+    """
+    args = benchmark.setup()
+
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        benchmark.func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        benchmark.func(*args)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'name': benchmark.name,
+        'items': benchmark.items,
+        'unit': benchmark.unit,
+        'seconds': best,
+        'throughput': benchmark.items / best if best else None,
+        'peak_memory': peak_memory
+    }
+
+def load_baselines(path=BASELINE_FILE):
+    """Load the saved baselines, or an empty dict if there are none"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_baselines(profile, results, path=BASELINE_FILE):
+    """Save the results of a run as the baseline of its profile"""
+    baselines = load_baselines(path)
+    baselines[profile] = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'saved_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'results': {result['name']: result for result in results}
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+
+def find_regressions(results, baseline, time_threshold=DEFAULT_TIME_THRESHOLD,
+                     memory_threshold=DEFAULT_MEMORY_THRESHOLD):
+    """
+    Compare results with a profile's baseline
+
+    Args:
+        results (list): Results of run_benchmark
+        baseline (dict): Saved baseline of the profile, as save_baselines writes it
+        time_threshold (float): Relative slowdown that counts as a regression
+        memory_threshold (float): Relative peak memory growth that counts as a regression
+
+    Returns:
+        list: One message per regression
+    """
+    saved = (baseline or {}).get('results', {})
+    regressions = []
+    for result in results:
+        previous = saved.get(result['name'])
+        if not previous:
+            continue
+        if result['seconds'] > previous['seconds'] * (1 + time_threshold):
+            regressions.append(f"{result['name']}: {result['seconds']:.3f}s vs baseline {previous['seconds']:.3f}s "
+                               f"({result['seconds'] / previous['seconds'] - 1:+.0%})")
+        memory_growth = result['peak_memory'] - previous['peak_memory']
+        if memory_growth > MEMORY_NOISE_BYTES and result['peak_memory'] > previous['peak_memory'] * (1 + memory_threshold):
+            regressions.append(f"{result['name']}: peak memory {_format_bytes(result['peak_memory'])} vs baseline "
+                               f"{_format_bytes(previous['peak_memory'])}")
+    return regressions
+
+def _format_bytes(size):
+    """Format a byte count for display"""
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f}{unit}" if unit == 'B' else f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GB"
+
+def format_result(result):
+    """Format one benchmark result as a report line"""
+    return (f"{result['name']:<75} {result['seconds']:>9.4f}s "
+            f"{result['throughput']:>14,.0f} {result['unit']}/s {_format_bytes(result['peak_memory']):>10}")
+
+def run_suite(profile='quick', repeat=3, name_filter=None, out=sys.stdout):
+    """Run the benchmarks of a profile, printing each result as it completes"""
+    results = []
+    for benchmark in get_benchmarks(profile):
+        if name_filter and name_filter not in benchmark.name:
+            continue
+        result = run_benchmark(benchmark, repeat)
+        print(format_result(result), file=out, flush=True)
+        results.append(result)
+    return results
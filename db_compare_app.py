@@ -21,6 +21,8 @@ import pymssql
 from app.routes.connections import connections_bp
 from app.routes.main import main_bp
 from app.routes.comparison import comparison_bp
+from app.utils.metrics import init_app as init_metrics
+from app.utils.query_trace import init_app as init_query_trace
 
 # Set up Flask app
 app = Flask(__name__)
@@ -31,6 +33,15 @@ app.register_blueprint(connections_bp)
 app.register_blueprint(main_bp)
 app.register_blueprint(comparison_bp)
 
+# Record request latencies for /metrics
+init_metrics(app)
+
+# Trace database queries: slow-query log and, in debug mode, the query panel
+app.config['SLOW_QUERY_THRESHOLD_MS'] = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 1000))
+if os.environ.get('SLOW_QUERY_LOG'):
+    app.config['SLOW_QUERY_LOG'] = os.environ['SLOW_QUERY_LOG']
+init_query_trace(app)
+
 # Database connection class
 class DatabaseConnection:
     def __init__(self, server, database, username, password):
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+"""
+Benchmark runner for the Database Comparison Tool.
+Measures the comparison engine on synthetic data and flags regressions against saved baselines.
+"""
+import argparse
+import sys
+import os
+
+if __name__ == '__main__':
+    # Add the project root to the path
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+    from benchmarks.suite import (run_suite, load_baselines, save_baselines, find_regressions, BASELINE_FILE,
+                                  DEFAULT_TIME_THRESHOLD, DEFAULT_MEMORY_THRESHOLD)
+
+    parser = argparse.ArgumentParser(description='Benchmark the comparison engine.')
+    parser.add_argument('--profile', choices=['quick', 'full'], default='quick',
+                        help='quick runs in under a minute; full scales up to 10M rows')
+    parser.add_argument('--filter', dest='name_filter', help='only run benchmarks whose name contains this text')
+    parser.add_argument('--repeat', type=int, default=3, help='timed calls per benchmark; the best is kept')
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='baseline file to compare with and save to')
+    parser.add_argument('--save-baseline', action='store_true', help='save this run as the profile baseline')
+    parser.add_argument('--time-threshold', type=float, default=DEFAULT_TIME_THRESHOLD,
+                        help='relative slowdown flagged as a regression')
+    parser.add_argument('--memory-threshold', type=float, default=DEFAULT_MEMORY_THRESHOLD,
+                        help='relative peak memory growth flagged as a regression')
+    args = parser.parse_args()
+
+    # Run the benchmarks
+    results = run_suite(args.profile, repeat=args.repeat, name_filter=args.name_filter)
+
+    # Compare with the saved baseline
+    regressions = find_regressions(results, load_baselines(args.baseline).get(args.profile),
+                                   args.time_threshold, args.memory_threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+
+    if args.save_baseline:
+        save_baselines(args.profile, results, args.baseline)
+        print(f"Saved baseline for the {args.profile} profile to {args.baseline}")
+
+    # Exit with appropriate code
+    sys.exit(1 if regressions and not args.save_baseline else 0)
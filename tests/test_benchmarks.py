@@ -0,0 +1,78 @@
+"""
+Tests for the benchmark suite's generators and regression checks.
+"""
+import unittest
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generators import generate_table_data, generate_row_batches, generate_schemas
+from benchmarks.suite import Benchmark, run_benchmark, find_regressions
+
+class TestBenchmarks(unittest.TestCase):
+    """Test cases for the benchmark suite."""
+
+    def test_generate_table_data(self):
+        """Test that generated data is deterministic and has the requested shape."""
+        data1, data2 = generate_table_data(1000, columns=5, diff_rate=0.1, null_density=0.2, seed=3)
+        again1, again2 = generate_table_data(1000, columns=5, diff_rate=0.1, null_density=0.2, seed=3)
+
+        self.assertEqual(data1, again1)
+        self.assertEqual(data2, again2)
+        self.assertEqual(data1['columns'], ['id', 'col_1', 'col_2', 'col_3', 'col_4'])
+        self.assertEqual(len(data1['rows']), 1000)
+        differing = sum(1 for row1, row2 in zip(data1['rows'], data2['rows']) if row1 != row2)
+        self.assertTrue(50 < differing < 150)
+        nulls = sum(1 for row in data1['rows'] for value in row.values() if value is None)
+        self.assertTrue(600 < nulls < 1000)
+
+    def test_row_batches_match_table_data(self):
+        """Test that streamed batches hold the same rows as the in-memory data."""
+        data1, data2 = generate_table_data(250, columns=4, seed=1)
+        batches1, batches2 = generate_row_batches(250, columns=4, seed=1, batch_size=100)
+
+        rows1 = [row for batch in batches1 for row in batch]
+        rows2 = [row for batch in batches2 for row in batch]
+        self.assertEqual(rows1, [tuple(row.values()) for row in data1['rows']])
+        self.assertEqual(rows2, [tuple(row.values()) for row in data2['rows']])
+
+    def test_generate_schemas(self):
+        """Test that generated catalogs differ only in the changed columns."""
+        schemas1, schemas2 = generate_schemas(10, columns_per_table=5, diff_rate=0.5, seed=2)
+
+        self.assertEqual(sorted(schemas1), sorted(schemas2))
+        self.assertEqual(len(schemas1['table_0']), 5)
+        self.assertTrue(any(schemas1[name] != schemas2[name] for name in schemas1))
+
+    def test_run_benchmark(self):
+        """Test measuring a benchmark."""
+        result = run_benchmark(Benchmark('sum', sum, lambda: (range(1000),), 1000, 'items'), repeat=2)
+
+        self.assertEqual(result['name'], 'sum')
+        self.assertGreater(result['seconds'], 0)
+        self.assertGreater(result['throughput'], 0)
+        self.assertGreaterEqual(result['peak_memory'], 0)
+
+    def test_find_regressions(self):
+        """Test flagging slowdowns and memory growth beyond the thresholds."""
+        baseline = {'results': {
+            'fast': {'seconds': 1.0, 'peak_memory': 10 * 1024 * 1024},
+            'lean': {'seconds': 1.0, 'peak_memory': 10 * 1024 * 1024}
+        }}
+        results = [
+            {'name': 'fast', 'seconds': 1.5, 'peak_memory': 10 * 1024 * 1024},
+            {'name': 'lean', 'seconds': 1.1, 'peak_memory': 20 * 1024 * 1024},
+            {'name': 'new', 'seconds': 9.0, 'peak_memory': 0}
+        ]
+
+        regressions = find_regressions(results, baseline, time_threshold=0.25, memory_threshold=0.25)
+
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith('fast:'))
+        self.assertIn('peak memory', regressions[1])
+        self.assertEqual(find_regressions(results, None), [])
+
+if __name__ == '__main__':
+    unittest.main()
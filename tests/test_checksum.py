@@ -0,0 +1,104 @@
+"""
+Tests for the checksum bisection comparison.
+"""
+import unittest
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.checksum import compare_data_by_checksum, supports_checksum_comparison
+
+class FakeChecksumConnection:
+    """In-memory stand-in for the checksum queries of DatabaseConnection."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.rows_fetched = 0
+
+    def get_key_range(self, table_name, key_column):
+        keys = [row[key_column] for row in self.rows]
+        return (min(keys), max(keys)) if keys else (None, None)
+
+    def get_bucket_checksums(self, table_name, key_column, columns, lower, upper, bucket_width):
+        buckets = {}
+        for row in self.rows:
+            if lower <= row[key_column] <= upper:
+                bucket = (row[key_column] - lower) // bucket_width
+                count, checksum = buckets.get(bucket, (0, 0))
+                buckets[bucket] = (count + 1, checksum + hash(tuple(row[col] for col in columns)))
+        return buckets
+
+    def get_rows_in_key_range(self, table_name, columns, key_column, lower, upper):
+        rows = [{col: row[col] for col in columns} for row in self.rows if lower <= row[key_column] <= upper]
+        self.rows_fetched += len(rows)
+        return {'columns': columns, 'rows': rows, 'total_rows': len(rows)}
+
+class TestChecksumComparison(unittest.TestCase):
+    """Test cases for the checksum bisection comparison."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.source_rows = [{'id': i, 'value': f'v{i}'} for i in range(1, 10001)]
+        self.target_rows = [dict(row) for row in self.source_rows]
+
+    def test_identical_tables_fetch_no_rows(self):
+        """Test that identical tables are compared without fetching rows."""
+        db1 = FakeChecksumConnection(self.source_rows)
+        db2 = FakeChecksumConnection(self.target_rows)
+
+        result = compare_data_by_checksum(db1, db2, 't', 't', 'id', ['id', 'value'])
+
+        self.assertEqual(result['summary']['rows_with_differences'], 0)
+        self.assertEqual(result['summary']['source_total_rows'], 10000)
+        self.assertEqual(result['summary']['checksum_stats']['rows_fetched'], 0)
+        self.assertEqual(db1.rows_fetched + db2.rows_fetched, 0)
+
+    def test_differences_fetch_only_leaf_ranges(self):
+        """Test that only mismatching leaf ranges are fetched and diffed."""
+        self.target_rows[4999]['value'] = 'changed'
+        del self.target_rows[7000]
+        self.target_rows.append({'id': 20000, 'value': 'new'})
+        db1 = FakeChecksumConnection(self.source_rows)
+        db2 = FakeChecksumConnection(self.target_rows)
+
+        result = compare_data_by_checksum(db1, db2, 't', 't', 'id', ['value'], leaf_rows=100)
+
+        summary = result['summary']
+        self.assertEqual(summary['rows_modified'], 1)
+        self.assertEqual(summary['rows_deleted'], 1)
+        self.assertEqual(summary['rows_inserted'], 1)
+        self.assertEqual(summary['source_total_rows'], 10000)
+        self.assertEqual(summary['target_total_rows'], 10000)
+        self.assertLess(db1.rows_fetched + db2.rows_fetched, 1000)
+
+        by_status = {d['status']: d for d in result['data_differences']}
+        self.assertEqual(by_status['modified']['key'], {'id': '5000'})
+        self.assertEqual(by_status['deleted']['key'], {'id': '7001'})
+        self.assertEqual(by_status['inserted']['key'], {'id': '20000'})
+
+    def test_empty_tables(self):
+        """Test comparing two empty tables."""
+        result = compare_data_by_checksum(FakeChecksumConnection([]), FakeChecksumConnection([]),
+                                          't', 't', 'id', ['id'])
+
+        self.assertEqual(result['summary']['rows_with_differences'], 0)
+        self.assertEqual(result['summary']['source_total_rows'], 0)
+
+    def test_supports_checksum_comparison(self):
+        """Test detection of tables eligible for checksum bisection."""
+        schema = [{'name': 'id', 'type': 'bigint'}, {'name': 'code', 'type': 'varchar'}]
+
+        self.assertTrue(supports_checksum_comparison(schema, schema, ['id']))
+        self.assertFalse(supports_checksum_comparison(schema, schema, ['code']))
+        self.assertFalse(supports_checksum_comparison(schema, schema, ['id', 'code']))
+        self.assertFalse(supports_checksum_comparison(schema, schema, []))
+
+        # The target's key must be an integer too
+        target = [{'name': 'id', 'type': 'uniqueidentifier'}, {'name': 'code', 'type': 'varchar'}]
+        self.assertFalse(supports_checksum_comparison(schema, target, ['id']))
+        self.assertFalse(supports_checksum_comparison(target, schema, ['id']))
+
+if __name__ == '__main__':
+    unittest.main()
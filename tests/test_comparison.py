@@ -10,7 +10,10 @@ import numpy as np
 # Add parent directory to path to import modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.utils.comparison import compare_schemas, compare_data
+from app.utils.comparison import (compare_schemas, compare_data, compare_data_by_key, compare_data_stream,
+                                  get_primary_key_columns, compare_row_counts, compare_create_table_scripts,
+                                  compare_database_definitions, normalize_table_definition, definition_hash,
+                                  supports_sort_merge, KeyOrderError)
 
 class TestComparisonUtils(unittest.TestCase):
     """Test cases for the comparison utility functions."""
@@ -218,6 +221,21 @@ class TestComparisonUtils(unittest.TestCase):
         self.assertTrue(any('Data type' in diff for diff in name_diff['differences']))
         self.assertTrue(any('Nullable' in diff for diff in name_diff['differences']))
 
+    def test_compare_schemas_extra_properties_added_and_removed(self):
+        """Test the messages for extra column properties present on one side only."""
+        column = {'name': 'id', 'type': 'int', 'max_length': 0, 'numeric_precision': 10, 'numeric_scale': 0,
+                  'is_nullable': 'No', 'is_identity': 'Yes', 'is_primary_key': 'Yes', 'formatted_data_type': 'int'}
+        schema1 = [dict(column, collation='Latin1_General_CI_AS', comment='old')]
+        schema2 = [dict(column, comment='new', computed=False)]
+
+        result = compare_schemas(schema1, schema2)
+
+        self.assertEqual(result['differences'][0]['differences'], [
+            'comment: old vs new',
+            'Structure change: dictionary_item_added at computed',
+            'Structure change: dictionary_item_removed at collation'
+        ])
+
     def test_compare_schemas_nested_properties(self):
         """Test comparing schemas with nested property differences using DeepDiff."""
         # Create schemas with nested property differences
@@ -603,5 +621,389 @@ class TestComparisonUtils(unittest.TestCase):
             'tags' in row1_diff['differences']
         )
 
+    def test_compare_data_vectorized_mixed_types(self):
+        """Test vectorized comparison across NULLs, mixed types and nested values."""
+        data1 = {
+            'columns': ['id', 'amount', 'tags'],
+            'rows': [
+                {'id': 1, 'amount': None, 'tags': ['a', 'b']},
+                {'id': 2, 'amount': 5, 'tags': ('x',)},
+                {'id': 3, 'amount': float('nan'), 'tags': []}
+            ],
+            'total_rows': 3
+        }
+        data2 = {
+            'columns': ['id', 'amount', 'tags'],
+            'rows': [
+                {'id': 1, 'amount': None, 'tags': ['a', 'b']},
+                {'id': 2, 'amount': '5', 'tags': ('x',)},
+                {'id': 3, 'amount': None, 'tags': ['c']}
+            ],
+            'total_rows': 3
+        }
+
+        result = compare_data(data1, data2, ['id', 'amount', 'tags'])
+
+        self.assertEqual(result['summary']['rows_with_differences'], 2)
+        self.assertEqual([d['row_index'] for d in result['data_differences']], [1, 2])
+        self.assertEqual(list(result['data_differences'][0]['differences'].keys()), ['amount'])
+        self.assertEqual(result['data_differences'][0]['differences']['amount']['target'], '5')
+        self.assertEqual(list(result['data_differences'][1]['differences'].keys()), ['tags'])
+
+    def test_compare_data_vectorized_exact_values(self):
+        """Test that values NumPy would coerce or truncate are still told apart."""
+        cases = [
+            ([b'\x01\x00', b'z'], [b'\x01', b'z']),
+            (['a\x00', 'z'], ['a', 'z']),
+            ([1, 'x'], ['1', 'x']),
+            ([2**63 - 1, 1], [2**63 - 2, 1.0]),
+            ([2**63 - 1, 7], [2**63 - 2, 7])
+        ]
+        for values1, values2 in cases:
+            with self.subTest(values1=values1, values2=values2):
+                data1 = {'columns': ['value'], 'rows': [{'value': v} for v in values1], 'total_rows': 2}
+                data2 = {'columns': ['value'], 'rows': [{'value': v} for v in values2], 'total_rows': 2}
+
+                result = compare_data(data1, data2, ['value'])
+
+                self.assertEqual(result['summary']['rows_with_differences'], 1)
+                self.assertEqual(result['data_differences'][0]['row_index'], 0)
+
+                stream_result = compare_data_stream([[(v,) for v in values1]], [[(v,) for v in values2]], ['value'])
+                self.assertEqual(stream_result['summary']['rows_with_differences'], 1)
+
+    def test_compare_data_null_text(self):
+        """Test the NULL display text for mismatching cells."""
+        data1 = {'columns': ['id'], 'rows': [{'id': None}], 'total_rows': 1}
+        data2 = {'columns': ['id'], 'rows': [{'id': 7}], 'total_rows': 1}
+
+        result = compare_data(data1, data2, ['id'], null_text='NULL')
+
+        self.assertEqual(result['data_differences'][0]['differences']['id'],
+                         {'source': 'NULL', 'target': '7'})
+
+    def test_compare_data_stream_positional(self):
+        """Test streaming positional comparison across batches and chunks."""
+        batches1 = iter([[(1, 'a'), (2, 'b')], [(3, 'c'), (4, 'd')], [(5, 'e')]])
+        batches2 = iter([[(1, 'a')], [(2, 'x'), (3, 'c')], [(4, None)]])
+
+        result = compare_data_stream(batches1, batches2, ['id', 'name'], chunk_size=2)
+
+        self.assertEqual(result['summary']['source_total_rows'], 5)
+        self.assertEqual(result['summary']['target_total_rows'], 4)
+        self.assertEqual(result['summary']['total_rows_compared'], 4)
+        self.assertEqual(result['summary']['rows_with_differences'], 2)
+        self.assertEqual(result['summary']['row_count_difference'], 1)
+        self.assertEqual([d['row_index'] for d in result['data_differences']], [1, 3])
+        self.assertEqual(result['data_differences'][1]['differences']['name'],
+                         {'source': 'd', 'target': 'None'})
+
+    def test_compare_data_stream_max_differences(self):
+        """Test that streaming comparison keeps a bounded number of differences."""
+        batches1 = [[(i, 'a') for i in range(100)]]
+        batches2 = [[(i, 'b') for i in range(100)]]
+
+        result = compare_data_stream(batches1, batches2, ['id', 'name'], chunk_size=30, max_differences=10)
+
+        self.assertEqual(result['summary']['rows_with_differences'], 100)
+        self.assertEqual(len(result['data_differences']), 10)
+        self.assertTrue(result['summary']['differences_truncated'])
+
+    def test_compare_data_stream_sort_merge(self):
+        """Test streaming keyed comparison with a sort-merge join."""
+        batches1 = [[(None, 'n'), (1, 'a'), (2, 'b')], [(4, 'd'), (6, 'f')]]
+        batches2 = [[(None, 'n'), (1, 'a'), (2, 'B')], [(3, 'c'), (4, 'd')]]
+
+        result = compare_data_stream(batches1, batches2, ['id', 'name'], key_columns=['id'], chunk_size=2)
+
+        summary = result['summary']
+        self.assertEqual(summary['source_total_rows'], 5)
+        self.assertEqual(summary['target_total_rows'], 5)
+        self.assertEqual(summary['total_rows_compared'], 4)
+        self.assertEqual(summary['rows_modified'], 1)
+        self.assertEqual(summary['rows_deleted'], 1)
+        self.assertEqual(summary['rows_inserted'], 1)
+
+        by_status = {d['status']: d for d in result['data_differences']}
+        self.assertEqual(by_status['modified']['key'], {'id': '2'})
+        self.assertEqual(by_status['modified']['differences'], {'name': {'source': 'b', 'target': 'B'}})
+        self.assertEqual(by_status['inserted']['key'], {'id': '3'})
+        self.assertEqual(by_status['deleted']['key'], {'id': '6'})
+
+    def test_compare_data_stream_sort_merge_key_order(self):
+        """Test that a stream out of Python's key order is rejected instead of misaligned."""
+        # SQL Server pads trailing spaces, so it can return 'a' between 'a\x01' and 'b'
+        batches1 = [[('a\x01', 1), ('a', 2), ('b', 3)]]
+        batches2 = [[('a', 2), ('a\x01', 1), ('b', 3)]]
+        with self.assertRaises(KeyOrderError):
+            compare_data_stream(batches1, batches2, ['code', 'qty'], key_columns=['code'])
+
+        # Duplicate keys can't be merged either
+        with self.assertRaises(KeyOrderError):
+            compare_data_stream([[(1, 'a'), (1, 'b')]], [[(1, 'a')]], ['id', 'name'], key_columns=['id'])
+
+        # Nor can keys of different types
+        with self.assertRaises(KeyOrderError):
+            compare_data_stream([[(1, 'a')]], [[('1', 'a')]], ['id', 'name'], key_columns=['id'])
+
+    def test_compare_data_stream_key_hashed(self):
+        """Test streaming keyed comparison of rows ordered by key hash."""
+        # Keys 'b' and 'c' share hash 5; 'e' is duplicated in the target
+        batches1 = [[(2, 'a', 1), (5, 'b', 2)], [(5, 'c', 3), (9, 'd', 4)]]
+        batches2 = [[(2, 'a', 1), (5, 'c', 30), (7, 'e', 5), (7, 'e', 6)]]
+
+        result = compare_data_stream(batches1, batches2, ['code', 'qty'], key_columns=['code'],
+                                     chunk_size=1, key_hashed=True)
+
+        summary = result['summary']
+        self.assertEqual(summary['source_total_rows'], 4)
+        self.assertEqual(summary['target_total_rows'], 4)
+        self.assertEqual(summary['total_rows_compared'], 2)
+        self.assertEqual(summary['rows_modified'], 1)
+        self.assertEqual(summary['rows_deleted'], 2)
+        self.assertEqual(summary['rows_inserted'], 1)
+        self.assertEqual(summary['duplicate_keys'], 1)
+
+        by_key = {d['key']['code']: d for d in result['data_differences']}
+        self.assertEqual(by_key['c']['differences'], {'qty': {'source': '3', 'target': '30'}})
+        self.assertEqual([by_key[code]['status'] for code in ('b', 'd', 'e')], ['deleted', 'deleted', 'inserted'])
+
+        # Hashes out of order can't be merged
+        with self.assertRaises(KeyOrderError):
+            compare_data_stream([[(5, 'b', 2), (2, 'a', 1)]], [[(2, 'a', 1)]], ['code', 'qty'],
+                                key_columns=['code'], key_hashed=True)
+
+    def test_supports_sort_merge(self):
+        """Test which key types can be merged in database order."""
+        schema = [{'name': 'id', 'type': 'int'}, {'name': 'code', 'type': 'nvarchar'},
+                  {'name': 'guid', 'type': 'uniqueidentifier'}, {'name': 'amount', 'type': 'decimal'}]
+        target = [{'name': 'id', 'type': 'int'}, {'name': 'code', 'type': 'sql_variant'},
+                  {'name': 'guid', 'type': 'uniqueidentifier'}]
+
+        self.assertTrue(supports_sort_merge(schema, schema, ['id', 'code']))
+        self.assertFalse(supports_sort_merge(schema, schema, ['guid']))
+        self.assertFalse(supports_sort_merge(schema, schema, ['amount']))
+        self.assertFalse(supports_sort_merge(schema, target, ['code']))
+        self.assertFalse(supports_sort_merge(schema, schema, []))
+
+    def test_get_primary_key_columns(self):
+        """Test extracting primary key columns from a schema."""
+        schema = [
+            {'name': 'order_id', 'is_primary_key': 'Yes'},
+            {'name': 'note', 'is_primary_key': 'No'},
+            {'name': 'line_no', 'is_primary_key': 'Yes'}
+        ]
+
+        self.assertEqual(get_primary_key_columns(schema), ['order_id', 'line_no'])
+
+    def test_compare_data_by_key_inserted_row(self):
+        """Test that an inserted row doesn't shift the keyed comparison."""
+        data1 = {
+            'columns': ['id', 'name'],
+            'rows': [
+                {'id': 1, 'name': 'A'},
+                {'id': 3, 'name': 'C'},
+                {'id': 4, 'name': 'D'}
+            ],
+            'total_rows': 3
+        }
+        data2 = {
+            'columns': ['id', 'name'],
+            'rows': [
+                {'id': 1, 'name': 'A'},
+                {'id': 2, 'name': 'B'},
+                {'id': 3, 'name': 'C'},
+                {'id': 4, 'name': 'D'}
+            ],
+            'total_rows': 4
+        }
+
+        result = compare_data_by_key(data1, data2, ['id', 'name'], ['id'])
+
+        self.assertEqual(result['summary']['total_rows_compared'], 3)
+        self.assertEqual(result['summary']['rows_inserted'], 1)
+        self.assertEqual(result['summary']['rows_deleted'], 0)
+        self.assertEqual(result['summary']['rows_modified'], 0)
+        self.assertEqual(len(result['data_differences']), 1)
+
+        inserted = result['data_differences'][0]
+        self.assertEqual(inserted['status'], 'inserted')
+        self.assertEqual(inserted['key'], {'id': '2'})
+        self.assertEqual(inserted['differences']['name'], {'source': '', 'target': 'B'})
+
+    def test_compare_data_by_key_modified_and_deleted(self):
+        """Test keyed comparison reports modified and deleted rows separately."""
+        data1 = {
+            'columns': ['id', 'name', 'price'],
+            'rows': [
+                {'id': 2, 'name': 'B', 'price': 20.0},
+                {'id': 1, 'name': 'A', 'price': None},
+                {'id': 5, 'name': 'E', 'price': 50.0}
+            ],
+            'total_rows': 3
+        }
+        data2 = {
+            'columns': ['id', 'name', 'price'],
+            'rows': [
+                {'id': 1, 'name': 'A', 'price': float('nan')},
+                {'id': 2, 'name': 'B2', 'price': 20.0}
+            ],
+            'total_rows': 2
+        }
+
+        result = compare_data_by_key(data1, data2, ['id', 'name', 'price'], ['id'])
+
+        self.assertEqual(result['summary']['rows_modified'], 1)
+        self.assertEqual(result['summary']['rows_deleted'], 1)
+        self.assertEqual(result['summary']['rows_inserted'], 0)
+        self.assertEqual(result['summary']['rows_with_differences'], 2)
+
+        by_status = {d['status']: d for d in result['data_differences']}
+        self.assertEqual(by_status['modified']['key'], {'id': '2'})
+        self.assertEqual(by_status['modified']['differences'],
+                         {'name': {'source': 'B', 'target': 'B2'}})
+        self.assertEqual(by_status['deleted']['key'], {'id': '5'})
+        self.assertEqual(by_status['deleted']['differences']['name'], {'source': 'E', 'target': ''})
+
+    def test_compare_data_by_key_null_text(self):
+        """Test displaying NULL cells and NULL key values in keyed differences."""
+        data1 = {'columns': ['id', 'name'], 'total_rows': 2,
+                 'rows': [{'id': 1, 'name': None}, {'id': None, 'name': 'x'}]}
+        data2 = {'columns': ['id', 'name'], 'total_rows': 2,
+                 'rows': [{'id': 1, 'name': 'a'}, {'id': 3, 'name': None}]}
+
+        result = compare_data_by_key(data1, data2, ['id', 'name'], ['id'], null_text='NULL')
+
+        by_status = {d['status']: d for d in result['data_differences']}
+        self.assertEqual(by_status['modified']['differences'], {'name': {'source': 'NULL', 'target': 'a'}})
+        self.assertEqual(by_status['deleted']['key'], {'id': 'NULL'})
+        self.assertEqual(by_status['deleted']['differences']['id'], {'source': 'NULL', 'target': ''})
+        self.assertEqual(by_status['inserted']['differences']['name'], {'source': '', 'target': 'NULL'})
+
+        stream_result = compare_data_stream([[(None, 'x'), (1, None)]], [[(1, 'a')]], ['id', 'name'],
+                                            key_columns=['id'], null_text='NULL')
+        by_status = {d['status']: d for d in stream_result['data_differences']}
+        self.assertEqual(by_status['deleted']['key'], {'id': 'NULL'})
+        self.assertEqual(by_status['modified']['differences'], {'name': {'source': 'NULL', 'target': 'a'}})
+
+    def test_compare_data_by_key_composite_key(self):
+        """Test keyed comparison with a composite key."""
+        data1 = {
+            'columns': ['order_id', 'line_no', 'qty'],
+            'rows': [
+                {'order_id': 1, 'line_no': 1, 'qty': 5},
+                {'order_id': 1, 'line_no': 2, 'qty': 7}
+            ],
+            'total_rows': 2
+        }
+        data2 = {
+            'columns': ['order_id', 'line_no', 'qty'],
+            'rows': [
+                {'order_id': 1, 'line_no': 2, 'qty': 8},
+                {'order_id': 1, 'line_no': 1, 'qty': 5}
+            ],
+            'total_rows': 2
+        }
+
+        result = compare_data_by_key(data1, data2, ['order_id', 'line_no', 'qty'], ['order_id', 'line_no'])
+
+        self.assertEqual(result['summary']['rows_modified'], 1)
+        self.assertEqual(result['data_differences'][0]['key'], {'order_id': '1', 'line_no': '2'})
+        self.assertEqual(result['data_differences'][0]['differences']['qty'], {'source': '7', 'target': '8'})
+
+    def test_compare_row_counts(self):
+        """Test comparing row counts across whole databases."""
+        result = compare_row_counts({'a': 10, 'b': 5, 'c': 0}, {'a': 10, 'b': 7, 'd': 3})
+
+        tables = {table['table_name']: table for table in result['tables']}
+        self.assertEqual([table['table_name'] for table in result['tables']], ['a', 'b', 'c', 'd'])
+        self.assertFalse(tables['a']['differences'])
+        self.assertEqual(tables['b']['difference'], 2)
+        self.assertTrue(tables['c']['differences'])
+        self.assertIsNone(tables['c']['difference'])
+        self.assertFalse(tables['d']['in_db1'])
+        self.assertEqual(result['summary']['tables_with_differences'], 3)
+        self.assertEqual(result['summary']['tables_only_in_source'], 1)
+        self.assertEqual(result['summary']['tables_only_in_target'], 1)
+        self.assertEqual(result['summary']['source_total_rows'], 15)
+        self.assertEqual(result['summary']['target_total_rows'], 20)
+
+    @staticmethod
+    def table_definition(columns, primary_key=(), foreign_keys=None, indexes=None):
+        """Build a table definition from (name, type, nullable) tuples."""
+        return {
+            'columns': [
+                {'name': name, 'formatted_data_type': data_type, 'is_nullable': 'Yes' if nullable else 'No',
+                 'is_identity': 'No', 'is_primary_key': 'Yes' if name in primary_key else 'No'}
+                for name, data_type, nullable in columns
+            ],
+            'foreign_keys': foreign_keys or {},
+            'indexes': indexes or {}
+        }
+
+    def test_normalize_table_definition(self):
+        """Test that definitions normalize to hashable tuples independent of constraint order."""
+        indexes = {'IX_b': {'is_unique': 0, 'columns': ['b']}, 'IX_a': {'is_unique': 1, 'columns': ['a']}}
+        definition = self.table_definition([('a', 'int', False), ('b', 'varchar(10)', True)], ('a',), indexes=indexes)
+        reordered = self.table_definition([('a', 'int', False), ('b', 'varchar(10)', True)], ('a',),
+                                          indexes=dict(reversed(list(indexes.items()))))
+
+        normalized = normalize_table_definition(definition)
+
+        self.assertEqual(normalized, (
+            (('a', 'int', False, False), ('b', 'varchar(10)', True, False)),
+            ('a',),
+            (),
+            (('IX_a', True, ('a',)), ('IX_b', False, ('b',)))
+        ))
+        self.assertEqual(definition_hash(normalized), definition_hash(normalize_table_definition(reordered)))
+
+    def test_compare_database_definitions(self):
+        """Test that only differing tables get structural changes and a script diff."""
+        built = []
+
+        def build_script(table_name, definition):
+            built.append(table_name)
+            return '\n'.join(f"[{column['name']}] {column['formatted_data_type']}" for column in definition['columns'])
+
+        fk = {'FK_b_a': {'table': 'b', 'columns': ['a_id'], 'ref_table': 'a', 'ref_columns': ['id']}}
+        result = compare_database_definitions(
+            {'a': self.table_definition([('id', 'int', False)], ('id',)),
+             'b': self.table_definition([('id', 'int', False), ('a_id', 'int', True)], ('id',), foreign_keys=fk),
+             'c': self.table_definition([('id', 'int', False)])},
+            {'a': self.table_definition([('id', 'int', False)], ('id',)),
+             'b': self.table_definition([('id', 'bigint', False), ('a_id', 'int', True), ('note', 'text', True)]),
+             'd': self.table_definition([('id', 'int', False)])},
+            build_script
+        )
+
+        tables = {table['table_name']: table for table in result['tables']}
+        self.assertFalse(tables['a']['differences'])
+        self.assertIsNone(tables['a']['diff_html'])
+        self.assertNotIn('a', built)
+        self.assertEqual(tables['b']['changes'], [
+            'Column [id]: int NOT NULL vs bigint NOT NULL',
+            'Column [note] only in target',
+            'Primary key: (id) vs ()',
+            'Foreign key [FK_b_a] only in source'
+        ])
+        self.assertIn('bigint', tables['b']['diff_html'])
+        self.assertFalse(tables['c']['in_db2'])
+        self.assertIn('diff-removed', tables['c']['diff_html'])
+        self.assertEqual(result['summary'], {
+            'total_tables': 4,
+            'identical_tables': 1,
+            'tables_with_differences': 1,
+            'tables_only_in_source': 1,
+            'tables_only_in_target': 1
+        })
+
+    def test_compare_create_table_scripts_identical(self):
+        """Test that identical scripts skip the diff."""
+        result = compare_create_table_scripts('CREATE TABLE [a] ();', 'CREATE TABLE [a] ();')
+
+        self.assertFalse(result['has_differences'])
+        self.assertNotIn('diff-line', result['diff_html'])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,151 @@
+"""
+Tests for the connection pool.
+"""
+import unittest
+from unittest.mock import MagicMock
+import sys
+import os
+import threading
+import time
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.connection_pool import ConnectionPool
+from app.models.backends.base import DatabaseBackend
+
+KEY = ('server', 'db', 'user')
+
+class TestConnectionPool(unittest.TestCase):
+    """Test cases for ConnectionPool."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.pool = ConnectionPool(max_size=2, idle_timeout=60, acquire_timeout=0.2)
+        self.factory = MagicMock(side_effect=lambda: MagicMock())
+
+    def test_reuses_released_connection(self):
+        """Test that a released connection is handed out again."""
+        connection = self.pool.acquire(KEY, self.factory)
+        self.pool.release(KEY, connection)
+        again = self.pool.acquire(KEY, self.factory)
+
+        self.assertIs(again, connection)
+        self.assertEqual(self.factory.call_count, 1)
+        metrics = self.pool.get_metrics()[KEY]
+        self.assertEqual(metrics['created'], 1)
+        self.assertEqual(metrics['reused'], 1)
+        self.assertEqual(metrics['in_use'], 1)
+
+    def test_keys_are_isolated(self):
+        """Test that connections are not shared between keys."""
+        connection = self.pool.acquire(KEY, self.factory)
+        self.pool.release(KEY, connection)
+        other = self.pool.acquire(('server', 'other_db', 'user'), self.factory)
+
+        self.assertIsNot(other, connection)
+        self.assertEqual(self.factory.call_count, 2)
+
+    def test_failed_ping_replaces_connection(self):
+        """Test that a connection failing the pre-ping is closed and replaced."""
+        connection = self.pool.acquire(KEY, self.factory)
+        self.pool.release(KEY, connection)
+        connection.cursor.return_value.execute.side_effect = Exception("connection reset")
+
+        replacement = self.pool.acquire(KEY, self.factory)
+
+        self.assertIsNot(replacement, connection)
+        connection.close.assert_called_once()
+        self.assertEqual(self.pool.get_metrics()[KEY]['ping_failures'], 1)
+
+    def test_idle_connections_are_evicted(self):
+        """Test that connections idle longer than the timeout are closed."""
+        self.pool.idle_timeout = 0
+        connection = self.pool.acquire(KEY, self.factory)
+        self.pool.release(KEY, connection)
+        time.sleep(0.01)
+
+        self.pool.evict_idle()
+
+        connection.close.assert_called_once()
+        metrics = self.pool.get_metrics()[KEY]
+        self.assertEqual(metrics['idle'], 0)
+        self.assertEqual(metrics['evicted_idle'], 1)
+
+    def test_failed_rollback_discards_connection(self):
+        """Test that a connection that cannot be reset is not returned to the pool."""
+        connection = self.pool.acquire(KEY, self.factory)
+        connection.rollback.side_effect = Exception("broken")
+
+        self.pool.release(KEY, connection)
+
+        connection.close.assert_called_once()
+        self.assertEqual(self.pool.get_metrics()[KEY]['idle'], 0)
+
+    def test_max_size_times_out(self):
+        """Test that acquire waits and then times out when the pool is exhausted."""
+        self.pool.acquire(KEY, self.factory)
+        self.pool.acquire(KEY, self.factory)
+
+        with self.assertRaises(TimeoutError):
+            self.pool.acquire(KEY, self.factory)
+        self.assertEqual(self.pool.get_metrics()[KEY]['timeouts'], 1)
+
+    def test_waiter_gets_released_connection(self):
+        """Test that a waiting caller receives a connection released by another thread."""
+        self.pool.acquire_timeout = 5
+        first = self.pool.acquire(KEY, self.factory)
+        self.pool.acquire(KEY, self.factory)
+
+        timer = threading.Timer(0.05, self.pool.release, args=(KEY, first))
+        timer.start()
+        connection = self.pool.acquire(KEY, self.factory)
+        timer.join()
+
+        self.assertIs(connection, first)
+        self.assertEqual(self.factory.call_count, 2)
+
+    def test_factory_error_frees_slot(self):
+        """Test that a failed connection attempt doesn't use up a pool slot."""
+        failing = MagicMock(side_effect=Exception("login failed"))
+        for _ in range(3):
+            with self.assertRaises(Exception):
+                self.pool.acquire(KEY, failing)
+
+        self.assertEqual(self.pool.get_metrics()[KEY]['in_use'], 0)
+
+class StubBackend(DatabaseBackend):
+    """Backend whose driver only accepts one password."""
+
+    def _open_connection(self):
+        if self.password != 'right':
+            raise Exception("Login failed")
+        return MagicMock()
+
+class TestPooledCredentials(unittest.TestCase):
+    """Test cases for pooled connections and credentials."""
+
+    def test_wrong_password_fails_after_pooled_connect(self):
+        """Test that a pooled login is not reused for a different password."""
+        good = StubBackend('stub-server', 'db', 'user', 'right')
+        self.assertTrue(good.connect())
+        good.disconnect()
+
+        bad = StubBackend('stub-server', 'db', 'user', 'wrong')
+        self.assertFalse(bad.connect())
+        self.assertIsNone(bad.connection)
+
+        again = StubBackend('stub-server', 'db', 'user', 'right')
+        self.assertTrue(again.connect())
+        again.disconnect()
+
+    def test_pool_key_hides_the_password(self):
+        """Test that the pool key tells passwords apart without containing them."""
+        key = StubBackend('stub-server', 'db', 'user', 'right').pool_key
+
+        self.assertNotIn('right', key)
+        self.assertEqual(key[:3], ('stub-server', 'db', 'user'))
+        self.assertNotEqual(key, StubBackend('stub-server', 'db', 'user', 'wrong').pool_key)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+"""
+Tests for paged data comparison differences.
+"""
+import unittest
+import sys
+import os
+import tempfile
+from unittest.mock import patch
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.data_diff import flatten_differences, save_differences, open_differences, query_differences
+
+DATA_DIFFERENCES = [
+    {'row_index': 0, 'differences': {'Name': {'source': 'Alice', 'target': 'Alicia'},
+                                     'City': {'source': 'Paris', 'target': 'Lyon'}}},
+    {'row_index': 2, 'differences': {'Name': {'source': '', 'target': 'Carol'}}},
+    {'row_index': 4, 'differences': {'City': {'source': 'Rome', 'target': ''}}}
+]
+
+class TestDataDiff(unittest.TestCase):
+    """Test cases for the data diff store."""
+
+    def setUp(self):
+        """Store the sample differences in a temporary directory."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.diff_id = save_differences(DATA_DIFFERENCES, results_dir=self.temp_dir.name)
+        self.store = open_differences(self.diff_id, results_dir=self.temp_dir.name)
+
+    def test_flatten_derives_status(self):
+        """Test one record per differing cell with status derived from the values."""
+        records = flatten_differences(DATA_DIFFERENCES)
+
+        self.assertEqual(len(records), 4)
+        self.assertEqual(records[0], {'row': 1, 'key': None, 'column': 'Name',
+                                      'source': 'Alice', 'target': 'Alicia', 'status': 'modified'})
+        self.assertEqual(records[2]['status'], 'inserted')
+        self.assertEqual(records[3]['status'], 'deleted')
+
+    def test_flatten_keeps_keyed_status(self):
+        """Test that key-based comparisons keep their status and key."""
+        records = flatten_differences([
+            {'row_index': 0, 'key': {'ID': 7}, 'status': 'deleted',
+             'differences': {'Name': {'source': 'Dave', 'target': 'Dave'}}}
+        ])
+
+        self.assertEqual(records[0]['status'], 'deleted')
+        self.assertEqual(records[0]['key'], {'ID': 7})
+
+    def test_open_unknown_or_invalid_id(self):
+        """Test that unknown and malformed ids are not opened."""
+        self.assertIsNotNone(self.store)
+        self.assertIsNone(open_differences('0' * 32, results_dir=self.temp_dir.name))
+        self.assertIsNone(open_differences('../etc', results_dir=self.temp_dir.name))
+
+    def test_query_pages(self):
+        """Test paging without filters."""
+        page = query_differences(self.store, offset=1, limit=2)
+
+        self.assertEqual(page['total'], 4)
+        self.assertEqual([record['column'] for record in page['records']], ['City', 'Name'])
+
+    def test_query_filters(self):
+        """Test filtering by column, status and search text."""
+        self.assertEqual(query_differences(self.store, column='City')['total'], 2)
+        self.assertEqual(query_differences(self.store, status='inserted')['records'][0]['target'], 'Carol')
+        self.assertEqual(query_differences(self.store, search='PARIS')['total'], 1)
+        self.assertEqual(query_differences(self.store, column='City', status='modified')['total'], 1)
+
+    def test_query_sort(self):
+        """Test sorting on a field in both directions."""
+        ascending = query_differences(self.store, sort='source')['records']
+        descending = query_differences(self.store, sort='row', descending=True)['records']
+
+        self.assertEqual([record['source'] for record in ascending], ['', 'Alice', 'Paris', 'Rome'])
+        self.assertEqual(descending[0]['row'], 5)
+
+    def test_query_index_is_cached(self):
+        """Test that later pages of a query don't reload the store, and appends refresh it."""
+        first = query_differences(self.store, sort='source', limit=2)
+
+        with patch.object(self.store, 'get_range', side_effect=AssertionError("store reloaded")):
+            second = query_differences(self.store, sort='source', offset=2, limit=2)
+        self.assertEqual([record['source'] for record in first['records'] + second['records']],
+                         ['', 'Alice', 'Paris', 'Rome'])
+        self.assertIs(open_differences(self.diff_id, results_dir=self.temp_dir.name), self.store)
+
+        self.store.append([{'row': 9, 'key': None, 'column': 'City', 'source': 'Bonn', 'target': 'Köln',
+                            'status': 'modified'}])
+        self.assertEqual(query_differences(self.store, sort='source')['total'], 5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -16,6 +16,7 @@ mock_pymssql = MagicMock()
 sys.modules['pymssql'] = mock_pymssql
 
 from app.models.database import DatabaseConnection
+from app.models.connection_pool import connection_pool
 
 class TestDatabaseConnection(unittest.TestCase):
     """Test cases for the DatabaseConnection class."""
@@ -28,6 +29,9 @@ class TestDatabaseConnection(unittest.TestCase):
         # Clear side effects
         mock_pymssql.connect.side_effect = None
         
+        # Start every test with an empty connection pool
+        connection_pool.close_all()
+        
         self.connection = DatabaseConnection(
             server='test_server',
             database='test_db',
@@ -93,6 +97,25 @@ class TestDatabaseConnection(unittest.TestCase):
         self.connection.cursor.close.assert_called_once()
         self.connection.connection.close.assert_called_once()
 
+    def test_disconnect_returns_connection_to_pool(self):
+        """Test that a disconnected connection is reused by the next connect."""
+        mock_connection = MagicMock()
+        mock_pymssql.connect.return_value = mock_connection
+
+        self.assertTrue(self.connection.connect())
+        self.connection.disconnect()
+
+        mock_connection.close.assert_not_called()
+        mock_connection.rollback.assert_called_once()
+        self.assertIsNone(self.connection.connection)
+
+        other = DatabaseConnection('test_server', 'test_db', 'test_user', 'test_pass')
+        self.assertTrue(other.connect())
+
+        mock_pymssql.connect.assert_called_once()
+        self.assertIs(other.connection, mock_connection)
+        other.disconnect()
+
     def test_disconnect_no_connection(self):
         """Test disconnection when no connection exists."""
         # Ensure connection and cursor are None
@@ -116,6 +139,23 @@ class TestDatabaseConnection(unittest.TestCase):
         self.connection.cursor.execute.assert_called_once()
         self.assertEqual(tables, ['table1', 'table2', 'table3'])
 
+    def test_get_schema_version(self):
+        """Test retrieving the schema change token."""
+        self.connection.cursor = MagicMock()
+        self.connection.cursor.fetchone.return_value = (42, '2024-01-01 12:00:00')
+
+        version = self.connection.get_schema_version()
+
+        self.connection.cursor.execute.assert_called_once()
+        self.assertEqual(version, (42, '2024-01-01 12:00:00'))
+
+    def test_get_schema_version_error(self):
+        """Test handling error when retrieving the schema change token."""
+        self.connection.cursor = MagicMock()
+        self.connection.cursor.execute.side_effect = Exception("SQL error")
+
+        self.assertIsNone(self.connection.get_schema_version())
+
     def test_get_table_schema(self):
         """Test retrieving table schema."""
         # Set up mock cursor
@@ -155,6 +195,57 @@ class TestDatabaseConnection(unittest.TestCase):
         self.assertEqual(schema[2]['numeric_scale'], 2)
         self.assertEqual(schema[2]['formatted_data_type'], 'decimal(10,2)')
 
+    def test_get_all_table_schemas(self):
+        """Test retrieving schemas for all tables in one query."""
+        # Set up mock cursor
+        self.connection.cursor = MagicMock()
+        mock_rows = [
+            ('customers', 'id', 'int', None, 10, 0, 'NO', 1, 1),
+            ('customers', 'email', 'nvarchar', -1, None, None, 'YES', 0, 0),
+            ('orders', 'id', 'bigint', None, 19, 0, 'NO', 0, 1),
+            ('orders', 'total', 'decimal', None, 18, 2, 'NO', 0, 0)
+        ]
+        self.connection.cursor.fetchall.return_value = mock_rows
+
+        # Call the method
+        schemas = self.connection.get_all_table_schemas()
+
+        # Assertions
+        self.connection.cursor.execute.assert_called_once()
+        self.assertEqual(sorted(schemas.keys()), ['customers', 'orders'])
+        self.assertEqual([col['name'] for col in schemas['customers']], ['id', 'email'])
+        self.assertEqual(schemas['customers'][0]['is_identity'], 'Yes')
+        self.assertEqual(schemas['customers'][0]['is_primary_key'], 'Yes')
+        self.assertEqual(schemas['customers'][1]['formatted_data_type'], 'nvarchar(MAX)')
+        self.assertEqual(schemas['customers'][1]['is_nullable'], 'Yes')
+        self.assertEqual(schemas['orders'][0]['is_identity'], 'No')
+        self.assertEqual(schemas['orders'][1]['formatted_data_type'], 'decimal(18,2)')
+
+    def test_get_all_table_schemas_filtered(self):
+        """Test restricting the bulk schema query to a subset of tables."""
+        # Set up mock cursor
+        self.connection.cursor = MagicMock()
+        self.connection.cursor.fetchall.return_value = [
+            ('orders', 'id', 'int', None, 10, 0, 'NO', 0, 1)
+        ]
+
+        # Call the method
+        schemas = self.connection.get_all_table_schemas(['orders', 'missing'])
+
+        # Assertions
+        args = self.connection.cursor.execute.call_args[0]
+        self.assertEqual(args[1], (('orders', 'missing'),))
+        self.assertEqual(list(schemas.keys()), ['orders'])
+
+    def test_get_all_table_schemas_empty_filter(self):
+        """Test that an empty table filter skips the query."""
+        self.connection.cursor = MagicMock()
+
+        schemas = self.connection.get_all_table_schemas([])
+
+        self.connection.cursor.execute.assert_not_called()
+        self.assertEqual(schemas, {})
+
     def test_get_table_data_all_columns(self):
         """Test retrieving table data with all columns."""
         # Set up mock cursor
@@ -224,6 +315,137 @@ class TestDatabaseConnection(unittest.TestCase):
         self.assertEqual(data['rows'], [])
         self.assertEqual(data['total_rows'], 0)
 
+    def test_iter_table_data_batches(self):
+        """Test streaming table data in fetchmany batches."""
+        self.connection.cursor = MagicMock()
+        self.connection.cursor.fetchmany.side_effect = [
+            [(1, 'a'), (2, 'b')],
+            [(3, 'c')],
+            []
+        ]
+
+        batches = list(self.connection.iter_table_data('test_table', columns=['id', 'name'], batch_size=2))
+
+        self.assertEqual(batches, [[(1, 'a'), (2, 'b')], [(3, 'c')]])
+        self.connection.cursor.execute.assert_called_once_with("SELECT [id], [name] FROM [test_table]")
+        self.connection.cursor.fetchmany.assert_called_with(2)
+
+    def test_iter_table_data_ordered(self):
+        """Test that character key columns are ordered with a binary collation."""
+        self.connection.cursor = MagicMock()
+        self.connection.cursor.fetchall.return_value = [
+            ('code', 'varchar', 10, None, None, 'NO', 0, 1),
+            ('name', 'nvarchar', 10, None, None, 'NO', 0, 1),
+            ('id', 'int', None, 10, 0, 'NO', 0, 1)
+        ]
+        self.connection.cursor.fetchmany.return_value = []
+
+        list(self.connection.iter_table_data('test_table', columns=['code', 'name', 'id'], limit=10,
+                                             order_by=['code', 'name', 'id']))
+
+        # varchar is ordered by code point, not by its code page bytes
+        query = self.connection.cursor.execute.call_args[0][0]
+        self.assertEqual(query, "SELECT TOP 10 [code], [name], [id] FROM [test_table] "
+                                "ORDER BY CAST([code] AS NVARCHAR(4000)) COLLATE Latin1_General_BIN2, "
+                                "[name] COLLATE Latin1_General_BIN2, [id]")
+
+    def test_iter_table_data_by_key_hash(self):
+        """Test streaming rows prefixed with and ordered by their key hash."""
+        self.connection.cursor = MagicMock()
+        self.connection.cursor.fetchmany.side_effect = [[(7, 'g1', 'a')], []]
+
+        batches = list(self.connection.iter_table_data_by_key_hash('test_table', ['guid', 'name'], ['guid']))
+
+        self.assertEqual(batches, [[(7, 'g1', 'a')]])
+        query = self.connection.cursor.execute.call_args[0][0]
+        self.assertIn("SELECT CAST(CAST(HASHBYTES('MD5', CONCAT(CAST([guid] AS NVARCHAR(4000)), N'|')) "
+                      "AS BINARY(4)) AS BIGINT), [guid], [name]", query)
+        self.assertIn("ORDER BY 1", query)
+
+    def test_get_bucket_checksums(self):
+        """Test retrieving per-bucket checksums."""
+        self.connection.cursor = MagicMock()
+        self.connection.cursor.fetchall.return_value = [(0, 10, 123, 4567), (1, 8, -5, 99)]
+
+        buckets = self.connection.get_bucket_checksums('test_table', 'id', ['id', 'name'], 1, 20, 10)
+
+        args = self.connection.cursor.execute.call_args[0]
+        self.assertIn('BINARY_CHECKSUM([id], [name])', args[0])
+        self.assertIn('(CAST([id] AS BIGINT) - %s) / %s AS BUCKET', args[0])
+        self.assertEqual(args[1], (1, 10, 1, 20))
+        self.assertEqual(buckets, {0: (10, 123, 4567), 1: (8, -5, 99)})
+
+    def test_get_rows_in_key_range(self):
+        """Test retrieving rows in a key range."""
+        self.connection.cursor = MagicMock()
+        self.connection.cursor.fetchall.return_value = [(5, 'e'), (6, 'f')]
+
+        data = self.connection.get_rows_in_key_range('test_table', ['id', 'name'], 'id', 5, 6)
+
+        self.assertEqual(self.connection.cursor.execute.call_args[0][1], (5, 6))
+        self.assertEqual(data['rows'], [{'id': 5, 'name': 'e'}, {'id': 6, 'name': 'f'}])
+        self.assertEqual(data['total_rows'], 2)
+
+    def test_get_table_fingerprints(self):
+        """Test retrieving table fingerprints."""
+        self.connection.cursor = MagicMock()
+        self.connection.cursor.fetchall.return_value = [
+            ('orders', '2024-01-02T03:04:05.123', '2024-01-01T00:00:00', 12345),
+            ('notes', '2024-02-01T00:00:00', None, -7)
+        ]
+
+        fingerprints = self.connection.get_table_fingerprints()
+
+        self.connection.cursor.execute.assert_called_once()
+        self.assertEqual(fingerprints, {
+            'orders': '2024-01-02T03:04:05.123|2024-01-01T00:00:00|12345',
+            'notes': '2024-02-01T00:00:00|None|-7'
+        })
+
+    def test_get_all_create_table_scripts(self):
+        """Test building every table's CREATE TABLE script from three catalog queries."""
+        self.connection.cursor = MagicMock()
+        self.connection.cursor.fetchall.side_effect = [
+            [
+                ('customers', 'id', 'int', None, 10, 0, 'NO', 1, 1),
+                ('orders', 'id', 'int', None, 10, 0, 'NO', 1, 1),
+                ('orders', 'customer_id', 'int', None, 10, 0, 'YES', 0, 0)
+            ],
+            [('FK_orders_customers', 'orders', 'customer_id', 'customers', 'id')],
+            [('IX_orders_customer', False, 'orders', 'customer_id')]
+        ]
+
+        scripts = self.connection.get_all_create_table_scripts()
+
+        self.assertEqual(self.connection.cursor.execute.call_count, 3)
+        self.assertEqual(scripts['customers'], (
+            "CREATE TABLE [customers] (\n"
+            "    [id] int NOT NULL IDENTITY(1,1),\n"
+            "    CONSTRAINT [PK_customers] PRIMARY KEY CLUSTERED (\n"
+            "        [id]\n"
+            "    )\n"
+            ");"
+        ))
+        self.assertIn("ALTER TABLE [orders] ADD CONSTRAINT [FK_orders_customers] FOREIGN KEY ([customer_id]) "
+                      "REFERENCES [customers] ([id]);", scripts['orders'])
+        self.assertIn("CREATE INDEX [IX_orders_customer] ON [orders] ([customer_id]);", scripts['orders'])
+        self.assertNotIn("FOREIGN KEY", scripts['customers'])
+
+    def test_get_all_create_table_scripts_filtered(self):
+        """Test restricting the catalog queries to a subset of tables."""
+        self.connection.cursor = MagicMock()
+        self.connection.cursor.fetchall.side_effect = [
+            [('orders', 'id', 'int', None, 10, 0, 'NO', 0, 1)],
+            [],
+            []
+        ]
+
+        scripts = self.connection.get_all_create_table_scripts(['orders'])
+
+        for call in self.connection.cursor.execute.call_args_list:
+            self.assertEqual(call[0][1], (('orders',),))
+        self.assertEqual(list(scripts), ['orders'])
+
     def test_get_row_count(self):
         """Test retrieving row count for a table."""
         # Set up mock cursor
@@ -250,5 +472,42 @@ class TestDatabaseConnection(unittest.TestCase):
         self.connection.cursor.execute.assert_called_once()
         self.assertEqual(count, 0)
 
+    def test_get_row_counts(self):
+        """Test retrieving metadata row counts for all tables in one query."""
+        self.connection.cursor = MagicMock()
+        self.connection.cursor.fetchall.return_value = [('orders', 1500), ('empty', None)]
+
+        counts = self.connection.get_row_counts()
+
+        self.connection.cursor.execute.assert_called_once()
+        self.assertIn('sys.dm_db_partition_stats', self.connection.cursor.execute.call_args[0][0])
+        self.assertEqual(counts, {'orders': 1500, 'empty': 0})
+
+    def test_get_row_counts_without_view_database_state(self):
+        """Test falling back to sys.partitions when partition stats are not accessible."""
+        self.connection.cursor = MagicMock()
+        self.connection.cursor.execute.side_effect = [Exception("VIEW DATABASE STATE permission denied"), None]
+        self.connection.cursor.fetchall.return_value = [('orders', 1500)]
+
+        counts = self.connection.get_row_counts()
+
+        fallback_query = self.connection.cursor.execute.call_args[0][0]
+        self.assertIn('sys.partitions', fallback_query)
+        self.assertIn('ps.rows', fallback_query)
+        self.assertEqual(counts, {'orders': 1500})
+
+    def test_get_row_counts_exact(self):
+        """Test exact row counts batched into UNION ALL queries."""
+        self.connection.cursor = MagicMock()
+        self.connection.get_tables = MagicMock(return_value=['a', 'b', 'c'])
+        self.connection.cursor.fetchall.side_effect = [[('a', 1), ('b', 2)], [('c', 3)]]
+
+        counts = self.connection._get_exact_row_counts(tables_per_query=2)
+
+        first_query, first_params = self.connection.cursor.execute.call_args_list[0][0]
+        self.assertEqual(first_query, "SELECT %s, COUNT_BIG(*) FROM [a] UNION ALL SELECT %s, COUNT_BIG(*) FROM [b]")
+        self.assertEqual(first_params, ('a', 'b'))
+        self.assertEqual(counts, {'a': 1, 'b': 2, 'c': 3})
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,142 @@
+"""
+Tests for the dual-side executor running source and target work concurrently.
+"""
+import unittest
+import sys
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from unittest.mock import MagicMock
+
+from flask import Flask, g
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Mock pymssql module before importing the SQL Server backend
+sys.modules.setdefault('pymssql', MagicMock())
+
+from app.utils.dual_side import DualSide, ReadAhead, SideError, run_both
+
+def sqlite_connection(name, path):
+    """Build SQLite connection details."""
+    return {'name': name, 'server': '', 'database': path, 'username': '', 'password': '', 'driver': 'sqlite'}
+
+class TestDualSide(unittest.TestCase):
+    """Test cases for the dual-side executor."""
+
+    def setUp(self):
+        """Set up a source and a target database."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        self.conns = []
+        for name, rows in (('source', 3), ('target', 5)):
+            path = os.path.join(self.temp_dir, f"{name}.db")
+            connection = sqlite3.connect(path)
+            connection.execute("CREATE TABLE t (id INTEGER PRIMARY KEY)")
+            connection.executemany("INSERT INTO t VALUES (?)", [(i,) for i in range(rows)])
+            connection.commit()
+            connection.close()
+            self.conns.append(sqlite_connection(name, path))
+
+    def test_run_both_overlaps_the_halves(self):
+        """Test that both halves run at the same time, the target on another thread."""
+        threads = []
+
+        def half(result):
+            threads.append(threading.get_ident())
+            time.sleep(0.2)
+            return result
+
+        start = time.perf_counter()
+        results = run_both(lambda: half('source'), lambda: half('target'))
+
+        self.assertEqual(results, ('source', 'target'))
+        self.assertLess(time.perf_counter() - start, 0.35)
+        self.assertEqual(len(set(threads)), 2)
+        self.assertIn(threading.get_ident(), threads)
+
+    def test_run_both_reports_the_failing_side(self):
+        """Test that errors name their side and keep the other side's result."""
+        def fail():
+            raise ValueError("boom")
+
+        with self.assertRaises(SideError) as context:
+            run_both(lambda: 1, fail, names=('db_a', 'db_b'))
+
+        self.assertEqual(context.exception.side, 'target')
+        self.assertEqual(str(context.exception), 'db_b: boom')
+        self.assertIsInstance(context.exception.error, ValueError)
+        self.assertEqual(context.exception.results, (1, None))
+
+        # The source error wins when both sides fail
+        with self.assertRaises(SideError) as context:
+            run_both(fail, fail)
+        self.assertEqual(context.exception.side, 'source')
+
+    def test_run_both_keeps_the_request_context(self):
+        """Test that the target half sees the request globals of the caller."""
+        app = Flask(__name__)
+        with app.test_request_context():
+            g.marker = 'request'
+            self.assertEqual(run_both(lambda: g.marker, lambda: g.marker), ('request', 'request'))
+
+    def test_read_ahead(self):
+        """Test that items come back in order and close stops the underlying iterator."""
+        closed = []
+
+        def batches():
+            try:
+                for batch in range(5):
+                    yield batch
+            finally:
+                closed.append(True)
+
+        self.assertEqual(list(ReadAhead(batches())), [0, 1, 2, 3, 4])
+
+        closed.clear()
+        with ReadAhead(batches()) as items:
+            self.assertEqual(next(items), 0)
+        self.assertEqual(closed, [True])
+        self.assertRaises(StopIteration, next, items)
+
+    def test_read_ahead_propagates_errors(self):
+        """Test that an error raised by the iterator reaches the caller."""
+        def batches():
+            yield 1
+            raise RuntimeError("fetch failed")
+
+        items = ReadAhead(batches())
+        self.assertEqual(next(items), 1)
+        self.assertRaises(RuntimeError, next, items)
+
+    def test_each_runs_on_both_databases(self):
+        """Test connecting and querying both sides."""
+        dual = DualSide(*self.conns)
+        dual.connect()
+        try:
+            counts = dual.each(lambda db: db.get_row_count('t'))
+        finally:
+            dual.disconnect()
+
+        self.assertEqual(counts, (3, 5))
+        self.assertIsNone(dual.db1.connection)
+        self.assertIsNone(dual.db2.connection)
+
+    def test_connect_failure(self):
+        """Test that a failed side is reported and the other side is disconnected."""
+        missing = sqlite_connection('missing', os.path.join(self.temp_dir, 'no', 'such', 'dir.db'))
+        dual = DualSide(self.conns[0], missing)
+
+        with self.assertRaises(SideError) as context:
+            dual.connect()
+
+        self.assertEqual(context.exception.side, 'target')
+        self.assertEqual(str(context.exception), 'Failed to connect to missing. Please check your connection details.')
+        self.assertIsNone(dual.db1.connection)
+
+if __name__ == '__main__':
+    unittest.main()
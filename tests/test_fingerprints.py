@@ -0,0 +1,47 @@
+"""
+Tests for the fingerprint store.
+"""
+import unittest
+import sys
+import os
+import tempfile
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.fingerprints import FingerprintStore
+
+SOURCE = {'name': 'source', 'server': 's1', 'database': 'db1', 'username': 'u', 'password': 'p', 'driver': 'd'}
+TARGET = {'name': 'target', 'server': 's2', 'database': 'db2', 'username': 'u', 'password': 'p', 'driver': 'd'}
+
+class TestFingerprintStore(unittest.TestCase):
+    """Test cases for FingerprintStore."""
+
+    def setUp(self):
+        """Set up a store in a temporary directory."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.store = FingerprintStore(os.path.join(self.temp_dir.name, 'fingerprints'))
+
+    def test_save_and_load(self):
+        """Test that saved entries are loaded back."""
+        key = self.store.comparison_key(SOURCE, TARGET)
+        entries = {'orders': {'fingerprints': ['a', 'b'], 'result': {'table_name': 'orders'}}}
+
+        self.store.save(key, entries)
+
+        self.assertEqual(self.store.load(key), entries)
+
+    def test_load_missing(self):
+        """Test that an unknown pair has no entries."""
+        self.assertEqual(self.store.load(self.store.comparison_key(SOURCE, TARGET)), {})
+
+    def test_comparison_key(self):
+        """Test that the key depends on the direction and identity of the connections but not passwords."""
+        key = self.store.comparison_key(SOURCE, TARGET)
+
+        self.assertNotEqual(key, self.store.comparison_key(TARGET, SOURCE))
+        self.assertEqual(key, self.store.comparison_key(dict(SOURCE, password='changed'), TARGET))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,7 +8,8 @@ import os
 # Add parent directory to path to import modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.utils.formatting import format_data_as_html
+from app.utils.comparison import compare_data_by_key
+from app.utils.formatting import format_data_as_html, iter_data_html
 
 class TestFormattingUtils(unittest.TestCase):
     """Test cases for the formatting utility functions."""
@@ -99,5 +100,43 @@ class TestFormattingUtils(unittest.TestCase):
         self.assertIn("<th>category</th>", html)
         self.assertIn("<td></td>", html)  # Empty cells for missing values
 
+    def test_iter_data_html_chunks(self):
+        """Test that the report is yielded summary first, then in chunks of rows."""
+        comparison_result = {
+            'summary': {'total_rows_compared': 4, 'rows_with_differences': 4},
+            'columns': ['id'],
+            'data_differences': [
+                {'row_index': i, 'differences': {'id': {'source': str(i), 'target': str(i + 1)}}}
+                for i in range(4)
+            ]
+        }
+
+        chunks = list(iter_data_html(comparison_result, chunk_rows=2))
+
+        self.assertIn("Comparison Summary", chunks[0])
+        self.assertNotIn("<tr class='diff-modified", chunks[0])
+        self.assertEqual(sum(chunk.count("<tr class='diff-modified") for chunk in chunks), 4)
+        self.assertTrue(all(chunk.count("<tr class='diff-modified") <= 2 for chunk in chunks))
+        self.assertEqual("".join(chunks), format_data_as_html(comparison_result))
+
+    def test_keyed_preview_highlights_each_side(self):
+        """Test that keyed results highlight deleted, inserted and modified rows on the right side."""
+        data1 = {'columns': ['id', 'name'], 'total_rows': 3,
+                 'rows': [{'id': 1, 'name': 'a'}, {'id': 2, 'name': 'b'}, {'id': 3, 'name': 'c'}]}
+        data2 = {'columns': ['id', 'name'], 'total_rows': 3,
+                 'rows': [{'id': 2, 'name': 'b'}, {'id': 3, 'name': 'C'}, {'id': 4, 'name': 'd'}]}
+        comparison_result = compare_data_by_key(data1, data2, ['id', 'name'], ['id'])
+        comparison_result.update({'columns': ['id', 'name'], 'source_data': data1, 'target_data': data2})
+
+        html = format_data_as_html(comparison_result, include_details=False)
+        source_html, target_html = html.split("<h5 class='mb-0'>Target Data</h5>")
+
+        self.assertIn("<tr class='diff-deleted'><td>1</td><td>a</td></tr>", source_html)
+        self.assertIn("<tr class='diff-modified'><td>3</td><td>c</td></tr>", source_html)
+        self.assertNotIn("<td>2</td><td>b</td>", source_html)
+        self.assertIn("<tr class='diff-modified'><td>3</td><td>C</td></tr>", target_html)
+        self.assertIn("<tr class='diff-added'><td>4</td><td>d</td></tr>", target_html)
+        self.assertNotIn("<td>2</td><td>b</td>", target_html)
+
 if __name__ == '__main__':
     unittest.main()
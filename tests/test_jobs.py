@@ -0,0 +1,126 @@
+"""
+Tests for the background job engine.
+"""
+import unittest
+import sys
+import os
+import tempfile
+import threading
+import time
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.jobs import Job, JobManager, JOB_COMPLETE, JOB_ERROR, JOB_CANCELLED
+
+def wait_for(manager, job_id, timeout=5):
+    """Wait until a job has finished and return its status."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = manager.status(job_id)
+        if status['finished_at'] is not None:
+            return status
+        time.sleep(0.01)
+    raise AssertionError('Job did not finish in time')
+
+class TestJobManager(unittest.TestCase):
+    """Test cases for JobManager."""
+
+    def setUp(self):
+        """Set up a job manager."""
+        self.manager = JobManager(max_workers=2)
+
+    def test_job_runs_to_completion(self):
+        """Test that a job reports progress and results."""
+        def work(job, items):
+            job.update(total=len(items))
+            for i, item in enumerate(items):
+                job.add_results([item * 2])
+                job.update(processed=i + 1)
+
+        job_id = self.manager.submit('test', work, [1, 2, 3])
+        status = wait_for(self.manager, job_id)
+
+        self.assertEqual(status['status'], JOB_COMPLETE)
+        self.assertEqual(status['progress'], 100)
+        self.assertEqual(status['processed'], 3)
+        self.assertEqual(status['result_count'], 3)
+        self.assertEqual(self.manager.get(job_id).get_results(1), [4, 6])
+
+    def test_job_error(self):
+        """Test that an exception in a job is recorded."""
+        def work(job):
+            raise ValueError('catalog query failed')
+
+        job_id = self.manager.submit('test', work)
+        status = wait_for(self.manager, job_id)
+
+        self.assertEqual(status['status'], JOB_ERROR)
+        self.assertEqual(status['error'], 'catalog query failed')
+
+    def test_cancel_running_job(self):
+        """Test that a running job stops once cancellation is requested."""
+        started = threading.Event()
+
+        def work(job):
+            started.set()
+            while not job.cancelled:
+                time.sleep(0.01)
+
+        job_id = self.manager.submit('test', work)
+        started.wait(5)
+
+        self.assertTrue(self.manager.cancel(job_id))
+        self.assertEqual(wait_for(self.manager, job_id)['status'], JOB_CANCELLED)
+        self.assertFalse(self.manager.cancel(job_id))
+
+    def test_wait_for_change(self):
+        """Test that waiters wake up when a job reports new results."""
+        job = Job('job', 'test')
+        version = job.wait_for_change(None)
+
+        timer = threading.Timer(0.05, job.add_results, args=([1],))
+        timer.start()
+        new_version = job.wait_for_change(version, timeout=5)
+        timer.join()
+
+        self.assertNotEqual(new_version, version)
+        self.assertEqual(job.get_results(), [1])
+        self.assertEqual(job.wait_for_change(new_version, timeout=0.01), new_version)
+
+    def test_unknown_job(self):
+        """Test lookups of a job that doesn't exist."""
+        self.assertIsNone(self.manager.status('missing'))
+        self.assertFalse(self.manager.cancel('missing'))
+
+    def test_prune_finished_jobs(self):
+        """Test that finished jobs are forgotten after the retention period."""
+        self.manager.retention = 0
+        job_id = self.manager.submit('test', lambda job: None)
+        wait_for(self.manager, job_id)
+        time.sleep(0.01)
+
+        self.manager.prune()
+
+        self.assertIsNone(self.manager.get(job_id))
+
+    def test_results_written_to_store(self):
+        """Test that a job with a results directory keeps its results in a result store."""
+        with tempfile.TemporaryDirectory() as results_dir:
+            manager = JobManager(results_dir=results_dir, retention=0)
+
+            job_id = manager.submit('test', lambda job: job.add_results([{'table_name': 't1'}, {'table_name': 't2'}]))
+            status = wait_for(manager, job_id)
+            job = manager.get(job_id)
+
+            self.assertEqual(status['result_count'], 2)
+            self.assertEqual(job.results, [])
+            self.assertEqual(job.get_results(1), [{'table_name': 't2'}])
+            self.assertEqual(job.result_store.get('t1'), {'table_name': 't1'})
+
+            time.sleep(0.01)
+            manager.prune()
+            self.assertFalse(os.path.exists(os.path.join(results_dir, job_id)))
+
+if __name__ == '__main__':
+    unittest.main()
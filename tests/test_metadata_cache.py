@@ -0,0 +1,141 @@
+"""
+Tests for the MetadataCache class.
+"""
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.metadata_cache import MetadataCache
+
+class TestMetadataCache(unittest.TestCase):
+    """Test cases for the MetadataCache class."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.cache = MetadataCache(max_entries=2, ttl=60, check_interval=0)
+        self.db = self._make_db('server1', 'db1')
+
+    def _make_db(self, server, database):
+        """Create a mock database connection"""
+        db = MagicMock()
+        db.server = server
+        db.database = database
+        db.username = 'user'
+        db.get_schema_version.return_value = (10, '2024-01-01 00:00:00')
+        db.get_tables.return_value = ['customers', 'orders']
+        db.get_table_schema.return_value = [{'name': 'id'}]
+        db.get_all_table_schemas.return_value = {
+            'customers': [{'name': 'id'}],
+            'orders': [{'name': 'id'}, {'name': 'total'}]
+        }
+        return db
+
+    def test_get_tables_cached(self):
+        """Test that repeated table lookups hit the cache."""
+        self.assertEqual(self.cache.get_tables(self.db), ['customers', 'orders'])
+        self.assertEqual(self.cache.get_tables(self.db), ['customers', 'orders'])
+
+        self.db.get_tables.assert_called_once()
+
+    def test_version_change_invalidates(self):
+        """Test that a changed schema version reloads metadata."""
+        self.cache.get_tables(self.db)
+        self.db.get_schema_version.return_value = (11, '2024-01-02 00:00:00')
+        self.cache.get_tables(self.db)
+
+        self.assertEqual(self.db.get_tables.call_count, 2)
+
+    def test_version_check_interval(self):
+        """Test that the version check is skipped within the check interval."""
+        cache = MetadataCache(check_interval=60)
+        cache.get_tables(self.db)
+        cache.get_tables(self.db)
+
+        self.db.get_schema_version.assert_called_once()
+
+    def test_ttl_expiry(self):
+        """Test that entries older than the TTL are reloaded."""
+        with patch('app.models.metadata_cache.time.monotonic', return_value=100.0):
+            self.cache.get_tables(self.db)
+        with patch('app.models.metadata_cache.time.monotonic', return_value=200.0):
+            self.cache.get_tables(self.db)
+
+        self.assertEqual(self.db.get_tables.call_count, 2)
+
+    def test_version_unavailable_bypasses_cache(self):
+        """Test that metadata is not cached when change detection fails."""
+        self.db.get_schema_version.return_value = None
+        self.cache.get_tables(self.db)
+        self.cache.get_tables(self.db)
+
+        self.assertEqual(self.db.get_tables.call_count, 2)
+
+    def test_lru_eviction(self):
+        """Test that the least recently used connection is evicted."""
+        db2 = self._make_db('server2', 'db2')
+        db3 = self._make_db('server3', 'db3')
+
+        self.cache.get_tables(self.db)
+        self.cache.get_tables(db2)
+        self.cache.get_tables(self.db)
+        self.cache.get_tables(db3)
+
+        # db2 was least recently used and should have been evicted
+        self.cache.get_tables(db2)
+        self.assertEqual(db2.get_tables.call_count, 2)
+        self.assertEqual(self.db.get_tables.call_count, 1)
+
+    def test_get_table_schema_cached(self):
+        """Test that table schemas are cached per table."""
+        self.cache.get_table_schema(self.db, 'customers')
+        schema = self.cache.get_table_schema(self.db, 'customers')
+
+        self.assertEqual(schema, [{'name': 'id'}])
+        self.db.get_table_schema.assert_called_once_with('customers')
+
+    def test_get_all_table_schemas_loads_only_missing(self):
+        """Test that bulk schema lookups only load uncached tables."""
+        self.db.get_all_table_schemas.return_value = {'customers': [{'name': 'id'}]}
+        self.cache.get_all_table_schemas(self.db, ['customers'])
+
+        self.db.get_all_table_schemas.return_value = {'orders': [{'name': 'id'}]}
+        schemas = self.cache.get_all_table_schemas(self.db, ['customers', 'orders', 'missing'])
+
+        self.assertEqual(sorted(schemas.keys()), ['customers', 'orders'])
+        self.db.get_all_table_schemas.assert_called_with(['orders', 'missing'])
+
+        # Known-missing tables are not queried again
+        self.cache.get_all_table_schemas(self.db, ['missing'])
+        self.assertEqual(self.db.get_all_table_schemas.call_count, 2)
+
+    def test_full_catalog_serves_table_schema(self):
+        """Test that a full catalog load answers single-table lookups."""
+        self.cache.get_all_table_schemas(self.db)
+
+        self.assertEqual(len(self.cache.get_table_schema(self.db, 'orders')), 2)
+        self.assertEqual(self.cache.get_table_schema(self.db, 'missing'), [])
+        self.db.get_table_schema.assert_not_called()
+
+    def test_get_all_table_models_cached(self):
+        """Test that table models are built once per cached table."""
+        models = self.cache.get_all_table_models(self.db)
+        again = self.cache.get_all_table_models(self.db, ['orders'])
+
+        self.assertEqual(models['orders'].column_names(), ['id', 'total'])
+        self.assertIs(again['orders'], models['orders'])
+        self.db.get_all_table_schemas.assert_called_once_with()
+
+    def test_invalidate(self):
+        """Test explicit invalidation."""
+        self.cache.get_tables(self.db)
+        self.cache.invalidate(self.db)
+        self.cache.get_tables(self.db)
+
+        self.assertEqual(self.db.get_tables.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
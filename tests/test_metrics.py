@@ -0,0 +1,92 @@
+"""
+Tests for the phase timers and Prometheus metrics.
+"""
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import time
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.metrics import Histogram, MetricsRegistry, PhaseTimer
+from app.utils.data_diff import save_differences, save_timings, load_timings
+
+class TestMetrics(unittest.TestCase):
+    """Test cases for the phase timers and Prometheus metrics."""
+
+    def test_histogram_render(self):
+        """Test that observations are rendered as cumulative buckets."""
+        histogram = Histogram('test_seconds', 'Test latency.', (0.1, 1), ('backend',))
+        histogram.observe(0.05, backend='sqlite')
+        histogram.observe(0.5, backend='sqlite')
+        histogram.observe(5, backend='sqlite')
+
+        lines = histogram.render()
+
+        self.assertEqual(lines[:2], ['# HELP test_seconds Test latency.', '# TYPE test_seconds histogram'])
+        self.assertIn('test_seconds_bucket{backend="sqlite",le="0.1"} 1', lines)
+        self.assertIn('test_seconds_bucket{backend="sqlite",le="1"} 2', lines)
+        self.assertIn('test_seconds_bucket{backend="sqlite",le="+Inf"} 3', lines)
+        self.assertIn('test_seconds_sum{backend="sqlite"} 5.55', lines)
+        self.assertIn('test_seconds_count{backend="sqlite"} 3', lines)
+
+    def test_phase_timer_nesting(self):
+        """Test that nested phases and timed iterables are counted exclusively."""
+        registry = MetricsRegistry()
+        timer = PhaseTimer(registry=registry)
+
+        def batches():
+            for batch in range(3):
+                time.sleep(0.01)
+                yield batch
+
+        with timer.phase('compare_data'):
+            items = list(timer.timed_iter('data_fetch', batches()))
+
+        breakdown = timer.finish()
+
+        self.assertEqual(items, [0, 1, 2])
+        self.assertEqual(list(breakdown['phases']), ['data_fetch', 'compare_data'])
+        self.assertGreaterEqual(breakdown['phases']['data_fetch'], 0.03)
+        self.assertLess(breakdown['phases']['compare_data'], 0.01)
+        self.assertGreaterEqual(breakdown['total_seconds'], 0.03)
+        self.assertEqual(registry.phase_latency.get_series(kind='data', phase='data_fetch')['count'], 1)
+
+        # Finishing again doesn't record the phases twice
+        timer.finish()
+        self.assertEqual(registry.phase_latency.get_series(kind='data', phase='data_fetch')['count'], 1)
+
+    def test_render_with_pool_metrics(self):
+        """Test that pool metrics are summed per server and database."""
+        registry = MetricsRegistry()
+        registry.query_latency.observe(0.02, backend='sqlserver')
+        pool_metrics = {
+            ('srv', 'db', 'alice'): {'created': 2, 'reused': 5, 'idle': 1, 'in_use': 1},
+            ('srv', 'db', 'bob'): {'created': 1, 'reused': 0, 'idle': 0, 'in_use': 1}
+        }
+
+        text = registry.render(pool_metrics)
+
+        self.assertIn('dbcompare_query_duration_seconds_count{backend="sqlserver"} 1\n', text)
+        self.assertIn('dbcompare_pool_connections{server="srv",database="db",state="in_use"} 2\n', text)
+        self.assertIn('dbcompare_pool_events_total{server="srv",database="db",event="created"} 3\n', text)
+        self.assertNotIn('alice', text)
+
+    def test_timings_are_stored_with_the_differences(self):
+        """Test saving and loading the timing breakdown of a comparison."""
+        results_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, results_dir, ignore_errors=True)
+        diff_id = save_differences([], results_dir)
+        timings = {'phases': {'connect': 0.5}, 'total_seconds': 1.0}
+
+        self.assertIsNone(load_timings(diff_id, results_dir))
+        save_timings(diff_id, timings, results_dir)
+
+        self.assertEqual(load_timings(diff_id, results_dir), timings)
+        self.assertIsNone(load_timings('../etc', results_dir))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+"""
+Tests for the parallel schema comparison executor.
+"""
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+import tempfile
+import threading
+import time
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Mock pymssql, which the database model imports
+sys.modules.setdefault('pymssql', MagicMock())
+
+from app.utils.parallel import compare_schemas_parallel, build_schema_result, run_schema_comparison
+from app.utils.jobs import Job
+from app.utils.fingerprints import FingerprintStore
+
+SOURCE = {'name': 'source', 'server': 's1', 'database': 'db1', 'username': 'u', 'password': 'p', 'driver': 'd'}
+TARGET = {'name': 'target', 'server': 's2', 'database': 'db2', 'username': 'u', 'password': 'p', 'driver': 'd'}
+
+def column(name, data_type='int'):
+    """Build a minimal column definition."""
+    return {'name': name, 'type': data_type, 'formatted_data_type': data_type, 'is_nullable': 'NO',
+            'is_identity': 0, 'is_primary_key': 0}
+
+class TestParallelSchemaComparison(unittest.TestCase):
+    """Test cases for compare_schemas_parallel."""
+
+    def setUp(self):
+        """Set up fake catalogs for both sides."""
+        self.catalogs = {
+            'db1': {f't{i:02d}': [column('id')] for i in range(20)},
+            'db2': {f't{i:02d}': [column('id')] for i in range(1, 21)}
+        }
+        self.catalogs['db2']['t05'] = [column('id', 'bigint')]
+        self.threads = set()
+        self.lock = threading.Lock()
+
+        self.fingerprints = {
+            'db1': {name: 'v1' for name in self.catalogs['db1']},
+            'db2': {name: 'v1' for name in self.catalogs['db2']}
+        }
+
+        def open_connection(conn):
+            db = MagicMock()
+            db.database = conn['database']
+            db.get_table_fingerprints.side_effect = lambda: dict(self.fingerprints[conn['database']])
+            return db
+
+        def get_all_table_schemas(db, table_names):
+            with self.lock:
+                self.threads.add(threading.get_ident())
+            time.sleep(0.01)
+            catalog = self.catalogs[db.database]
+            return {name: catalog[name] for name in table_names if name in catalog}
+
+        patcher_open = patch('app.utils.parallel.open_connection', side_effect=open_connection)
+        patcher_cache = patch('app.utils.parallel.metadata_cache')
+        self.mock_open = patcher_open.start()
+        self.mock_cache = patcher_cache.start()
+        self.mock_cache.get_all_table_models.side_effect = get_all_table_schemas
+        self.mock_cache.get_tables.side_effect = lambda db: sorted(self.catalogs[db.database])
+        self.addCleanup(patcher_open.stop)
+        self.addCleanup(patcher_cache.stop)
+
+    def test_results_in_table_order(self):
+        """Test that results follow the input order and match a serial comparison."""
+        tables = sorted(set(self.catalogs['db1']) | set(self.catalogs['db2']))
+
+        results = compare_schemas_parallel(SOURCE, TARGET, tables, max_workers=4)
+
+        expected = [build_schema_result(name, self.catalogs['db1'], self.catalogs['db2']) for name in tables]
+        self.assertEqual(results, expected)
+        self.assertEqual([r['table_name'] for r in results], tables)
+
+    def test_missing_and_changed_tables(self):
+        """Test that tables missing on one side and changed tables are flagged."""
+        results = {r['table_name']: r for r in compare_schemas_parallel(SOURCE, TARGET, ['t00', 't05', 't20'])}
+
+        self.assertEqual((results['t00']['in_db1'], results['t00']['in_db2']), (True, False))
+        self.assertTrue(results['t00']['differences'])
+        self.assertTrue(results['t05']['differences'])
+        self.assertEqual((results['t20']['in_db1'], results['t20']['in_db2']), (False, True))
+
+    def test_uses_worker_connections(self):
+        """Test that each chunk opens its own connection on both sides in separate threads."""
+        compare_schemas_parallel(SOURCE, TARGET, [f't{i:02d}' for i in range(1, 20)], max_workers=3)
+
+        self.assertEqual(self.mock_open.call_count, 6)
+        self.assertGreater(len(self.threads), 1)
+
+    def test_empty_table_list(self):
+        """Test that an empty table list needs no connections."""
+        self.assertEqual(compare_schemas_parallel(SOURCE, TARGET, []), [])
+        self.mock_open.assert_not_called()
+
+    def test_run_schema_comparison_job(self):
+        """Test that the job compares every table in batches and reports progress."""
+        job = Job('job', 'schema_comparison')
+
+        run_schema_comparison(job, SOURCE, TARGET, max_workers=2, batch_size=8)
+
+        self.assertEqual([r['table_name'] for r in job.results], [f't{i:02d}' for i in range(21)])
+        self.assertEqual((job.processed, job.total), (21, 21))
+
+    def test_run_schema_comparison_cancelled(self):
+        """Test that a cancelled job stops before the next batch."""
+        job = Job('job', 'schema_comparison')
+        job._cancel_event.set()
+
+        run_schema_comparison(job, SOURCE, TARGET, batch_size=8)
+
+        self.assertEqual(job.results, [])
+        self.assertEqual(job.total, 21)
+
+    def test_incremental_run_reuses_unchanged_tables(self):
+        """Test that a second run only compares tables whose fingerprints changed."""
+        with tempfile.TemporaryDirectory() as directory:
+            store = FingerprintStore(directory)
+            first = Job('first', 'schema_comparison')
+            run_schema_comparison(first, SOURCE, TARGET, batch_size=8, fingerprint_store=store)
+
+            # t05 now matches on both sides and only its target fingerprint moves
+            self.catalogs['db2']['t05'] = [column('id')]
+            self.fingerprints['db2']['t05'] = 'v2'
+            self.mock_cache.get_all_table_models.reset_mock()
+
+            second = Job('second', 'schema_comparison')
+            run_schema_comparison(second, SOURCE, TARGET, batch_size=8, fingerprint_store=store)
+
+            compared = [name for call in self.mock_cache.get_all_table_models.call_args_list for name in call[0][1]]
+            self.assertEqual(sorted(set(compared)), ['t05'])
+            self.assertEqual(second.details['tables_reused'], 20)
+            self.assertEqual([r['table_name'] for r in second.results], [r['table_name'] for r in first.results])
+            results = {r['table_name']: r for r in second.results}
+            self.assertFalse(results['t05']['differences'])
+            self.assertTrue(results['t00']['differences'])
+
+            # A full run compares everything again
+            self.mock_cache.get_all_table_models.reset_mock()
+            run_schema_comparison(Job('full', 'schema_comparison'), SOURCE, TARGET, batch_size=8,
+                                  fingerprint_store=store, full=True)
+            compared = {name for call in self.mock_cache.get_all_table_models.call_args_list for name in call[0][1]}
+            self.assertEqual(len(compared), 21)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+"""
+Tests for the query tracing cursor and slow-query log.
+"""
+import unittest
+import sys
+import os
+import shutil
+import sqlite3
+import tempfile
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.query_trace import (QueryTracer, TracedCursor, fingerprint_sql, params_shape,
+                                   summarize_traces)
+
+class TestQueryTrace(unittest.TestCase):
+    """Test cases for the query tracing cursor and slow-query log."""
+
+    def setUp(self):
+        """Set up an in-memory database and a tracer logging to a temporary file."""
+        self.log_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.log_dir, ignore_errors=True)
+        self.log_path = os.path.join(self.log_dir, 'slow.log')
+        self.tracer = QueryTracer(threshold_ms=None, log_path=self.log_path)
+        self.addCleanup(self.tracer.configure, log_path=os.path.join(self.log_dir, 'closed.log'))
+
+        self.connection = sqlite3.connect(':memory:')
+        self.addCleanup(self.connection.close)
+        self.connection.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT)")
+        self.connection.executemany("INSERT INTO t VALUES (?, ?)", [(i, f"name {i}") for i in range(10)])
+
+    def traced(self):
+        """Get a traced cursor on the test database."""
+        return TracedCursor(self.connection.cursor(), 'sqlite', self.tracer)
+
+    def test_fingerprint_normalizes_values(self):
+        """Test that queries differing only in their values share a fingerprint."""
+        first = fingerprint_sql("SELECT * FROM t -- first\nWHERE id IN (1, 2, 3) AND name = 'a'")
+        second = fingerprint_sql("SELECT *  FROM t\n  WHERE id IN (4,5) AND name = N'it''s'")
+
+        self.assertEqual(first, "SELECT * FROM t WHERE id IN (...) AND name = ?")
+        self.assertEqual(first, second)
+        self.assertEqual(fingerprint_sql("SELECT TOP 100 * FROM t WHERE id = %s"),
+                         "SELECT TOP ? * FROM t WHERE id = ?")
+
+    def test_params_shape(self):
+        """Test that parameters are described by their types only."""
+        self.assertEqual(params_shape(None), '')
+        self.assertEqual(params_shape(('secret', 1, [1, 2, 3])), '(str, int, list[3])')
+        self.assertEqual(params_shape({'name': 'secret'}), '{name: str}')
+
+    def test_fetchmany_finishes_when_rows_run_out(self):
+        """Test that rows and bytes accumulate until a short batch finishes the query."""
+        cursor = self.traced().execute("SELECT id, name FROM t WHERE id >= ?", (0,))
+
+        self.assertEqual(len(cursor.fetchmany(4)), 4)
+        self.assertFalse(cursor.trace['finished'])
+        cursor.fetchmany(4)
+        self.assertEqual(len(cursor.fetchmany(4)), 2)
+
+        self.assertTrue(cursor.trace['finished'])
+        self.assertEqual(cursor.trace['rows'], 10)
+        self.assertGreater(cursor.trace['bytes'], 0)
+        self.assertEqual(cursor.trace['params'], '(int)')
+
+    def test_statement_without_results_finishes_on_execute(self):
+        """Test that a statement returning no result set is finished right away."""
+        cursor = self.traced().execute("UPDATE t SET name = 'x' WHERE id = 1")
+
+        self.assertTrue(cursor.trace['finished'])
+        self.assertEqual(cursor.rowcount, 1)
+
+    def test_slow_queries_are_logged(self):
+        """Test that queries over the threshold are written to the slow-query log."""
+        self.tracer.configure(threshold_ms=0)
+        self.traced().execute("SELECT name FROM t WHERE id = ?", (3,)).fetchone()
+
+        with open(self.log_path, encoding='utf-8') as log:
+            content = log.read()
+        self.assertIn("rows=1", content)
+        self.assertIn("params=(int)", content)
+        self.assertIn("sql=SELECT name FROM t WHERE id = ?", content)
+        self.assertNotIn("(3,)", content)
+
+    def test_fast_queries_are_not_logged(self):
+        """Test that queries under the threshold are not logged."""
+        self.tracer.configure(threshold_ms=60000)
+        self.traced().execute("SELECT COUNT(*) FROM t").fetchone()
+
+        self.assertFalse(os.path.exists(self.log_path))
+
+    def test_summarize_groups_by_fingerprint(self):
+        """Test that a request's queries are grouped by fingerprint."""
+        traces = []
+        for key in (1, 2, 3):
+            cursor = self.traced().execute(f"SELECT name FROM t WHERE id = {key}")
+            cursor.fetchall()
+            traces.append(cursor.trace)
+        cursor = self.traced().execute("SELECT COUNT(*) FROM t")
+        cursor.fetchone()
+        traces.append(cursor.trace)
+
+        summary = summarize_traces(traces)
+
+        self.assertEqual(summary['queries'], 4)
+        self.assertEqual(summary['rows'], 4)
+        self.assertEqual([group['calls'] for group in summary['groups']], [3, 1])
+        self.assertEqual(summary['groups'][0]['fingerprint'], "SELECT name FROM t WHERE id = ?")
+
+if __name__ == '__main__':
+    unittest.main()
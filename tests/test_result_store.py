@@ -0,0 +1,77 @@
+"""
+Tests for the append-only result store.
+"""
+import unittest
+import sys
+import os
+import tempfile
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.result_store import ResultStore
+
+def result(name, differences=False):
+    """Build a schema comparison entry."""
+    return {'table_name': name, 'in_db1': True, 'in_db2': True, 'columns': [], 'differences': differences}
+
+class TestResultStore(unittest.TestCase):
+    """Test cases for ResultStore."""
+
+    def setUp(self):
+        """Set up a store in a temporary directory."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.path = os.path.join(self.temp_dir.name, 'job', 'results.jsonl')
+        self.store = ResultStore(self.path)
+
+    def test_append_and_read_range(self):
+        """Test appending batches and reading ranges across them."""
+        self.store.append([result('a'), result('b')])
+        self.store.append([result('c', True)])
+
+        self.assertEqual(len(self.store), 3)
+        self.assertEqual(self.store.get_range(), [result('a'), result('b'), result('c', True)])
+        self.assertEqual(self.store.get_range(1, 1), [result('b')])
+        self.assertEqual(self.store.get_range(2, 10), [result('c', True)])
+        self.assertEqual(self.store.get_range(3), [])
+
+    def test_get_by_key(self):
+        """Test looking up a single entry by table name."""
+        self.store.append([result('orders'), result('customers', True)])
+
+        self.assertEqual(self.store.get('customers'), result('customers', True))
+        self.assertIsNone(self.store.get('missing'))
+        self.assertEqual(self.store.keys(), ['orders', 'customers'])
+
+    def test_append_only_writes_new_lines(self):
+        """Test that appending leaves the existing file contents untouched."""
+        self.store.append([result('a')])
+        with open(self.path, 'rb') as f:
+            before = f.read()
+
+        self.store.append([result('b')])
+
+        with open(self.path, 'rb') as f:
+            self.assertTrue(f.read().startswith(before))
+
+    def test_reopen_rebuilds_index(self):
+        """Test that reopening a store restores its index and drops a partial last line."""
+        self.store.append([result('a'), result('b')])
+        with open(self.path, 'ab') as f:
+            f.write(b'{"table_name": "trunc')
+
+        reopened = ResultStore(self.path)
+
+        self.assertEqual(len(reopened), 2)
+        self.assertEqual(reopened.get('b'), result('b'))
+        reopened.append([result('c')])
+        self.assertEqual(ResultStore(self.path).get_range(), [result('a'), result('b'), result('c')])
+
+    def test_empty_append(self):
+        """Test that appending nothing is a no-op."""
+        self.store.append([])
+        self.assertEqual(len(self.store), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+"""
+Tests for deterministic sampling and the mismatch rate estimate.
+"""
+import unittest
+import sys
+import os
+import shutil
+import sqlite3
+import tempfile
+from unittest.mock import MagicMock
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Mock pymssql module before importing the SQL Server backend
+sys.modules.setdefault('pymssql', MagicMock())
+
+from app.models.backends.sqlite import SQLiteBackend
+from app.models.database import DatabaseConnection
+from app.utils.dual_side import SideError
+from app.utils.sampling import choose_modulus, compare_data_by_sample, estimate_row_count, wilson_interval
+
+class TestSampling(unittest.TestCase):
+    """Test cases for deterministic sampling."""
+
+    def setUp(self):
+        """Set up two 20,000 row tables where every 50th target row differs."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        self.dbs = []
+        for name in ('source', 'target'):
+            path = os.path.join(self.temp_dir, f"{name}.db")
+            connection = sqlite3.connect(path)
+            connection.execute("CREATE TABLE items (region varchar(10), id INTEGER, qty int, PRIMARY KEY (region, id))")
+            rows = [('eu' if i % 2 else 'us', i, i % 7) for i in range(20000)]
+            if name == 'target':
+                rows = [(region, i, -1 if i % 50 == 0 else qty) for region, i, qty in rows]
+            connection.executemany("INSERT INTO items VALUES (?, ?, ?)", rows)
+            connection.commit()
+            connection.close()
+
+            db = SQLiteBackend(server='', database=path, username='', password='', driver='sqlite')
+            self.assertTrue(db.connect())
+            self.addCleanup(db.disconnect)
+            self.dbs.append(db)
+
+    def test_wilson_interval(self):
+        """Test the interval against known values."""
+        low, high = wilson_interval(10, 100)
+        self.assertAlmostEqual(low, 0.0552, places=4)
+        self.assertAlmostEqual(high, 0.1744, places=4)
+
+        # No mismatches still gives an informative upper bound
+        low, high = wilson_interval(0, 1000)
+        self.assertEqual(low, 0.0)
+        self.assertAlmostEqual(high, 0.00383, places=5)
+
+        self.assertEqual(wilson_interval(0, 0), (0.0, 1.0))
+
+    def test_choose_modulus(self):
+        """Test sizing the sample from the row count."""
+        self.assertEqual(choose_modulus(1000000000, 10000), 100000)
+        self.assertEqual(choose_modulus(500, 10000), 1)
+        self.assertEqual(choose_modulus(0, 10000), 1)
+
+    def test_sample_selects_the_same_keys(self):
+        """Test that both sides and repeated runs return the same sampled keys."""
+        source, target = self.dbs
+        columns = ['region', 'id', 'qty']
+        keys = ['region', 'id']
+
+        sample1 = source.get_sampled_rows('items', columns, keys, 20)
+        sample2 = target.get_sampled_rows('items', columns, keys, 20)
+
+        sampled_keys = [(row['region'], row['id']) for row in sample1['rows']]
+        self.assertEqual(sampled_keys, [(row['region'], row['id']) for row in sample2['rows']])
+        self.assertEqual(sample1, source.get_sampled_rows('items', columns, keys, 20))
+        self.assertTrue(600 < sample1['total_rows'] < 1400)
+
+        other = source.get_sampled_rows('items', columns, keys, 20, residue=1)
+        self.assertFalse(set(sampled_keys) & {(row['region'], row['id']) for row in other['rows']})
+
+    def test_estimate_covers_the_true_rate(self):
+        """Test the mismatch rate estimate of a sample."""
+        source, target = self.dbs
+
+        result = compare_data_by_sample(source, target, 'items', 'items', ['region', 'id'], ['qty'],
+                                        sample_size=2000)
+
+        stats = result['summary']['sample_stats']
+        self.assertEqual(stats['modulus'], 10)
+        self.assertEqual(stats['sampled_keys'], result['summary']['source_total_rows'])
+        self.assertEqual(stats['mismatches'], result['summary']['rows_modified'])
+        self.assertLessEqual(stats['mismatch_rate_low'], 0.02)
+        self.assertGreaterEqual(stats['mismatch_rate_high'], 0.02)
+        self.assertLessEqual(stats['estimated_mismatched_rows_low'], 400)
+        self.assertGreaterEqual(stats['estimated_mismatched_rows_high'], 400)
+        self.assertEqual(result['columns'], ['region', 'id', 'qty'])
+
+    def test_small_table_is_compared_exactly(self):
+        """Test that a table smaller than the sample is compared in full."""
+        source, target = self.dbs
+
+        result = compare_data_by_sample(source, target, 'items', 'items', ['region', 'id'], ['qty'],
+                                        sample_size=50000, max_differences=100)
+
+        stats = result['summary']['sample_stats']
+        self.assertEqual(stats['modulus'], 1)
+        self.assertEqual(stats['sampled_keys'], 20000)
+        self.assertEqual(stats['mismatches'], 400)
+        self.assertEqual(stats['mismatch_rate_low'], stats['mismatch_rate_high'])
+        self.assertEqual(len(result['data_differences']), 100)
+        self.assertTrue(result['summary']['differences_truncated'])
+
+    def test_sizing_counts_only_the_compared_table(self):
+        """Test that sizing counts the table up to a bound and refuses beyond it."""
+        source, _ = self.dbs
+        source.get_row_counts = MagicMock(side_effect=AssertionError("counted every table"))
+
+        self.assertEqual(estimate_row_count(source, 'items', 1000), 20000)
+        with self.assertRaises(ValueError):
+            estimate_row_count(source, 'items', 100)
+        with self.assertRaises(SideError):
+            compare_data_by_sample(source, self.dbs[1], 'items', 'items', ['region', 'id'], ['qty'],
+                                   sample_size=100)
+
+    def test_sql_server_sizing_queries(self):
+        """Test the SQL Server per-table row count queries."""
+        db = DatabaseConnection(server='srv', database='db', username='u', password='p')
+        db.cursor = MagicMock()
+        db.cursor.fetchone.return_value = (123456789,)
+
+        self.assertEqual(estimate_row_count(db, 'items', 1000), 123456789)
+        query, params = db.cursor.execute.call_args[0]
+        self.assertIn("ps.object_id = OBJECT_ID(%s)", query)
+        self.assertEqual(params, ('[items]',))
+
+        # Without metadata the table is counted up to a bound
+        db.cursor.fetchone.side_effect = [(None,), (500,)]
+        self.assertEqual(estimate_row_count(db, 'items', 1000), 500)
+        self.assertEqual(db.cursor.execute.call_args[0][0],
+                         "SELECT COUNT_BIG(*) FROM (SELECT TOP 100000 1 AS one FROM [items]) AS counted")
+
+    def test_sql_server_sample_query(self):
+        """Test the SQL Server sampling query."""
+        db = DatabaseConnection(server='srv', database='db', username='u', password='p')
+        db.cursor = MagicMock()
+        db.cursor.fetchall.return_value = [(1, 'a')]
+
+        data = db.get_sampled_rows('items', ['id', 'name'], ['id'], 1000, residue=3)
+
+        query = db.cursor.execute.call_args[0][0]
+        self.assertEqual(len(db.cursor.execute.call_args[0]), 1)
+        self.assertIn("HASHBYTES('MD5', CONCAT(CAST([id] AS NVARCHAR(4000)), N'|'))", query)
+        self.assertIn("% 1000 = 3", query)
+        self.assertIn("ORDER BY [id]", query)
+        self.assertEqual(data['rows'], [{'id': 1, 'name': 'a'}])
+
+if __name__ == '__main__':
+    unittest.main()
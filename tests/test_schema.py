@@ -0,0 +1,72 @@
+"""
+Tests for the compact table schema model.
+"""
+import unittest
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.schema import ColumnInfo, TableSchema
+
+def column(name, data_type='int', nullable='No', **extra):
+    """Build a column dict as returned by get_table_schema()."""
+    result = {
+        'name': name,
+        'type': data_type,
+        'max_length': 0,
+        'numeric_precision': 10,
+        'numeric_scale': 0,
+        'is_nullable': nullable,
+        'is_identity': 'No',
+        'is_primary_key': 'No',
+        'formatted_data_type': data_type
+    }
+    result.update(extra)
+    return result
+
+class TestSchemaModel(unittest.TestCase):
+    """Test cases for ColumnInfo and TableSchema."""
+
+    def test_column_round_trip(self):
+        """Test converting a column dict to ColumnInfo and back."""
+        info = ColumnInfo.from_dict(column('id', nullable='Yes'))
+
+        self.assertIs(info.is_nullable, True)
+        self.assertIs(info.is_identity, False)
+        self.assertIsNone(info.extra)
+        self.assertEqual(info.get_value('is_nullable'), 'Yes')
+        self.assertEqual(info.to_dict(), column('id', nullable='Yes'))
+
+    def test_column_extra_properties(self):
+        """Test that unknown properties are kept and hashable."""
+        info = ColumnInfo.from_dict(column('id', metadata={'tags': ['a', 'b']}))
+
+        self.assertEqual(info.extra, {'metadata': {'tags': ['a', 'b']}})
+        self.assertEqual(info.to_dict()['metadata'], {'tags': ['a', 'b']})
+        hash(info.key())
+
+    def test_table_schema_equality(self):
+        """Test that equal columns give equal schemas and hashes."""
+        schema1 = TableSchema.from_columns('t', [column('id'), column('name', 'varchar')])
+        schema2 = TableSchema.from_columns('t', [column('id'), column('name', 'varchar')])
+        schema3 = TableSchema.from_columns('t', [column('id'), column('name', 'nvarchar')])
+
+        self.assertEqual(schema1, schema2)
+        self.assertEqual(hash(schema1), hash(schema2))
+        self.assertNotEqual(schema1, schema3)
+        self.assertIs(TableSchema.from_columns('t', schema1), schema1)
+
+    def test_table_schema_lookup(self):
+        """Test looking up columns by name and converting back to dicts."""
+        schema = TableSchema.from_columns('t', [column('id'), column('name', 'varchar')])
+
+        self.assertEqual(len(schema), 2)
+        self.assertEqual(schema.column_names(), ['id', 'name'])
+        self.assertEqual(schema.column('name').type, 'varchar')
+        self.assertIsNone(schema.column('missing'))
+        self.assertEqual(schema.to_dicts(), [column('id'), column('name', 'varchar')])
+
+if __name__ == '__main__':
+    unittest.main()
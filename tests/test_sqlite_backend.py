@@ -0,0 +1,182 @@
+"""
+Tests for the SQLite backend.
+"""
+import unittest
+import sys
+import os
+import shutil
+import sqlite3
+import tempfile
+from unittest.mock import MagicMock
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Mock pymssql module before importing the SQL Server backend
+sys.modules.setdefault('pymssql', MagicMock())
+
+from app.models.backends.sqlite import SQLiteBackend, parse_declared_type
+from app.models.database import DatabaseConnection, create_connection
+from app.utils.checksum import compare_data_by_checksum
+from app.utils.comparison import compare_data_stream
+
+SCHEMA = """
+CREATE TABLE customers (
+    id INTEGER PRIMARY KEY,
+    email NVARCHAR(200) NOT NULL UNIQUE,
+    balance DECIMAL(18, 2)
+);
+CREATE TABLE orders (
+    id INTEGER PRIMARY KEY,
+    customer_id int NOT NULL REFERENCES customers (id),
+    note varchar(4000)
+);
+CREATE INDEX IX_orders_customer ON orders (customer_id);
+"""
+
+class TestSQLiteBackend(unittest.TestCase):
+    """Test cases for the SQLite backend."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        self.dbs = [self._create_database(name) for name in ('source', 'target')]
+
+    def _create_database(self, name):
+        """Create a database file with the test schema and connect to it"""
+        path = os.path.join(self.temp_dir, f"{name}.db")
+        connection = sqlite3.connect(path)
+        connection.executescript(SCHEMA)
+        connection.executemany("INSERT INTO customers VALUES (?, ?, ?)",
+                               [(i, f"user{i}@example.com", i * 1.5) for i in range(1, 3001)])
+        connection.commit()
+        connection.close()
+
+        db = SQLiteBackend(server='', database=path, username='', password='', driver='sqlite')
+        self.assertTrue(db.connect())
+        self.addCleanup(db.disconnect)
+        return db
+
+    def test_connect_missing_file(self):
+        """Test that a missing database file fails to connect instead of being created."""
+        path = os.path.join(self.temp_dir, 'missing #1?.db')
+        db = SQLiteBackend(server='', database=path, username='', password='', driver='sqlite')
+
+        self.assertFalse(db.connect())
+        self.assertFalse(os.path.exists(path))
+
+    def test_parse_declared_type(self):
+        """Test splitting declared column types."""
+        self.assertEqual(parse_declared_type('NVARCHAR(200)'), ('nvarchar', 200, None, None))
+        self.assertEqual(parse_declared_type('INTEGER'), ('integer', None, None, None))
+        self.assertEqual(parse_declared_type('DECIMAL(18, 2)'), ('decimal', None, 18, 2))
+        self.assertEqual(parse_declared_type(''), ('blob', None, None, None))
+
+    def test_catalog(self):
+        """Test reading tables, columns, foreign keys and indexes."""
+        db = self.dbs[0]
+
+        self.assertEqual(db.get_tables(), ['customers', 'orders'])
+
+        schema = db.get_table_schema('customers')
+        self.assertEqual([col['name'] for col in schema], ['id', 'email', 'balance'])
+        self.assertEqual(schema[0]['is_identity'], 'Yes')
+        self.assertEqual(schema[0]['is_primary_key'], 'Yes')
+        self.assertEqual(schema[1]['formatted_data_type'], 'nvarchar(200)')
+        self.assertEqual(schema[1]['is_nullable'], 'No')
+        self.assertEqual(schema[2]['formatted_data_type'], 'decimal(18,2)')
+        self.assertEqual(list(db.get_all_table_schemas(['orders'])), ['orders'])
+
+        foreign_keys = db.get_foreign_keys()
+        self.assertEqual(list(foreign_keys['orders'].values()), [
+            {'table': 'orders', 'columns': ['customer_id'], 'ref_table': 'customers', 'ref_columns': ['id']}
+        ])
+        indexes = db.get_indexes(['orders'])
+        self.assertEqual(indexes['orders']['IX_orders_customer'], {'is_unique': False, 'columns': ['customer_id']})
+
+        script = db.get_create_table_script('orders')
+        self.assertIn("[note] varchar(4000) NULL", script)
+        self.assertIn("CREATE INDEX [IX_orders_customer] ON [orders] ([customer_id]);", script)
+
+    def test_schema_version_and_fingerprints(self):
+        """Test that schema changes change the version and the table's fingerprint."""
+        db = self.dbs[0]
+        version = db.get_schema_version()
+        fingerprints = db.get_table_fingerprints()
+
+        db.cursor.execute("ALTER TABLE orders ADD COLUMN shipped int")
+
+        self.assertNotEqual(db.get_schema_version(), version)
+        changed = db.get_table_fingerprints()
+        self.assertEqual(changed['customers'], fingerprints['customers'])
+        self.assertNotEqual(changed['orders'], fingerprints['orders'])
+
+    def test_data_and_row_counts(self):
+        """Test fetching, streaming and counting rows."""
+        db = self.dbs[0]
+
+        self.assertEqual(db.get_row_counts(), {'customers': 3000, 'orders': 0})
+        self.assertEqual(db.get_row_count('customers'), 3000)
+        self.assertEqual(db.get_key_range('customers', 'id'), (1, 3000))
+
+        data = db.get_table_data('customers', columns=['id', 'email'], limit=2, order_by=['id'])
+        self.assertEqual(data['rows'], [{'id': 1, 'email': 'user1@example.com'},
+                                        {'id': 2, 'email': 'user2@example.com'}])
+
+        batches = list(db.iter_table_data('customers', batch_size=1000, order_by=['email']))
+        self.assertEqual([len(batch) for batch in batches], [1000, 1000, 1000])
+        emails = [row[1] for batch in batches for row in batch]
+        self.assertEqual(emails, sorted(emails))
+
+    def test_comparison_pipeline(self):
+        """Test streaming and checksum comparisons between two databases."""
+        db1, db2 = self.dbs
+        db2.cursor.execute("UPDATE customers SET balance = -1 WHERE id = 1234")
+        db2.cursor.execute("DELETE FROM customers WHERE id = 2000")
+        columns = ['id', 'email', 'balance']
+
+        stream_result = compare_data_stream(
+            db1.iter_table_data('customers', columns=columns, order_by=['id']),
+            db2.iter_table_data('customers', columns=columns, order_by=['id']),
+            columns, compare_columns=columns, key_columns=['id']
+        )
+        checksum_result = compare_data_by_checksum(db1, db2, 'customers', 'customers', 'id', columns)
+
+        for result in (stream_result, checksum_result):
+            self.assertEqual(result['summary']['rows_modified'], 1)
+            self.assertEqual(result['summary']['rows_deleted'], 1)
+        self.assertLess(checksum_result['summary']['checksum_stats']['rows_fetched'], 3000)
+
+    def test_key_hash_pipeline(self):
+        """Test streaming comparison of two databases in key hash order."""
+        db1, db2 = self.dbs
+        db2.cursor.execute("UPDATE customers SET balance = -1 WHERE email = 'user1234@example.com'")
+        db2.cursor.execute("DELETE FROM customers WHERE email = 'user2000@example.com'")
+        columns = ['email', 'balance']
+
+        batches = list(db1.iter_table_data_by_key_hash('customers', columns, ['email'], batch_size=1000))
+        hashes = [row[0] for batch in batches for row in batch]
+        self.assertEqual(len(hashes), 3000)
+        self.assertEqual(hashes, sorted(hashes))
+
+        result = compare_data_stream(
+            db1.iter_table_data_by_key_hash('customers', columns, ['email']),
+            db2.iter_table_data_by_key_hash('customers', columns, ['email']),
+            columns, key_columns=['email'], key_hashed=True
+        )
+        self.assertEqual(result['summary']['rows_modified'], 1)
+        self.assertEqual(result['summary']['rows_deleted'], 1)
+        self.assertEqual(result['summary']['rows_inserted'], 0)
+        self.assertEqual(result['summary']['duplicate_keys'], 0)
+
+    def test_create_connection(self):
+        """Test choosing the backend from the connection's driver."""
+        details = {'server': '', 'database': 'test.db', 'username': '', 'password': ''}
+
+        self.assertIsInstance(create_connection(dict(details, driver='sqlite')), SQLiteBackend)
+        self.assertIsInstance(create_connection(dict(details, driver='ODBC Driver 17 for SQL Server')),
+                              DatabaseConnection)
+
+if __name__ == '__main__':
+    unittest.main()